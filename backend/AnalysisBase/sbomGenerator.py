@@ -4,9 +4,13 @@ SBOM Generator for AnalysisBase
 
 import re
 import os
+import json
+import hashlib
+import sys
 from pathlib import Path
-from typing import Optional, Set, List
+from typing import Optional, Set, List, Dict
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 from cyclonedx.model.bom import Bom, BomMetaData
 from cyclonedx.model.component import Component, ComponentType
 from cyclonedx.model import Property
@@ -15,11 +19,24 @@ from cyclonedx.schema import SchemaVersion
 from datetime import datetime
 import argparse
 
+# Shared helpers live in the backend directory next to app.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cyclonedx_writer import write_bom_json, bom_json
+from sbom_common import (GitTreeReader, bom_ref, canonical_json, git_changed_packages, git_head, list_backfill_commits,
+                         parse_package_filters, reproducible_timestamp)
+from sbom_store import (build_properties, exists, get_policy_violations, get_sbom_signature, latest_version, policy_properties,
+                        read_bytes, store_version, version_lock)
+from build_log import C_COMPILER, CXX_COMPILER, PLATFORM, parse_build_log
+from spans import StageSpans
+from profiling import profiled
+from policy import load_policy
+from dep_graph import cmake_dependencies, read_edges, resolve_edges, rules_fingerprint
+
 @dataclass
 class Dependency:
     name: str
     version: Optional[str] = None
-    source: str = ""
+    source: str = ""  # pyDep.txt, cppDep.txt, or External/<pkg> when backfilling
     file_path: str = ""
 
     def __hash__(self):
@@ -29,12 +46,77 @@ class Dependency:
         return isinstance(other, Dependency) and (self.name, self.version) == (other.name, other.version)
 
 
+CMAKE_VERSION_PATTERNS = {
+    "HDF5": [r'ATLAS_HDF5_VERSION\s*"([^"]+)"', r'HDF5[-_]?([0-9.]+)\.tar\.gz'],
+    "BAT": [r'BAT[-_/]?([0-9]+(?:\.[0-9]+){1,})\.tar\.gz', r'/v[0-9]+/BAT-([0-9.]+)\.tar\.gz'],
+    "Blas": [r'OpenBLAS-([0-9.]+)\.tar\.gz'],
+    "Boost": [r'boost_([0-9_]+)\.tar\.gz'],
+    "Davix": [r'davix-([0-9.]+)\.tar\.gz'],
+    "dcap": [r'dcap-([0-9.]+)-', r'dcap-([0-9.]+)\.tar'],
+    "Eigen": [r'eigen-([0-9.]+)\.tar\.gz'],
+    "lwtnn": [r'lwtnn[/\\]v?([0-9.]+)\.tar\.gz', r'externals/lwtnn/v?([0-9.]+)\.tar\.gz', r'v([0-9.]+)\.tar\.gz'],
+    "FastJet": [r'fastjet-([0-9.]+)\.tar\.gz'],
+    "FastJetContrib": [r'fjcontrib-([0-9.]+)\.tar\.gz', r'fastjetcontrib-([0-9.]+)\.tar\.gz'],
+    "GoogleTest": [r'googletest-([0-9.]+)\.tar\.gz'],
+    "KLFitter": [r'KLFitter[/\\]v?([0-9.]+)\.tar\.gz', r'KLFitter-([0-9.]+)\.tar\.gz'],
+    "Lhapdf": [r'LHAPDF-([0-9.]+)\.tar\.gz'],
+    "LibXml2": [r'libxml2-([0-9.]+)\.tar\.gz'],
+    "onnxruntime": [r'onnxruntime[-\w]*-([0-9.]+)\.(?:tgz|tar\.gz)'],
+    "nlohmann_json": [r'json-([0-9.]+)\.tar\.gz'],
+    "Python": [r'libffi-([0-9.]+)\.tar\.gz', r'Python\s+([0-9.]+)'],
+    "ROOT": [r'root_v([0-9.]+)\.source\.tar\.gz', r'ROOT[/\\]root_v([0-9.]+)\.source\.tar\.gz'],
+    "SQLite": [r'sqlite-autoconf-([0-9]+)\.tar\.gz'],
+    "TBB": [r'oneTBB-([0-9.]+)\.tar\.gz'],
+    "XRootD": [r'xrootd-([0-9.]+)\.tar\.gz'],
+}
+
+GENERIC_VERSION_PATTERNS = [
+    r'/sources/[^/]+-([0-9A-Za-z\._\-]+)\.tar\.gz',
+    r'[-_/]v?([0-9]+\.[0-9]+\.[0-9A-Za-z\._\-]+)\.tar\.gz',
+    r'[-_/]v?([0-9]+\.[0-9A-Za-z\._\-]+)\.tar\.gz',
+    r'([0-9]{6,})\.tar\.gz'
+]
+
+PYMODULES_REQUIREMENTS = ["requirements_analysisbase.txt.in", "requirements.txt.in"]
+
+# Source versions recorded in the metadata unless the caller supplies them
+ANALYSISBASE_VERSION = "24.0"
+EXTERNALS_VERSION = "24.2.42"
+
+DEFAULT_PACKAGE_FILTERS = [
+    "HDF5", "BAT", "Blas", "Boost", "Davix", "dcap", "Eigen", "lwtnn",
+    "FastJet", "FastJetContrib", "GoogleTest", "KLFitter", "Lhapdf",
+    "LibXml2", "onnxruntime", "nlohmann_json", "PyAnalysis", "PyModules",
+    "Python", "ROOT", "SQLite", "TBB", "XRootD"
+]
+
+
+def _extractor_fingerprint() -> str:
+    """Hash of the extraction rules, so an index built with older rules is not reused"""
+    rules = json.dumps([CMAKE_VERSION_PATTERNS, GENERIC_VERSION_PATTERNS, PYMODULES_REQUIREMENTS, rules_fingerprint()], sort_keys=True)
+    return hashlib.sha1(rules.encode("utf-8")).hexdigest()
+
+
 class SBOMGenerator:
     def __init__(self):
         base = os.path.dirname(__file__)
         self.py_file = Path(os.path.join(base, "pyDep.txt"))
         self.cpp_file = Path(os.path.join(base, "cppDep.txt"))
+        self.externals_index_file = Path(os.path.join(base, "externals_index.json"))
+        self.graph_file = Path(os.path.join(base, "depGraph.txt"))
         self.dependencies: Set[Dependency] = set()
+        # Package name -> names of the packages it depends on, from the CMake files
+        self.edges: Dict[str, List[str]] = {}
+        # AtlasExternals file contents by absolute path; generate_all.py shares one between projects
+        self.read_cache: Dict[str, Optional[str]] = {}
+        # Stream JSON straight from the dependency set instead of via the cyclonedx model
+        self.fast_writer = os.environ.get("SBOM_FAST_WRITER") == "1"
+        # Input bytes consumed so far, reported per stage by the timing spans
+        self.bytes_read = 0
+        self.spans = StageSpans("AnalysisBase", lambda: self.bytes_read)
+        # Dependency policy checked before serializing; None without a policy file
+        self.policy = load_policy("AnalysisBase")
+        self.policy_violations: Optional[List[Dict]] = None
 
     def parse_py_deps(self):
         if not self.py_file.exists():
@@ -43,6 +125,7 @@ class SBOMGenerator:
 
         pattern = r"^([A-Za-z0-9_\-]+)\s*:\s*(.*)$"
 
+        self.bytes_read += self.py_file.stat().st_size
         with open(self.py_file, "r", encoding="utf-8") as f:
             for line in f:
                 line = line.strip()
@@ -53,7 +136,7 @@ class SBOMGenerator:
                     continue
                 name, version_raw = m.groups()
                 version = version_raw.split()[0] if version_raw else "undefined"
-                self.dependencies.add(Dependency(name=name, version=version, source=str(self.py_file)))
+                self.dependencies.add(Dependency(name=name, version=version, source=self.py_file.name))
 
     def parse_cpp_deps(self):
         if not self.cpp_file.exists():
@@ -62,6 +145,7 @@ class SBOMGenerator:
 
         pattern = r"^([A-Za-z0-9_\-]+)\s*:\s*(.*)$"
 
+        self.bytes_read += self.cpp_file.stat().st_size
         with open(self.cpp_file, "r", encoding="utf-8") as f:
             for line in f:
                 line = line.strip()
@@ -73,7 +157,7 @@ class SBOMGenerator:
                 name, version_raw = m.groups()
                 version_raw = version_raw.strip()
                 version = version_raw.split()[0] if version_raw else "undefined"
-                self.dependencies.add(Dependency(name=name, version=version, source=str(self.cpp_file)))
+                self.dependencies.add(Dependency(name=name, version=version, source=self.cpp_file.name))
 
     def _load_package_filters(self, filters_path: Optional[str] = None) -> List[str]:
         candidates = []
@@ -94,34 +178,14 @@ class SBOMGenerator:
 
         if not chosen:
             # fallback conservative list
-            return [
-                "HDF5", "BAT", "Blas", "Boost", "Davix", "dcap", "Eigen", "lwtnn",
-                "FastJet", "FastJetContrib", "GoogleTest", "KLFitter", "Lhapdf",
-                "LibXml2", "onnxruntime", "nlohmann_json", "PyAnalysis", "PyModules",
-                "Python", "ROOT", "SQLite", "TBB", "XRootD"
-            ]
-
-        deps: List[str] = []
+            return list(DEFAULT_PACKAGE_FILTERS)
+
         try:
             with open(chosen, "r", encoding="utf-8") as f:
-                for raw in f:
-                    line = raw.strip()
-                    if not line:
-                        continue
-                    if line.startswith("+") and "External/" in line:
-                        after = line.split("External/", 1)[1].strip()
-                        pkg = after.split()[0]
-                        if pkg:
-                            deps.append(pkg)
+                return parse_package_filters(f.read())
         except Exception:
             # on failure return fallback
-            return [
-                "HDF5", "BAT", "Blas", "Boost", "Davix", "dcap", "Eigen", "lwtnn",
-                "FastJet", "FastJetContrib", "GoogleTest", "KLFitter", "Lhapdf",
-                "LibXml2", "onnxruntime", "nlohmann_json", "PyAnalysis", "PyModules",
-                "Python", "ROOT", "SQLite", "TBB", "XRootD"
-            ]
-        return deps
+            return list(DEFAULT_PACKAGE_FILTERS)
 
     def export_package_filters(self, dest_dir: Optional[str] = None) -> Optional[str]:
         src = os.path.join(os.getcwd(), "package_filters.txt")
@@ -139,33 +203,153 @@ class SBOMGenerator:
             print(f"Failed to copy package_filters.txt: {e}")
             return None
 
-    def parse_cmakelists(self):
-        print(f"Entering parse_cmakelists() - Current directory: {os.getcwd()}")
-        deps = self._load_package_filters()
+    def _extract_package_entries(self, dep: str, read_file) -> List[str]:
+        """Extract "name: version" entries for External/<dep>.
+
+        read_file(relpath) returns the content of a file relative to the
+        External directory, or None if it does not exist.
+        """
+        dep_key = dep
+        if dep.lower() == "root":
+            dep_key = "ROOT"
+        elif dep.lower() in ("nlohmann_json", "nlohmann-json"):
+            dep_key = "nlohmann_json"
+        elif dep.lower() == "blas":
+            dep_key = "Blas"
+
+        content = read_file(f"{dep}/CMakeLists.txt")
+        if content is None:
+            content = read_file(f"{dep}/cmake/CMakeLists.txt")
+        content = content or ""
+
+        entries: List[str] = []
+
+        # PyModules: extract python packages from requirements files inside the package dir
+        if dep == "PyModules":
+            for rf in PYMODULES_REQUIREMENTS:
+                req = read_file(f"{dep}/{rf}")
+                if req is None:
+                    continue
+                for line in req.splitlines():
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    m = re.match(r'^([A-Za-z0-9_\-]+)==([^\s]+)', line)
+                    if m:
+                        entries.append("{}: {}".format(*m.groups()))
+            return entries
+
+        # PyAnalysis: multiple python packages declared in its CMakeLists.txt
+        if dep == "PyAnalysis":
+            for name, ver in re.findall(r'sources/([A-Za-z0-9_\-]+)-([0-9][0-9A-Za-z\._\-]+)\.tar\.gz', content):
+                entries.append(f"{name}: {ver}")
+            for name, ver in re.findall(r'([A-Za-z0-9_\-]+)\s*=\s*sources/[A-Za-z0-9_\-]+-([0-9][0-9A-Za-z\._\-]+)\.tar\.gz', content):
+                entries.append(f"{name}: {ver}")
+            return entries
+
+        if not content:
+            return entries
+
+        # Generic per-package parsing
+        found_version = None
+        for rx in CMAKE_VERSION_PATTERNS.get(dep_key, []):
+            m = re.search(rx, content)
+            if m:
+                found_version = m.group(1)
+                break
+
+        if not found_version:
+            for rx in GENERIC_VERSION_PATTERNS:
+                m = re.search(rx, content)
+                if m:
+                    found_version = m.group(1)
+                    break
 
-        patterns = {
-            "HDF5": [r'ATLAS_HDF5_VERSION\s*"([^"]+)"', r'HDF5[-_]?([0-9.]+)\.tar\.gz'],
-            "BAT": [r'BAT[-_/]?([0-9]+(?:\.[0-9]+){1,})\.tar\.gz', r'/v[0-9]+/BAT-([0-9.]+)\.tar\.gz'],
-            "Blas": [r'OpenBLAS-([0-9.]+)\.tar\.gz'],
-            "Boost": [r'boost_([0-9_]+)\.tar\.gz'],
-            "Davix": [r'davix-([0-9.]+)\.tar\.gz'],
-            "dcap": [r'dcap-([0-9.]+)-', r'dcap-([0-9.]+)\.tar'],
-            "Eigen": [r'eigen-([0-9.]+)\.tar\.gz'],
-            "lwtnn": [r'lwtnn[/\\]v?([0-9.]+)\.tar\.gz', r'externals/lwtnn/v?([0-9.]+)\.tar\.gz', r'v([0-9.]+)\.tar\.gz'],
-            "FastJet": [r'fastjet-([0-9.]+)\.tar\.gz'],
-            "FastJetContrib": [r'fjcontrib-([0-9.]+)\.tar\.gz', r'fastjetcontrib-([0-9.]+)\.tar\.gz'],
-            "GoogleTest": [r'googletest-([0-9.]+)\.tar\.gz'],
-            "KLFitter": [r'KLFitter[/\\]v?([0-9.]+)\.tar\.gz', r'KLFitter-([0-9.]+)\.tar\.gz'],
-            "Lhapdf": [r'LHAPDF-([0-9.]+)\.tar\.gz'],
-            "LibXml2": [r'libxml2-([0-9.]+)\.tar\.gz'],
-            "onnxruntime": [r'onnxruntime[-\w]*-([0-9.]+)\.(?:tgz|tar\.gz)'],
-            "nlohmann_json": [r'json-([0-9.]+)\.tar\.gz'],
-            "Python": [r'libffi-([0-9.]+)\.tar\.gz', r'Python\s+([0-9.]+)'],
-            "ROOT": [r'root_v([0-9.]+)\.source\.tar\.gz', r'ROOT[/\\]root_v([0-9.]+)\.source\.tar\.gz'],
-            "SQLite": [r'sqlite-autoconf-([0-9]+)\.tar\.gz'],
-            "TBB": [r'oneTBB-([0-9.]+)\.tar\.gz'],
-            "XRootD": [r'xrootd-([0-9.]+)\.tar\.gz'],
+        if found_version:
+            if dep_key == "Boost":
+                found_version = found_version.replace("_", ".")
+            entries.append(f"{dep}: {found_version}")
+        return entries
+
+    def _extract_package_edges(self, dep: str, read_file) -> List[str]:
+        """Names of the packages External/<dep> depends on (find_package, DEPENDS, add_dependencies)"""
+        content = read_file(f"{dep}/CMakeLists.txt")
+        if content is None:
+            content = read_file(f"{dep}/cmake/CMakeLists.txt")
+        return cmake_dependencies(dep, content or "")
+
+    def _load_externals_index(self) -> Dict:
+        if not self.externals_index_file.exists():
+            return {}
+        try:
+            with open(self.externals_index_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable externals index {self.externals_index_file}: {e}")
+            return {}
+
+    def _save_externals_index(self, commit: str, packages: Dict[str, List[str]], edges: Dict[str, List[str]]):
+        index = {
+            "commit": commit,
+            "edges": edges,
+            "fingerprint": _extractor_fingerprint(),
+            "packages": packages,
         }
+        try:
+            with open(self.externals_index_file, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2, sort_keys=True)
+        except Exception as e:
+            print(f"Failed to write externals index: {e}")
+
+    def parse_cmakelists(self, full_scan: bool = False):
+        print(f"Entering parse_cmakelists() - Current directory: {os.getcwd()}")
+        deps = self._load_package_filters()
+        external_dir = os.getcwd()
+
+        # Only re-extract packages whose External/<pkg> directory changed since
+        # the commit recorded by the last run; everything else comes from the index.
+        commit = git_head(external_dir)
+        index = {} if full_scan else self._load_externals_index()
+        previous: Dict[str, List[str]] = {}
+        previous_edges: Dict[str, List[str]] = {}
+        changed: Optional[Set[str]] = None
+        if commit and index.get("commit") and index.get("fingerprint") == _extractor_fingerprint():
+            changed = git_changed_packages(external_dir, index["commit"], commit)
+            if changed is not None:
+                previous = index.get("packages", {})
+                previous_edges = index.get("edges", {})
+                print(f"Incremental scan against {index['commit'][:12]}: {len(changed)} changed package dir(s)")
+
+        # Versions and edges come from the same files; read each one once
+        def read_file(relpath):
+            path = os.path.join(external_dir, relpath)
+            if path in self.read_cache:
+                return self.read_cache[path]
+            if not os.path.isfile(path):
+                self.read_cache[path] = None
+                return None
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    content = f.read()
+                self.bytes_read += len(content)
+            except Exception:
+                content = ""
+            self.read_cache[path] = content
+            return content
+
+        results: Dict[str, List[str]] = {}
+        edges: Dict[str, List[str]] = {}
+        reused = 0
+        for dep in deps:
+            if changed is not None and dep in previous and dep in previous_edges and dep not in changed:
+                results[dep] = previous[dep]
+                edges[dep] = previous_edges[dep]
+                reused += 1
+                continue
+            results[dep] = self._extract_package_entries(dep, read_file)
+            edges[dep] = self._extract_package_edges(dep, read_file)
+        if changed is not None:
+            print(f"Reused {reused} package(s) from the externals index, re-extracted {len(results) - reused}")
 
         cppdep_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "cppDep.txt"))
 
@@ -180,109 +364,26 @@ class SBOMGenerator:
 
         with open(cppdep_path, "a", encoding="utf-8") as outf:
             for dep in deps:
-                dep_key = dep
-                if dep.lower() == "root":
-                    dep_key = "ROOT"
-                elif dep.lower() in ("nlohmann_json", "nlohmann-json"):
-                    dep_key = "nlohmann_json"
-                elif dep.lower() == "blas":
-                    dep_key = "Blas"
-
-                pkg_dir = os.path.join(os.getcwd(), dep)
-                cmake_path = os.path.join(pkg_dir, "CMakeLists.txt")
-                if not os.path.isfile(cmake_path):
-                    alt_path = os.path.join(pkg_dir, "cmake", "CMakeLists.txt")
-                    if os.path.isfile(alt_path):
-                        cmake_path = alt_path
-                    else:
-                        if dep in ("PyModules", "PyAnalysis") and os.path.isdir(pkg_dir):
-                            cmake_path = None
-                        else:
-                            continue
-
-                content = ""
-                if cmake_path and os.path.isfile(cmake_path):
-                    try:
-                        with open(cmake_path, "r", encoding="utf-8") as f:
-                            content = f.read()
-                    except Exception:
-                        content = ""
-
-                # PyModules: extract python packages from requirements files inside the package dir
-                if dep == "PyModules" and os.path.isdir(pkg_dir):
-                    req_files = ["requirements_analysisbase.txt.in", "requirements.txt.in"]
-                    for rf in req_files:
-                        rfpath = os.path.join(pkg_dir, rf)
-                        if not os.path.isfile(rfpath):
-                            continue
-                        try:
-                            with open(rfpath, "r", encoding="utf-8") as rfh:
-                                for line in rfh:
-                                    line = line.strip()
-                                    if not line or line.startswith("#"):
-                                        continue
-                                    m = re.match(r'^([A-Za-z0-9_\-]+)==([^\s]+)', line)
-                                    if not m:
-                                        continue
-                                    pkgname, pkgver = m.groups()
-                                    entry = f"{pkgname}: {pkgver}"
-                                    if entry not in existing_entries:
-                                        outf.write(entry + "\n")
-                                        existing_entries.add(entry)
-                                        print(f"Discovered Python package from PyModules: {pkgname}: {pkgver}")
-                        except Exception:
-                            continue
-                    continue
-
-                # PyAnalysis: multiple python packages declared in its CMakeLists.txt
-                if dep == "PyAnalysis":
-                    if content:
-                        for name, ver in re.findall(r'sources/([A-Za-z0-9_\-]+)-([0-9][0-9A-Za-z\._\-]+)\.tar\.gz', content):
-                            entry = f"{name}: {ver}"
-                            if entry not in existing_entries:
-                                outf.write(entry + "\n")
-                                existing_entries.add(entry)
-                                print(f"Discovered {name}: {ver} (from PyAnalysis)")
-                        for name, ver in re.findall(r'([A-Za-z0-9_\-]+)\s*=\s*sources/[A-Za-z0-9_\-]+-([0-9][0-9A-Za-z\._\-]+)\.tar\.gz', content):
-                            entry = f"{name}: {ver}"
-                            if entry not in existing_entries:
-                                outf.write(entry + "\n")
-                                existing_entries.add(entry)
-                                print(f"Discovered {name}: {ver} (from PyAnalysis)")
-                    continue
-
-                # Generic per-package parsing
-                found_version = None
-                regex_list = patterns.get(dep_key, [])
-                for rx in regex_list:
-                    if content:
-                        m = re.search(rx, content)
-                        if m:
-                            found_version = m.group(1)
-                            break
-
-                if not found_version and content:
-                    generic_patterns = [
-                        r'/sources/[^/]+-([0-9A-Za-z\._\-]+)\.tar\.gz',
-                        r'[-_/]v?([0-9]+\.[0-9]+\.[0-9A-Za-z\._\-]+)\.tar\.gz',
-                        r'[-_/]v?([0-9]+\.[0-9A-Za-z\._\-]+)\.tar\.gz',
-                        r'([0-9]{6,})\.tar\.gz'
-                    ]
-                    for rx in generic_patterns:
-                        m = re.search(rx, content)
-                        if m:
-                            found_version = m.group(1)
-                            break
-
-                if found_version:
-                    if dep_key == "Boost":
-                        found_version = found_version.replace("_", ".")
-                    entry = f"{dep}: {found_version}"
+                for entry in results.get(dep, []):
                     if entry not in existing_entries:
                         outf.write(entry + "\n")
                         existing_entries.add(entry)
-                        print(f"Discovered {dep}: {found_version}")
+                        if dep in ("PyModules", "PyAnalysis"):
+                            print(f"Discovered {entry} (from {dep})")
+                        else:
+                            print(f"Discovered {entry}")
+
+        self.edges = {dep: targets for dep, targets in edges.items() if targets}
+        with open(self.graph_file, "w", encoding="utf-8") as outf:
+            for dep in deps:
+                if dep in self.edges:
+                    outf.write(f"{dep}: {' '.join(self.edges[dep])}\n")
+        print(f"Recorded {sum(len(t) for t in self.edges.values())} dependency edge(s) in {self.graph_file.name}")
+
+        if commit:
+            self._save_externals_index(commit, results, edges)
         print(f"Exiting parse_cmakelists() - Current directory: {os.getcwd()}")
+        return results
 
     def parse_python_packages_1(self):
         base = os.path.dirname(__file__)
@@ -293,6 +394,7 @@ class SBOMGenerator:
             if not os.path.isfile(rf):
                 continue
             try:
+                self.bytes_read += os.path.getsize(rf)
                 with open(rf, "r", encoding="utf-8") as rfh:
                     for line in rfh:
                         line = line.strip()
@@ -321,6 +423,7 @@ class SBOMGenerator:
         try:
             with open(cmake, "r", encoding="utf-8") as f:
                 content = f.read()
+            self.bytes_read += len(content)
         except Exception:
             content = ""
 
@@ -335,35 +438,89 @@ class SBOMGenerator:
                     out.write(f"{name}: {ver}\n")
             print(f"Wrote {len(found)} python package(s) to {outpath}")
 
-    def generate_cyclonedx_sbom(self, analysisbase_version="24.0", externals_version="24.2.42") -> str:
+    def check_policy(self) -> List[Dict]:
+        """Check the dependency set against the policy; the result is recorded in the SBOM metadata"""
+        if self.policy is None:
+            return []
+        self.policy_violations = self.policy.check((dep.name, dep.version, dep.source) for dep in self.dependencies)
+        for violation in self.policy_violations:
+            print(f"Policy violation: {violation['message']}")
+        return self.policy_violations
+
+    @staticmethod
+    def _properties(dep: Dependency):
+        """Component (name, value) pairs: where it came from"""
+        return [("source", dep.source)] if dep.source else []
+
+    def _component_rows(self):
+        """Component rows for the direct CycloneDX writer"""
+        return [(bom_ref(dep), dep.name, dep.version or "undefined", self._properties(dep)) for dep in self.dependencies]
+
+    def parse_dep_graph(self):
+        """Load the edges parse_cmakelists() recorded in depGraph.txt"""
+        if not self.graph_file.exists():
+            print(f"Dependency graph file not found: {self.graph_file}")
+            return
+        self.bytes_read += self.graph_file.stat().st_size
+        self.edges = read_edges(self.graph_file)
+
+    def _dependency_refs(self) -> Dict[str, List[str]]:
+        """bom-ref -> bom-refs it depends on, for the CycloneDX dependencies section"""
+        return resolve_edges(((bom_ref(dep), dep.name) for dep in self.dependencies), self.edges)
+
+    def _metadata_properties(self, analysisbase_version, externals_version, build_info=None):
+        """Metadata (name, value) pairs: source versions plus build info"""
+        properties = [("AnalysisBase", analysisbase_version), ("AnalysisBaseExternals", externals_version)] + build_properties(build_info)
+        if self.policy_violations is not None:
+            properties += policy_properties(self.policy.digest, self.policy_violations)
+        return properties
+
+    def generate_cyclonedx_sbom(self, analysisbase_version=ANALYSISBASE_VERSION, externals_version=EXTERNALS_VERSION, build_info=None) -> str:
+        properties = self._metadata_properties(analysisbase_version, externals_version, build_info)
+        if self.fast_writer:
+            return bom_json(self._component_rows(), properties=properties, timestamp=reproducible_timestamp(),
+                            dependencies=self._dependency_refs())
         metadata = BomMetaData(
-            properties=[
-                Property(name="AnalysisBase", value=analysisbase_version),
-                Property(name="AnalysisBaseExternals", value=externals_version)
-            ]
+            properties=[Property(name=name, value=value) for name, value in properties]
         )
+        # BomMetaData defaults to the current time; drop it unless SOURCE_DATE_EPOCH is set
+        metadata.timestamp = reproducible_timestamp()
         bom = Bom(metadata=metadata)
+        components = {}
         for dep in sorted(self.dependencies, key=lambda x: x.name.lower()):
             component = Component(
                 name=dep.name,
                 version=dep.version or "undefined",
-                type=ComponentType.LIBRARY
+                type=ComponentType.LIBRARY,
+                bom_ref=bom_ref(dep)
             )
+            for name, value in self._properties(dep):
+                component.properties.add(Property(name=name, value=value))
             bom.components.add(component)
+            components[bom_ref(dep)] = component
+        for ref, targets in self._dependency_refs().items():
+            bom.register_dependency(components[ref], [components[target] for target in targets])
         outputter = make_outputter(
             bom=bom,
             output_format=OutputFormat.JSON,
             schema_version=SchemaVersion.V1_4
         )
-        return outputter.output_as_string()
-
-    def save_sbom(self, output_path="analysis-base-sbom.json"):
-        sbom_json = self.generate_cyclonedx_sbom()
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(sbom_json)
+        return canonical_json(outputter.output_as_string())
+
+    def save_sbom(self, output_path="analysis-base-sbom.json", analysisbase_version=ANALYSISBASE_VERSION,
+                  externals_version=EXTERNALS_VERSION, build_info=None):
+        if self.fast_writer:
+            properties = self._metadata_properties(analysisbase_version, externals_version, build_info)
+            with open(output_path, "w", encoding="utf-8") as f:
+                write_bom_json(f, self._component_rows(), properties=properties, timestamp=reproducible_timestamp(),
+                               dependencies=self._dependency_refs())
+        else:
+            sbom_json = self.generate_cyclonedx_sbom(analysisbase_version, externals_version, build_info)
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(sbom_json)
         print(f"SBOM saved to {output_path}")
 
-    def generate_markdown_report(self, analysisbase_version="24.0", externals_version="24.2.42", build_info=None) -> str:
+    def generate_markdown_report(self, analysisbase_version=ANALYSISBASE_VERSION, externals_version=EXTERNALS_VERSION, build_info=None) -> str:
         md = []
         md.append("# AnalysisBase SBOM Report\n")
         md.append(f"**Generated on:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -387,6 +544,13 @@ class SBOMGenerator:
         md.append("|--------|---------|")
         md.append(f"| AnalysisBase | {analysisbase_version} |")
         md.append(f"| AnalysisBaseExternals | {externals_version} |\n")
+        if self.policy_violations:
+            md.append("## Policy Violations\n")
+            md.append("| Rule | Package | Version | Detail |")
+            md.append("|------|---------|---------|--------|")
+            for violation in self.policy_violations:
+                md.append(f"| {violation['rule']} | {violation['component']} | {violation['version']} | {violation['message']} |")
+            md.append("")
         if self.dependencies:
             md.append("## All Dependencies\n")
             md.append("| Package | Version |")
@@ -396,24 +560,46 @@ class SBOMGenerator:
             md.append("")
         return "\n".join(md)
 
-    def save_markdown_report(self, output_path="analysis-base-sbom.md", build_info=None):
-        md_content = self.generate_markdown_report(build_info=build_info)
+    def save_markdown_report(self, output_path="analysis-base-sbom.md", analysisbase_version=ANALYSISBASE_VERSION,
+                             externals_version=EXTERNALS_VERSION, build_info=None):
+        md_content = self.generate_markdown_report(analysisbase_version, externals_version, build_info)
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(md_content)
         print(f"Markdown report saved to {output_path}")
 
     def generate(self, output_json="analysis-base-sbom.json", output_md="analysis-base-sbom.md"):
-        print("Parsing Python dependencies...")
-        self.parse_py_deps()
-        print("Parsing C++ dependencies...")
-        self.parse_cpp_deps()
+        with self.spans.span("parse_py_deps") as span:
+            print("Parsing Python dependencies...")
+            before = len(self.dependencies)
+            self.parse_py_deps()
+            span['items'] = len(self.dependencies) - before
+        with self.spans.span("parse_cpp_deps") as span:
+            print("Parsing C++ dependencies...")
+            before = len(self.dependencies)
+            self.parse_cpp_deps()
+            span['items'] = len(self.dependencies) - before
         print(f"Found {len(self.dependencies)} dependencies total.")
-        self.save_sbom(output_json)
+        with self.spans.span("parse_dep_graph") as span:
+            self.parse_dep_graph()
+            span['items'] = sum(len(targets) for targets in self.edges.values())
         
-        # Parse build information
-        print("Parsing build information...")
-        build_info = self.parse_build_info()
-        self.save_markdown_report(output_md, build_info=build_info)
+        if self.policy is not None:
+            with self.spans.span("policy") as span:
+                span['items'] = len(self.check_policy())
+        
+        # Parse build information; it is recorded in the SBOM metadata
+        with self.spans.span("parse_build_info") as span:
+            print("Parsing build information...")
+            build_info = self.parse_build_info()
+            span['items'] = len(build_info)
+        with self.spans.span("serialize") as span:
+            self.save_sbom(output_json, build_info=build_info)
+            span['items'] = len(self.dependencies)
+            span['bytes_written'] = os.path.getsize(output_json)
+        with self.spans.span("markdown") as span:
+            self.save_markdown_report(output_md, build_info=build_info)
+            span['items'] = len(self.dependencies)
+            span['bytes_written'] = os.path.getsize(output_md)
 
     def extract_python_version_and_update_cppdep(self, pydep_path="pyDep.txt", cppdep_path="cppDep.txt"):
         base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -449,65 +635,155 @@ class SBOMGenerator:
         
         compiler_info = {}
         
-        if not os.path.exists(build_txt_path):
-            return compiler_info
-        
         try:
-            with open(build_txt_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                
-                # Parse line 1: C compiler
-                if len(lines) > 0:
-                    c_line = lines[0].strip()
-                    c_match = re.search(r'The C compiler identification is (.+)', c_line)
-                    if c_match:
-                        compiler_info['C Compiler'] = c_match.group(1)
-                
-                # Parse line 2: CXX compiler
-                if len(lines) > 1:
-                    cxx_line = lines[1].strip()
-                    cxx_match = re.search(r'The CXX compiler identification is (.+)', cxx_line)
-                    if cxx_match:
-                        compiler_info['CXX Compiler'] = cxx_match.group(1)
-                
-                # Parse line 25 (index 24): Platform name
-                if len(lines) > 24:
-                    platform_line = lines[24].strip()
-                    platform_match = re.search(r'Using platform name: (.+)', platform_line)
-                    if platform_match:
-                        compiler_info['Platform'] = platform_match.group(1)
-                        
+            if os.path.exists(build_txt_path):
+                self.bytes_read += os.path.getsize(build_txt_path)
+            parsed = parse_build_log(build_txt_path, fields=(C_COMPILER, CXX_COMPILER, PLATFORM))
         except Exception as e:
             print(f"Failed to parse build info: {e}")
+            parsed = None
+        if not parsed:
+            return compiler_info
         
+        for key in (C_COMPILER, CXX_COMPILER, PLATFORM):
+            if parsed[key]:
+                compiler_info[key] = parsed[key]
         return compiler_info
 
-
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--parse-cmakelists', action='store_true')
-    parser.add_argument('--parse-package-filter', action='store_true')
-    parser.add_argument('--parse-python-packages-1', action='store_true')
-    parser.add_argument('--parse-python-packages-2', action='store_true')
-    parser.add_argument('--parse-cpp', action='store_true')
-    args = parser.parse_args()
-
+def _backfill_commit(task):
+    """Build the SBOM a given AtlasExternals commit would have produced (runs in a worker process)"""
+    repo_dir, commit, commit_time = task
+    reader = GitTreeReader(repo_dir, commit)
     generator = SBOMGenerator()
+    try:
+        filters = reader.read("Projects/AnalysisBaseExternals/package_filters.txt")
+        deps = parse_package_filters(filters) if filters else list(DEFAULT_PACKAGE_FILTERS)
+        externals_version = (reader.read("Projects/AnalysisBaseExternals/version.txt") or "").strip() or "unknown"
+        contents: Dict[str, Optional[str]] = {}
+
+        def read_file(relpath):
+            # Versions and edges come from the same files; fetch each blob once
+            if relpath not in contents:
+                contents[relpath] = reader.read(f"External/{relpath}")
+            return contents[relpath]
+        for dep in deps:
+            for entry in generator._extract_package_entries(dep, read_file):
+                name, version = entry.split(": ", 1)
+                generator.dependencies.add(Dependency(name=name, version=version, source=f"External/{dep}"))
+            targets = generator._extract_package_edges(dep, read_file)
+            if targets:
+                generator.edges[dep] = targets
+    finally:
+        reader.close()
+    generator.check_policy()
+    # externalBuild.txt describes today's build, not this commit's, so no build info is recorded
+    sbom_json = generator.generate_cyclonedx_sbom(externals_version=externals_version)
+    md_content = generator.generate_markdown_report(externals_version=externals_version)
+    return commit, commit_time, sbom_json, md_content
+
+
+def backfill(rev_range: str, repo: str = "AtlasExternals", jobs: Optional[int] = None, output_dir: str = "SBOMs-backfill"):
+    """Write one <output_dir>/vN per AtlasExternals commit in rev_range, ordered by commit date.
+
+    Consecutive commits yielding an identical SBOM are collapsed into one
+    version, and commits violating an enforced policy are skipped, matching
+    what the daily run would have stored.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    repo_dir = os.path.join(base_dir, repo)
+
+    commits = list_backfill_commits(repo_dir, rev_range, ["External", "Projects/AnalysisBaseExternals"])
+    if not commits:
+        print(f"No AtlasExternals commits found in {rev_range}")
+        return
+    print(f"Backfilling {len(commits)} commit(s) from {rev_range} with {jobs or os.cpu_count()} worker(s)...")
+
+    sboms_dir = Path(base_dir) / output_dir
+    sboms_dir.mkdir(parents=True, exist_ok=True)
+    # Compare the first backfilled SBOM with the newest version already stored
+    previous_signature = None
+    _, latest_dir = latest_version(sboms_dir)
+    if latest_dir and exists(latest_dir / "analysis-base-sbom.json"):
+        previous_signature = get_sbom_signature(json.loads(read_bytes(latest_dir / "analysis-base-sbom.json")))
+    written = 0
+    policy = load_policy("AnalysisBase")
+    enforced = policy is not None and policy.enforce
+    tasks = [(repo_dir, sha, ctime) for sha, ctime in commits]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # map() yields in submission order, i.e. by commit date
+        for commit, commit_time, sbom_json, md_content in pool.map(_backfill_commit, tasks, chunksize=4):
+            sbom_data = json.loads(sbom_json)
+            signature = get_sbom_signature(sbom_data)
+            if signature == previous_signature:
+                continue
+            # An enforced policy blocks the version, as in version_sbom.py; the next commit is compared with the last stored one
+            policy_result = get_policy_violations(sbom_data)
+            if enforced and policy_result and policy_result['count']:
+                print(f"{commit[:12]} skipped: {policy_result['count']} policy violation(s) under an enforced policy")
+                continue
+            previous_signature = signature
+            # Same lock as version_sbom.py and the API, so a parallel run never takes the same vN
+            with version_lock(sboms_dir):
+                next_version = latest_version(sboms_dir)[0] + 1
+                # Dated by the commit, so listings and archiving order it among the stored versions
+                store_version(sboms_dir / f"v{next_version}", {"analysis-base-sbom.json": sbom_json, "analysis-base-sbom.md": md_content},
+                              mtime=commit_time)
+            print(f"v{next_version} <- {commit[:12]} ({datetime.fromtimestamp(commit_time):%Y-%m-%d %H:%M})")
+            written += 1
+    print(f"Backfill complete: {written} version(s) written to {sboms_dir}")
+
+
+def run(args):
+    generator = SBOMGenerator()
+    if args.fast_writer:
+        generator.fast_writer = True
 
     if args.parse_cmakelists:
-        generator.parse_cmakelists()
+        with generator.spans.span("parse_cmakelists") as span:
+            results = generator.parse_cmakelists(full_scan=args.full_scan)
+            span['items'] = sum(len(entries) for entries in results.values())
         print("Parsed CMakeLists.txt for dependencies.")
     if args.parse_package_filter:
         generator.export_package_filters()
         print("Exported package_filters.txt (if present).")
     if args.parse_python_packages_1:
-        generator.parse_python_packages_1()
+        with generator.spans.span("parse_python_packages_1"):
+            generator.parse_python_packages_1()
     if args.parse_python_packages_2:
-        generator.parse_python_packages_2()
+        with generator.spans.span("parse_python_packages_2"):
+            generator.parse_python_packages_2()
     if args.parse_cpp:
         generator.extract_python_version_and_update_cppdep()
         generator.generate()
         print("Parsed dependencies and generated SBOM.")
+    if args.backfill:
+        backfill(args.backfill, repo=args.repo, jobs=args.jobs, output_dir=args.output_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parse-cmakelists', action='store_true')
+    parser.add_argument('--full-scan', action='store_true', help='Ignore the externals index and re-extract every package')
+    parser.add_argument('--parse-package-filter', action='store_true')
+    parser.add_argument('--parse-python-packages-1', action='store_true')
+    parser.add_argument('--parse-python-packages-2', action='store_true')
+    parser.add_argument('--parse-cpp', action='store_true')
+    parser.add_argument('--fast-writer', action='store_true', help='Write CycloneDX JSON directly instead of through the cyclonedx model')
+    parser.add_argument('--backfill', metavar='REV_RANGE', help='Rebuild SBOM history for an AtlasExternals commit range, e.g. 2.0.120..2.0.140')
+    parser.add_argument('--repo', default='AtlasExternals', help='AtlasExternals clone used by --backfill')
+    parser.add_argument('--jobs', type=int, default=None, help='Worker processes for --backfill')
+    parser.add_argument('--output-dir', default='SBOMs-backfill',
+                        help='Directory receiving backfilled versions. With SBOMs they are numbered after the existing versions, '
+                             'so the next daily run compares against the last backfilled commit')
+    parser.add_argument('--profile', action='store_true', help='Write a cProfile dump and tracemalloc peak for this run to logs/profiles')
+    args = parser.parse_args()
+
+    if args.profile:
+        with profiled(" ".join(["AnalysisBase"] + sys.argv[1:])):
+            run(args)
+    else:
+        run(args)
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
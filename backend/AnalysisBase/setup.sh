@@ -2,7 +2,7 @@
 set -e
 
 # --- Cleanup ---
-rm -f cppDep.txt stat-analysis-sbom.json stat-analysis-sbom.md
+rm -f cppDep.txt depGraph.txt stat-analysis-sbom.json stat-analysis-sbom.md
 rm -rf AtlasExternals
 
 # --- Clone Atlas Externals ---
@@ -51,6 +51,6 @@ echo "Versioning and saving SBOM..."
 python3 version_sbom.py
 
 # Clean up temporary files
-rm -f cppDep.txt pyDep.txt package_filters.txt 
+rm -f cppDep.txt pyDep.txt depGraph.txt package_filters.txt 
 
 echo "SBOM generation complete!"
\ No newline at end of file
@@ -4,9 +4,13 @@ SBOM Generator for Athena
 
 import re
 import os
+import json
+import hashlib
+import sys
 from pathlib import Path
 from typing import Optional, Set, List, Dict
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
 from cyclonedx.model.bom import Bom, BomMetaData
 from cyclonedx.model.component import Component, ComponentType
 from cyclonedx.model import Property
@@ -17,11 +21,24 @@ import argparse
 import urllib.request
 import urllib.error
 
+# Shared helpers live in the backend directory next to app.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cyclonedx_writer import write_bom_json, bom_json
+from sbom_common import (GitTreeReader, bom_ref, canonical_json, git_changed_packages, git_head, list_backfill_commits,
+                         parse_package_filters, reproducible_timestamp)
+from sbom_store import (build_properties, exists, get_policy_violations, get_sbom_signature, latest_version, policy_properties,
+                        read_bytes, store_version, version_lock)
+from build_log import parse_build_log
+from spans import StageSpans
+from profiling import profiled
+from policy import load_policy
+from dep_graph import cmake_dependencies, resolve_edges, rules_fingerprint
+
 @dataclass
 class Dependency:
     name: str
     version: Optional[str] = None
-    source: str = ""
+    source: str = ""  # LCG Website, AtlasExternals, PyModules or cppDep.txt
     file_path: str = ""
 
     def __hash__(self):
@@ -31,12 +48,62 @@ class Dependency:
         return isinstance(other, Dependency) and (self.name, self.version) == (other.name, other.version)
 
 
+ATLASEXTERNALS_VERSION_PATTERNS = {
+    "Acts": [r'Acts[-_/]?([0-9.]+)\.tar\.gz', r'acts[-_/]?([0-9.]+)\.tar\.gz'],
+    "CLHEP": [r'CLHEP[-_/]?([0-9.]+)\.tar\.gz', r'clhep[-_/]?([0-9.]+)\.tar\.gz'],
+    "Coin3D": [r'Coin3D[-_/]?([0-9.]+)\.tar\.gz', r'coin3d[-_/]?([0-9.]+)\.tar\.gz'],
+    "COOL": [r'COOL[-_/]?([0-9.]+)\.tar\.gz', r'cool[-_/]?([0-9.]+)\.tar\.gz'],
+    "CORAL": [r'CORAL[-_/]?([0-9.]+)\.tar\.gz', r'coral[-_/]?([0-9.]+)\.tar\.gz'],
+    "Gaudi": [r'Gaudi[-_/]?([0-9.]+)\.tar\.gz', r'gaudi[-_/]?([0-9.]+)\.tar\.gz'],
+    "Geant4": [r'Geant4[-_/]?([0-9.]+)\.tar\.gz', r'geant4[-_/]?([0-9.]+)\.tar\.gz'],
+    "GeoModel": [r'GeoModel[-_/]?([0-9.]+)\.tar\.gz', r'geomodel[-_/]?([0-9.]+)\.tar\.gz'],
+    "GoogleTest": [r'googletest-([0-9.]+)\.tar\.gz', r'GoogleTest[-_/]?([0-9.]+)\.tar\.gz'],
+    "lwtnn": [r'lwtnn[/\\]v?([0-9.]+)\.tar\.gz', r'externals/lwtnn/v?([0-9.]+)\.tar\.gz'],
+    "onnxruntime": [r'onnxruntime[-\w]*-([0-9.]+)\.(?:tgz|tar\.gz)'],
+    "nlohmann_json": [r'json-([0-9.]+)\.tar\.gz', r'nlohmann_json[-_/]?([0-9.]+)\.tar\.gz'],
+    "PyModules": [],  # Special handling
+}
+
+GENERIC_VERSION_PATTERNS = [
+    r'/sources/[^/]+-([0-9A-Za-z\._\-]+)\.tar\.gz',
+    r'[-_/]v?([0-9]+\.[0-9]+\.[0-9A-Za-z\._\-]+)\.tar\.gz',
+    r'[-_/]v?([0-9]+\.[0-9A-Za-z\._\-]+)\.tar\.gz',
+    r'([0-9]{6,})\.tar\.gz'
+]
+
+PYMODULES_REQUIREMENTS = ["requirements.txt.in", "requirements_athena.txt.in"]
+
+# Source version recorded in the metadata unless the caller supplies it
+ATHENA_VERSION = "24.0"
+
+
+def _extractor_fingerprint() -> str:
+    """Hash of the extraction rules, so an index built with older rules is not reused"""
+    rules = json.dumps([ATLASEXTERNALS_VERSION_PATTERNS, GENERIC_VERSION_PATTERNS, PYMODULES_REQUIREMENTS, rules_fingerprint()], sort_keys=True)
+    return hashlib.sha1(rules.encode("utf-8")).hexdigest()
+
+
 class SBOMGenerator:
     def __init__(self):
         base = os.path.dirname(__file__)
         self.cpp_file = Path(os.path.join(base, "cppDep.txt"))
+        self.externals_index_file = Path(os.path.join(base, "externals_index.json"))
         self.dependencies: Set[Dependency] = set()
+        # Package name -> names of the packages it depends on, from the CMake files
+        self.edges: Dict[str, List[str]] = {}
+        # AtlasExternals file contents by absolute path; generate_all.py shares one between projects
+        self.read_cache: Dict[str, Optional[str]] = {}
+        # Stream JSON straight from the dependency set instead of via the cyclonedx model
+        self.fast_writer = os.environ.get("SBOM_FAST_WRITER") == "1"
+        # Use the recorded LCG release page instead of fetching lcginfo.cern.ch
+        self.offline = os.environ.get("SBOM_OFFLINE") == "1"
         self.build_info = {}
+        # Input bytes consumed so far, reported per stage by the timing spans
+        self.bytes_read = 0
+        self.spans = StageSpans("Athena", lambda: self.bytes_read)
+        # Dependency policy checked before serializing; None without a policy file
+        self.policy = load_policy("Athena")
+        self.policy_violations: Optional[List[Dict]] = None
 
     def parse_build_info(self, build_txt_path="externalBuild.txt") -> Dict:
         """Parse externalBuild.txt to extract LCG version, platform, package list, and compiler info"""
@@ -57,61 +124,9 @@ class SBOMGenerator:
             return result
         
         try:
-            with open(build_txt_path, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                
-                # Parse line 1: C compiler
-                if len(lines) > 0:
-                    c_line = lines[0].strip()
-                    c_match = re.search(r'The C compiler identification is (.+)', c_line)
-                    if c_match:
-                        result['C Compiler'] = c_match.group(1)
-                
-                # Parse line 2: CXX compiler
-                if len(lines) > 1:
-                    cxx_line = lines[1].strip()
-                    cxx_match = re.search(r'The CXX compiler identification is (.+)', cxx_line)
-                    if cxx_match:
-                        result['CXX Compiler'] = cxx_match.group(1)
-                
-                # Parse LCG version and platform
-                for line in lines:
-                    line = line.strip()
-                    # Pattern: LCG release "LCG_106b_ATLAS_1" for platform: x86_64-el9-gcc13-opt
-                    lcg_match = re.search(r'LCG release "LCG_([^"]+)" for platform: (.+)', line)
-                    if lcg_match:
-                        result['lcg_version'] = lcg_match.group(1)
-                        result['platform'] = lcg_match.group(2)
-                        break
-                
-                # Parse platform name - search for "Using platform name:" line
-                for line in lines:
-                    line = line.strip()
-                    platform_match = re.search(r'Using platform name: (.+)', line)
-                    if platform_match:
-                        result['Platform'] = platform_match.group(1)
-                        break
-                
-                # Parse package filtering rules
-                in_package_section = False
-                for line in lines:
-                    line = line.strip()
-                    if 'Package filtering rules read:' in line:
-                        in_package_section = True
-                        continue
-                    if in_package_section:
-                        # Stop at the next section or empty line after packages
-                        if line.startswith('-- Configuring') or (line == '' and result['packages']):
-                            break
-                        # Extract package names from lines like: "--   + External/Acts"
-                        pkg_match = re.search(r'--\s+\+\s+External/(.+)', line)
-                        if pkg_match:
-                            pkg_name = pkg_match.group(1).strip()
-                            result['packages'].append(pkg_name)
-                        elif line.startswith('--   -'):
-                            # End of package list
-                            break
-                            
+            # One streaming pass over the log, stopping once every field is found
+            self.bytes_read += os.path.getsize(build_txt_path)
+            result = parse_build_log(build_txt_path) or result
         except Exception as e:
             print(f"Failed to parse build info: {e}")
         
@@ -125,27 +140,32 @@ class SBOMGenerator:
         html_content = None
         
         # Try to fetch from URL
-        try:
-            print(f"Fetching LCG packages from: {url}")
-            with urllib.request.urlopen(url, timeout=30) as response:
-                html_content = response.read().decode('utf-8')
-                print(f"Successfully fetched HTML from LCG website")
-        except urllib.error.URLError as e:
-            print(f"Failed to fetch from URL: {e}")
-            # Try fallback to local file
-            if fallback_html_path:
-                fallback_path = os.path.join(os.path.dirname(__file__), fallback_html_path)
-                if os.path.exists(fallback_path):
-                    print(f"Using fallback HTML file: {fallback_path}")
-                    try:
-                        with open(fallback_path, "r", encoding="utf-8") as f:
-                            html_content = f.read()
-                    except Exception as e2:
-                        print(f"Failed to read fallback file: {e2}")
+        if self.offline:
+            print(f"Offline mode, not fetching {url}")
+        else:
+            try:
+                print(f"Fetching LCG packages from: {url}")
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    html_content = response.read().decode('utf-8')
+                    print(f"Successfully fetched HTML from LCG website")
+            except urllib.error.URLError as e:
+                print(f"Failed to fetch from URL: {e}")
+        
+        # Try fallback to local file
+        if not html_content and fallback_html_path:
+            fallback_path = os.path.join(os.path.dirname(__file__), fallback_html_path)
+            if os.path.exists(fallback_path):
+                print(f"Using fallback HTML file: {fallback_path}")
+                try:
+                    with open(fallback_path, "r", encoding="utf-8") as f:
+                        html_content = f.read()
+                except Exception as e2:
+                    print(f"Failed to read fallback file: {e2}")
         
         if not html_content:
             print("Warning: No HTML content available for parsing")
             return {}
+        self.bytes_read += len(html_content)
         
         # Parse HTML using regex (simpler than BeautifulSoup)
         packages = {}
@@ -234,8 +254,94 @@ class SBOMGenerator:
         print(f"Found {len(missing)} packages not in LCG website: {missing}")
         return missing
 
+    def _extract_package(self, pkg: str, read_file) -> Optional[Dict]:
+        """Extract version information for External/<pkg>.
+
+        read_file(relpath) returns the content of a file relative to the
+        External directory, or None if it does not exist. Returns
+        {'version': ...} for regular packages, {'requirements': [[name, version, file], ...]}
+        for PyModules, or None if nothing could be extracted. Either dict also
+        carries 'depends', the packages named by find_package/DEPENDS, if any.
+        """
+        content = read_file(f"{pkg}/CMakeLists.txt")
+        if content is None:
+            content = read_file(f"{pkg}/cmake/CMakeLists.txt")
+            if content is None:
+                print(f"CMakeLists.txt not found for {pkg}")
+                return None
+        depends = cmake_dependencies(pkg, content)
+
+        # Special handling for PyModules
+        if pkg == "PyModules":
+            requirements = []
+            for rf in PYMODULES_REQUIREMENTS:
+                req = read_file(f"{pkg}/{rf}")
+                if req is None:
+                    continue
+                for line in req.splitlines():
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    m = re.match(r'^([A-Za-z0-9_\-]+)==([^\s]+)', line)
+                    if m:
+                        pkgname, pkgver = m.groups()
+                        requirements.append([pkgname, pkgver, f"{pkg}/{rf}"])
+            result = {'requirements': requirements}
+            if depends:
+                result['depends'] = depends
+            return result
+
+        # Generic version extraction
+        found_version = None
+        for rx in ATLASEXTERNALS_VERSION_PATTERNS.get(pkg, []):
+            m = re.search(rx, content)
+            if m:
+                found_version = m.group(1)
+                break
+
+        # Fallback to generic patterns
+        if not found_version:
+            for rx in GENERIC_VERSION_PATTERNS:
+                m = re.search(rx, content)
+                if m:
+                    found_version = m.group(1)
+                    break
+
+        if not found_version:
+            print(f"Could not find version for {pkg}")
+            return None
+        result = {'version': found_version}
+        if depends:
+            result['depends'] = depends
+        return result
+
+    def _load_externals_index(self) -> Dict:
+        """Load the per-package results recorded by the previous run"""
+        if not self.externals_index_file.exists():
+            return {}
+        try:
+            with open(self.externals_index_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable externals index {self.externals_index_file}: {e}")
+            return {}
+
+    def _save_externals_index(self, commit: str, packages: Dict[str, Optional[Dict]]):
+        """Record per-package results and the AtlasExternals commit they came from"""
+        index = {
+            'commit': commit,
+            'fingerprint': _extractor_fingerprint(),
+            'packages': packages,
+        }
+        try:
+            with open(self.externals_index_file, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2, sort_keys=True)
+        except Exception as e:
+            print(f"Failed to write externals index: {e}")
+
     def parse_atlasexternals_packages(self, missing_packages: List[str], 
-                                      atlasexternals_path: str = "AtlasExternals") -> Dict[str, str]:
+                                      atlasexternals_path: str = "AtlasExternals",
+                                      full_scan: bool = False) -> Dict[str, str]:
         """Parse CMakeLists.txt files from AtlasExternals repo for missing packages"""
         base_dir = os.path.dirname(os.path.abspath(__file__))
         atlasexternals_path = os.path.join(base_dir, atlasexternals_path)
@@ -246,107 +352,74 @@ class SBOMGenerator:
             print(f"AtlasExternals directory not found: {atlasexternals_path}")
             return packages
         
-        # Patterns similar to AnalysisBase
-        patterns = {
-            "Acts": [r'Acts[-_/]?([0-9.]+)\.tar\.gz', r'acts[-_/]?([0-9.]+)\.tar\.gz'],
-            "CLHEP": [r'CLHEP[-_/]?([0-9.]+)\.tar\.gz', r'clhep[-_/]?([0-9.]+)\.tar\.gz'],
-            "Coin3D": [r'Coin3D[-_/]?([0-9.]+)\.tar\.gz', r'coin3d[-_/]?([0-9.]+)\.tar\.gz'],
-            "COOL": [r'COOL[-_/]?([0-9.]+)\.tar\.gz', r'cool[-_/]?([0-9.]+)\.tar\.gz'],
-            "CORAL": [r'CORAL[-_/]?([0-9.]+)\.tar\.gz', r'coral[-_/]?([0-9.]+)\.tar\.gz'],
-            "Gaudi": [r'Gaudi[-_/]?([0-9.]+)\.tar\.gz', r'gaudi[-_/]?([0-9.]+)\.tar\.gz'],
-            "Geant4": [r'Geant4[-_/]?([0-9.]+)\.tar\.gz', r'geant4[-_/]?([0-9.]+)\.tar\.gz'],
-            "GeoModel": [r'GeoModel[-_/]?([0-9.]+)\.tar\.gz', r'geomodel[-_/]?([0-9.]+)\.tar\.gz'],
-            "GoogleTest": [r'googletest-([0-9.]+)\.tar\.gz', r'GoogleTest[-_/]?([0-9.]+)\.tar\.gz'],
-            "lwtnn": [r'lwtnn[/\\]v?([0-9.]+)\.tar\.gz', r'externals/lwtnn/v?([0-9.]+)\.tar\.gz'],
-            "onnxruntime": [r'onnxruntime[-\w]*-([0-9.]+)\.(?:tgz|tar\.gz)'],
-            "nlohmann_json": [r'json-([0-9.]+)\.tar\.gz', r'nlohmann_json[-_/]?([0-9.]+)\.tar\.gz'],
-            "PyModules": [],  # Special handling
-        }
-        
         external_dir = os.path.join(atlasexternals_path, "External")
         if not os.path.isdir(external_dir):
             print(f"External directory not found: {external_dir}")
             return packages
         
-        for pkg in missing_packages:
-            pkg_dir = os.path.join(external_dir, pkg)
-            if not os.path.isdir(pkg_dir):
-                print(f"Package directory not found: {pkg_dir}")
-                continue
-            
-            cmake_path = os.path.join(pkg_dir, "CMakeLists.txt")
-            if not os.path.isfile(cmake_path):
-                alt_path = os.path.join(pkg_dir, "cmake", "CMakeLists.txt")
-                if os.path.isfile(alt_path):
-                    cmake_path = alt_path
-                else:
-                    print(f"CMakeLists.txt not found for {pkg}")
-                    continue
-            
-            # Read CMakeLists.txt
+        # Only re-extract packages whose External/<pkg> directory changed since
+        # the commit recorded by the last run; everything else comes from the index
+        commit = git_head(external_dir)
+        index = {} if full_scan else self._load_externals_index()
+        previous = {}
+        changed = None
+        if commit and index.get('commit') and index.get('fingerprint') == _extractor_fingerprint():
+            changed = git_changed_packages(external_dir, index['commit'], commit)
+            if changed is not None:
+                previous = index.get('packages', {})
+                print(f"Incremental scan against {index['commit'][:12]}: {len(changed)} changed package dir(s)")
+        
+        def read_file(relpath):
+            path = os.path.join(external_dir, relpath)
+            if path in self.read_cache:
+                return self.read_cache[path]
+            if not os.path.isfile(path):
+                self.read_cache[path] = None
+                return None
             try:
-                with open(cmake_path, "r", encoding="utf-8") as f:
+                with open(path, "r", encoding="utf-8") as f:
                     content = f.read()
+                self.bytes_read += len(content)
             except Exception as e:
-                print(f"Failed to read {cmake_path}: {e}")
+                print(f"Failed to read {path}: {e}")
+                return None
+            self.read_cache[path] = content
+            return content
+        
+        results = {}
+        reused = 0
+        for pkg in missing_packages:
+            if changed is not None and pkg in previous and pkg not in changed:
+                results[pkg] = previous[pkg]
+                reused += 1
                 continue
-            
-            # Special handling for PyModules
-            if pkg == "PyModules":
-                req_files = ["requirements.txt.in", "requirements_athena.txt.in"]
-                for rf in req_files:
-                    rfpath = os.path.join(pkg_dir, rf)
-                    if os.path.isfile(rfpath):
-                        try:
-                            with open(rfpath, "r", encoding="utf-8") as rfh:
-                                for line in rfh:
-                                    line = line.strip()
-                                    if not line or line.startswith("#"):
-                                        continue
-                                    m = re.match(r'^([A-Za-z0-9_\-]+)==([^\s]+)', line)
-                                    if m:
-                                        pkgname, pkgver = m.groups()
-                                        # Add to dependencies set
-                                        self.dependencies.add(Dependency(
-                                            name=pkgname,
-                                            version=pkgver,
-                                            source="PyModules",
-                                            file_path=rfpath
-                                        ))
-                        except Exception as e:
-                            print(f"Failed to parse {rfpath}: {e}")
+            if not os.path.isdir(os.path.join(external_dir, pkg)):
+                print(f"Package directory not found: {os.path.join(external_dir, pkg)}")
+                results[pkg] = None
                 continue
-            
-            # Generic version extraction
-            found_version = None
-            regex_list = patterns.get(pkg, [])
-            
-            for rx in regex_list:
-                m = re.search(rx, content)
-                if m:
-                    found_version = m.group(1)
-                    break
-            
-            # Fallback to generic patterns
-            if not found_version:
-                generic_patterns = [
-                    r'/sources/[^/]+-([0-9A-Za-z\._\-]+)\.tar\.gz',
-                    r'[-_/]v?([0-9]+\.[0-9]+\.[0-9A-Za-z\._\-]+)\.tar\.gz',
-                    r'[-_/]v?([0-9]+\.[0-9A-Za-z\._\-]+)\.tar\.gz',
-                    r'([0-9]{6,})\.tar\.gz'
-                ]
-                for rx in generic_patterns:
-                    m = re.search(rx, content)
-                    if m:
-                        found_version = m.group(1)
-                        break
-            
-            if found_version:
-                packages[pkg] = found_version
-                print(f"Discovered {pkg}: {found_version} from AtlasExternals")
-            else:
-                print(f"Could not find version for {pkg}")
+            results[pkg] = self._extract_package(pkg, read_file)
+        if changed is not None:
+            print(f"Reused {reused} package(s) from the externals index, re-extracted {len(results) - reused}")
         
+        for pkg, result in results.items():
+            if not result:
+                continue
+            if result.get('depends'):
+                self.edges[pkg] = result['depends']
+            for pkgname, pkgver, rel_file in result.get('requirements', []):
+                # Add to dependencies set
+                self.dependencies.add(Dependency(
+                    name=pkgname,
+                    version=pkgver,
+                    source="PyModules",
+                    file_path=os.path.join(external_dir, rel_file)
+                ))
+            if result.get('version'):
+                packages[pkg] = result['version']
+                print(f"Discovered {pkg}: {result['version']} from AtlasExternals")
+        
+        if commit:
+            self._save_externals_index(commit, results)
         return packages
 
     def parse_cpp_deps(self):
@@ -357,6 +430,7 @@ class SBOMGenerator:
 
         pattern = r"^([A-Za-z0-9_\-]+)\s*:\s*(.*)$"
 
+        self.bytes_read += self.cpp_file.stat().st_size
         with open(self.cpp_file, "r", encoding="utf-8") as f:
             for line in f:
                 line = line.strip()
@@ -367,38 +441,83 @@ class SBOMGenerator:
                     continue
                 name, version_raw = m.groups()
                 version = version_raw.split()[0] if version_raw else "undefined"
-                self.dependencies.add(Dependency(name=name, version=version, source=str(self.cpp_file)))
+                self.dependencies.add(Dependency(name=name, version=version, source=self.cpp_file.name))
+
+    def check_policy(self) -> List[Dict]:
+        """Check the dependency set against the policy; the result is recorded in the SBOM metadata"""
+        if self.policy is None:
+            return []
+        self.policy_violations = self.policy.check((dep.name, dep.version, dep.source) for dep in self.dependencies)
+        for violation in self.policy_violations:
+            print(f"Policy violation: {violation['message']}")
+        return self.policy_violations
+
+    @staticmethod
+    def _properties(dep: Dependency):
+        """Component (name, value) pairs: where it came from"""
+        return [("source", dep.source)] if dep.source else []
 
-    def generate_cyclonedx_sbom(self, athena_version="24.0") -> str:
+    def _component_rows(self):
+        """Component rows for the direct CycloneDX writer"""
+        return [(bom_ref(dep), dep.name, dep.version or "undefined", self._properties(dep)) for dep in self.dependencies]
+
+    def _dependency_refs(self) -> Dict[str, List[str]]:
+        """bom-ref -> bom-refs it depends on, for the CycloneDX dependencies section"""
+        return resolve_edges(((bom_ref(dep), dep.name) for dep in self.dependencies), self.edges)
+
+    def _metadata_properties(self, athena_version, build_info=None):
+        """Metadata (name, value) pairs: source version plus build info"""
+        properties = [("Athena", athena_version)] + build_properties(build_info)
+        if self.policy_violations is not None:
+            properties += policy_properties(self.policy.digest, self.policy_violations)
+        return properties
+
+    def generate_cyclonedx_sbom(self, athena_version=ATHENA_VERSION, build_info=None) -> str:
         """Generate CycloneDX SBOM"""
+        properties = self._metadata_properties(athena_version, build_info)
+        if self.fast_writer:
+            return bom_json(self._component_rows(), properties=properties, timestamp=reproducible_timestamp(),
+                            dependencies=self._dependency_refs())
         metadata = BomMetaData(
-            properties=[
-                Property(name="Athena", value=athena_version),
-            ]
+            properties=[Property(name=name, value=value) for name, value in properties]
         )
+        # BomMetaData defaults to the current time; drop it unless SOURCE_DATE_EPOCH is set
+        metadata.timestamp = reproducible_timestamp()
         bom = Bom(metadata=metadata)
+        components = {}
         for dep in sorted(self.dependencies, key=lambda x: x.name.lower()):
             component = Component(
                 name=dep.name,
                 version=dep.version or "undefined",
-                type=ComponentType.LIBRARY
+                type=ComponentType.LIBRARY,
+                bom_ref=bom_ref(dep)
             )
+            for name, value in self._properties(dep):
+                component.properties.add(Property(name=name, value=value))
             bom.components.add(component)
+            components[bom_ref(dep)] = component
+        for ref, targets in self._dependency_refs().items():
+            bom.register_dependency(components[ref], [components[target] for target in targets])
         outputter = make_outputter(
             bom=bom,
             output_format=OutputFormat.JSON,
             schema_version=SchemaVersion.V1_4
         )
-        return outputter.output_as_string()
+        return canonical_json(outputter.output_as_string())
 
-    def save_sbom(self, output_path="athena-sbom.json"):
+    def save_sbom(self, output_path="athena-sbom.json", athena_version=ATHENA_VERSION, build_info=None):
         """Save SBOM to JSON file"""
-        sbom_json = self.generate_cyclonedx_sbom()
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(sbom_json)
+        if self.fast_writer:
+            with open(output_path, "w", encoding="utf-8") as f:
+                write_bom_json(f, self._component_rows(), properties=self._metadata_properties(athena_version, build_info), timestamp=reproducible_timestamp(),
+                               dependencies=self._dependency_refs())
+        else:
+            sbom_json = self.generate_cyclonedx_sbom(athena_version, build_info)
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(sbom_json)
         print(f"SBOM saved to {output_path}")
 
-    def generate_markdown_report(self, athena_version="24.0", build_info=None) -> str:
+    def generate_markdown_report(self, athena_version=ATHENA_VERSION, build_info=None) -> str:
         """Generate Markdown report"""
         md = []
         md.append("# Athena SBOM Report\n")
@@ -425,6 +544,14 @@ class SBOMGenerator:
         md.append("|--------|---------|")
         md.append(f"| Athena | {athena_version} |\n")
         
+        if self.policy_violations:
+            md.append("## Policy Violations\n")
+            md.append("| Rule | Package | Version | Detail |")
+            md.append("|------|---------|---------|--------|")
+            for violation in self.policy_violations:
+                md.append(f"| {violation['rule']} | {violation['component']} | {violation['version']} | {violation['message']} |")
+            md.append("")
+
         if self.dependencies:
             md.append("## All Dependencies\n")
             md.append("| Package | Version |")
@@ -434,17 +561,20 @@ class SBOMGenerator:
             md.append("")
         return "\n".join(md)
 
-    def save_markdown_report(self, output_path="athena-sbom.md", build_info=None):
+    def save_markdown_report(self, output_path="athena-sbom.md", athena_version=ATHENA_VERSION, build_info=None):
         """Save Markdown report"""
-        md_content = self.generate_markdown_report(build_info=build_info)
+        md_content = self.generate_markdown_report(athena_version, build_info)
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(md_content)
         print(f"Markdown report saved to {output_path}")
 
-    def generate(self, output_json="athena-sbom.json", output_md="athena-sbom.md"):
+    def generate(self, output_json="athena-sbom.json", output_md="athena-sbom.md", full_scan=False,
+                 atlasexternals_path="AtlasExternals"):
         """Main generation method"""
-        print("Parsing build log...")
-        build_info = self.parse_build_info()
+        with self.spans.span("parse_build_info") as span:
+            print("Parsing build log...")
+            build_info = self.parse_build_info()
+            span['items'] = len(build_info['packages'])
         
         if not build_info.get('lcg_version') or not build_info.get('platform'):
             print("Error: Could not extract LCG version or platform from build log")
@@ -455,12 +585,14 @@ class SBOMGenerator:
         print(f"Packages from build log: {len(build_info['packages'])}")
         
         # Fetch and parse LCG packages
-        print("Fetching and parsing LCG website packages...")
-        lcg_packages = self.fetch_and_parse_lcg_packages(
-            build_info['lcg_version'],
-            build_info['platform'],
-            fallback_html_path="ExampleLcgInfoWebsiteHtmlCode.html"
-        )
+        with self.spans.span("fetch_and_parse_lcg_packages") as span:
+            print("Fetching and parsing LCG website packages...")
+            lcg_packages = self.fetch_and_parse_lcg_packages(
+                build_info['lcg_version'],
+                build_info['platform'],
+                fallback_html_path="ExampleLcgInfoWebsiteHtmlCode.html"
+            )
+            span['items'] = len(lcg_packages)
         
         # Add LCG packages to dependencies
         for pkg_name, version in lcg_packages.items():
@@ -471,13 +603,18 @@ class SBOMGenerator:
             ))
         
         # Find missing packages
-        print("Comparing packages...")
-        missing_packages = self.find_missing_packages(build_info['packages'], lcg_packages)
+        with self.spans.span("find_missing_packages") as span:
+            print("Comparing packages...")
+            missing_packages = self.find_missing_packages(build_info['packages'], lcg_packages)
+            span['items'] = len(missing_packages)
         
         # Parse AtlasExternals for missing packages
         if missing_packages:
-            print(f"Parsing AtlasExternals for {len(missing_packages)} missing packages...")
-            atlasexternals_packages = self.parse_atlasexternals_packages(missing_packages)
+            with self.spans.span("parse_atlasexternals_packages") as span:
+                print(f"Parsing AtlasExternals for {len(missing_packages)} missing packages...")
+                atlasexternals_packages = self.parse_atlasexternals_packages(missing_packages, atlasexternals_path,
+                                                                             full_scan=full_scan)
+                span['items'] = len(atlasexternals_packages)
             
             # Add AtlasExternals packages to dependencies
             for pkg_name, version in atlasexternals_packages.items():
@@ -488,26 +625,157 @@ class SBOMGenerator:
                 ))
         
         # Parse any additional dependencies from cppDep.txt
-        print("Parsing C++ dependencies from cppDep.txt...")
-        self.parse_cpp_deps()
+        with self.spans.span("parse_cpp_deps") as span:
+            print("Parsing C++ dependencies from cppDep.txt...")
+            before = len(self.dependencies)
+            self.parse_cpp_deps()
+            span['items'] = len(self.dependencies) - before
         
         print(f"Found {len(self.dependencies)} dependencies total.")
         
-        # Generate reports
-        self.save_sbom(output_json)
-        self.save_markdown_report(output_md, build_info=build_info)
+        if self.policy is not None:
+            with self.spans.span("policy") as span:
+                span['items'] = len(self.check_policy())
+        
+        # Generate reports; build info is recorded in the SBOM metadata
+        with self.spans.span("serialize") as span:
+            self.save_sbom(output_json, build_info=build_info)
+            span['items'] = len(self.dependencies)
+            span['bytes_written'] = os.path.getsize(output_json)
+        with self.spans.span("markdown") as span:
+            self.save_markdown_report(output_md, build_info=build_info)
+            span['items'] = len(self.dependencies)
+            span['bytes_written'] = os.path.getsize(output_md)
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--parse-cpp', action='store_true', help='Parse dependencies and generate SBOM')
-    args = parser.parse_args()
+def _backfill_commit(task):
+    """Build the SBOM a given AtlasExternals commit would have produced (runs in a worker process)"""
+    repo_dir, commit, commit_time, build_packages, lcg_packages = task
+    reader = GitTreeReader(repo_dir, commit)
+    generator = SBOMGenerator()
+    try:
+        filters = reader.read("Projects/AthenaExternals/package_filters.txt")
+        packages = parse_package_filters(filters) if filters else list(build_packages)
+        
+        for pkg_name, version in lcg_packages.items():
+            generator.dependencies.add(Dependency(name=pkg_name, version=version, source="LCG Website"))
+        
+        read_file = lambda relpath: reader.read(f"External/{relpath}")
+        for pkg in generator.find_missing_packages(packages, lcg_packages):
+            result = generator._extract_package(pkg, read_file)
+            if not result:
+                continue
+            if result.get('depends'):
+                generator.edges[pkg] = result['depends']
+            for pkgname, pkgver, rel_file in result.get('requirements', []):
+                generator.dependencies.add(Dependency(name=pkgname, version=pkgver, source="PyModules",
+                                                      file_path=f"{commit}:External/{rel_file}"))
+            if result.get('version'):
+                generator.dependencies.add(Dependency(name=pkg, version=result['version'], source="AtlasExternals"))
+    finally:
+        reader.close()
+    generator.check_policy()
+    # externalBuild.txt describes today's build, not this commit's, so no build info is recorded
+    return commit, commit_time, generator.generate_cyclonedx_sbom(), generator.generate_markdown_report()
+
+
+def backfill(rev_range: str, repo: str = "AtlasExternals", jobs: Optional[int] = None, output_dir: str = "SBOMs-backfill"):
+    """Write one <output_dir>/vN per AtlasExternals commit in rev_range, ordered by commit date.
 
+    The LCG release is taken from the current externalBuild.txt and fetched
+    once; each commit contributes its own package_filters.txt and External/
+    CMake files. The compilers and platform of that log are not recorded,
+    as they describe today's build. Consecutive commits yielding an
+    identical SBOM are collapsed into one version, and commits violating an
+    enforced policy are skipped, matching what the daily run would have stored.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    repo_dir = os.path.join(base_dir, repo)
+    
+    commits = list_backfill_commits(repo_dir, rev_range, ["External", "Projects/AthenaExternals"])
+    if not commits:
+        print(f"No AtlasExternals commits found in {rev_range}")
+        return
+    
+    build_info = SBOMGenerator().parse_build_info()
+    lcg_packages = {}
+    if build_info.get('lcg_version') and build_info.get('platform'):
+        lcg_packages = SBOMGenerator().fetch_and_parse_lcg_packages(
+            build_info['lcg_version'],
+            build_info['platform'],
+            fallback_html_path="ExampleLcgInfoWebsiteHtmlCode.html"
+        )
+    print(f"Backfilling {len(commits)} commit(s) from {rev_range} with {jobs or os.cpu_count()} worker(s)...")
+    
+    sboms_dir = Path(base_dir) / output_dir
+    sboms_dir.mkdir(parents=True, exist_ok=True)
+    # Compare the first backfilled SBOM with the newest version already stored
+    previous_signature = None
+    _, latest_dir = latest_version(sboms_dir)
+    if latest_dir and exists(latest_dir / "athena-sbom.json"):
+        previous_signature = get_sbom_signature(json.loads(read_bytes(latest_dir / "athena-sbom.json")))
+    written = 0
+    policy = load_policy("Athena")
+    enforced = policy is not None and policy.enforce
+    tasks = [(repo_dir, sha, ctime, build_info.get('packages', []), lcg_packages) for sha, ctime in commits]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # map() yields in submission order, i.e. by commit date
+        for commit, commit_time, sbom_json, md_content in pool.map(_backfill_commit, tasks, chunksize=4):
+            sbom_data = json.loads(sbom_json)
+            signature = get_sbom_signature(sbom_data)
+            if signature == previous_signature:
+                continue
+            # An enforced policy blocks the version, as in version_sbom.py; the next commit is compared with the last stored one
+            policy_result = get_policy_violations(sbom_data)
+            if enforced and policy_result and policy_result['count']:
+                print(f"{commit[:12]} skipped: {policy_result['count']} policy violation(s) under an enforced policy")
+                continue
+            previous_signature = signature
+            # Same lock as version_sbom.py and the API, so a parallel run never takes the same vN
+            with version_lock(sboms_dir):
+                next_version = latest_version(sboms_dir)[0] + 1
+                # Dated by the commit, so listings and archiving order it among the stored versions
+                store_version(sboms_dir / f"v{next_version}", {"athena-sbom.json": sbom_json, "athena-sbom.md": md_content},
+                              mtime=commit_time)
+            print(f"v{next_version} <- {commit[:12]} ({datetime.fromtimestamp(commit_time):%Y-%m-%d %H:%M})")
+            written += 1
+    print(f"Backfill complete: {written} version(s) written to {sboms_dir}")
+
+
+def run(args):
     generator = SBOMGenerator()
+    if args.fast_writer:
+        generator.fast_writer = True
+    if args.offline:
+        generator.offline = True
 
     if args.parse_cpp:
-        generator.generate()
+        generator.generate(full_scan=args.full_scan)
         print("SBOM generation complete.")
+    if args.backfill:
+        backfill(args.backfill, repo=args.repo, jobs=args.jobs, output_dir=args.output_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--parse-cpp', action='store_true', help='Parse dependencies and generate SBOM')
+    parser.add_argument('--full-scan', action='store_true', help='Ignore the externals index and re-extract every package')
+    parser.add_argument('--fast-writer', action='store_true', help='Write CycloneDX JSON directly instead of through the cyclonedx model')
+    parser.add_argument('--offline', action='store_true', help='Parse ExampleLcgInfoWebsiteHtmlCode.html instead of fetching the LCG release page')
+    parser.add_argument('--backfill', metavar='REV_RANGE', help='Rebuild SBOM history for an AtlasExternals commit range, e.g. 2.0.120..2.0.140')
+    parser.add_argument('--repo', default='AtlasExternals', help='AtlasExternals clone used by --backfill')
+    parser.add_argument('--jobs', type=int, default=None, help='Worker processes for --backfill')
+    parser.add_argument('--output-dir', default='SBOMs-backfill',
+                        help='Directory receiving backfilled versions. With SBOMs they are numbered after the existing versions, '
+                             'so the next daily run compares against the last backfilled commit')
+    parser.add_argument('--profile', action='store_true', help='Write a cProfile dump and tracemalloc peak for this run to logs/profiles')
+    args = parser.parse_args()
+
+    if args.profile:
+        with profiled(" ".join(["Athena"] + sys.argv[1:])):
+            run(args)
+    else:
+        run(args)
 
 
 if __name__ == "__main__":
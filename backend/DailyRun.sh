@@ -27,6 +27,8 @@ PROJECTS_RUN=0
 PROJECTS_SUCCESS=0
 PROJECTS_FAILED=0
 FAILED_PROJECTS=()
+# Projects already handled by generate_all.py; their setup.sh is skipped
+GENERATED_PROJECTS=()
 
 # Function to run a project's setup.sh
 run_project_setup() {
@@ -34,6 +36,10 @@ run_project_setup() {
     local project_dir="$SCRIPT_DIR/$project_name"
     local setup_script="$project_dir/setup.sh"
     
+    if [[ " ${GENERATED_PROJECTS[*]} " == *" $project_name "* ]]; then
+        return 0
+    fi
+    
     if [ ! -d "$project_dir" ]; then
         log "Warning: Project directory $project_name does not exist"
         return 1
@@ -67,6 +73,30 @@ run_project_setup() {
     fi
 }
 
+# Generate the known projects in one Python process (SBOM_SETUP_SCRIPTS=1 runs their setup.sh instead)
+if [ "${SBOM_SETUP_SCRIPTS:-0}" != "1" ]; then
+    log "Running generate_all.py..."
+    RESULTS_FILE="${LOG_FILE%.log}_results.txt"
+    python3 generate_all.py --results "$RESULTS_FILE" >> "$LOG_FILE" 2>&1
+    if [ -f "$RESULTS_FILE" ]; then
+        while read -r project_name outcome; do
+            GENERATED_PROJECTS+=("$project_name")
+            PROJECTS_RUN=$((PROJECTS_RUN + 1))
+            if [ "$outcome" = "ok" ]; then
+                log "✓ $project_name: SBOM generation completed successfully"
+                PROJECTS_SUCCESS=$((PROJECTS_SUCCESS + 1))
+            else
+                log "✗ $project_name: SBOM generation failed"
+                PROJECTS_FAILED=$((PROJECTS_FAILED + 1))
+                FAILED_PROJECTS+=("$project_name")
+            fi
+        done < "$RESULTS_FILE"
+        rm -f "$RESULTS_FILE"
+    else
+        log "Warning: generate_all.py did not report results; running setup.sh scripts"
+    fi
+fi
+
 # Run Athena and AnalysisBase first
 log "Running priority projects first..."
 run_project_setup "Athena"
@@ -94,6 +124,16 @@ for project_dir in */; do
     fi
 done
 
+# Move versions older than SBOM_ARCHIVE_AGE_DAYS (default 90) into each project's archive
+for sboms_dir in */SBOMs; do
+    if [ -d "$sboms_dir" ]; then
+        python3 sbom_store.py archive "$sboms_dir" >> "$LOG_FILE" 2>&1 || log "Warning: archiving $sboms_dir failed"
+    fi
+done
+
+# Match every stored version against the local advisory dump (skipped when there is none)
+python3 vulnerabilities.py scan */SBOMs >> "$LOG_FILE" 2>&1 || log "Warning: vulnerability scan failed"
+
 # Summary
 log "=== Daily Run Summary ==="
 log "Projects found: $PROJECTS_RUN"
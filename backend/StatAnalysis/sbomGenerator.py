@@ -1,12 +1,16 @@
 """
-SBOM Generator for StatAnalysis using pip freeze (pyDep.txt) and asetup output (cppDep.txt).
+SBOM Generator for StatAnalysis using the installed Python distributions
+(pyDist.json from dist_scan.py, or pip freeze output in pyDep.txt) and asetup
+output (cppDep.txt).
 """
 
+import argparse
 import json
+import os
 import re
 import sys
 from pathlib import Path
-from typing import Optional, Set
+from typing import Dict, List, Optional, Set
 from dataclasses import dataclass
 from cyclonedx.model.bom import Bom, BomMetaData
 from cyclonedx.model.component import Component, ComponentType
@@ -16,13 +20,25 @@ from cyclonedx.output import make_outputter, OutputFormat
 from cyclonedx.schema import SchemaVersion
 from datetime import datetime
 
+# Shared helpers live in the backend directory next to app.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cyclonedx_writer import write_bom_json, bom_json
+from sbom_common import bom_ref, canonical_json, reproducible_timestamp
+from sbom_store import policy_properties
+from spans import StageSpans
+from profiling import profiled
+from policy import load_policy
+import dist_scan
+
 
 @dataclass
 class Dependency:
     name: str
     version: Optional[str] = None
-    source: str = ""  # pyDep.txt or cppDep.txt
+    source: str = ""  # site-packages, pyDep.txt or cppDep.txt
     file_path: str = ""
+    license: Optional[str] = None
+    sha256: Optional[str] = None  # over the installed files' hashes
 
     def __hash__(self):
         return hash((self.name, self.version))
@@ -32,17 +48,43 @@ class Dependency:
 
 
 class SBOMGenerator:
-    def __init__(self, py_file="pyDep.txt", cpp_file="cppDep.txt"):
+    def __init__(self, py_file="pyDep.txt", cpp_file="cppDep.txt", dist_file="pyDist.json"):
         self.py_file = Path(py_file)
         self.cpp_file = Path(cpp_file)
+        self.dist_file = Path(dist_file)
+        # Scan the distributions under these prefixes in-process instead of reading a file; [] means sys.path
+        self.site_packages: Optional[List[str]] = None
         self.dependencies: Set[Dependency] = set()
+        # Stream JSON straight from the dependency set instead of via the cyclonedx model
+        self.fast_writer = os.environ.get("SBOM_FAST_WRITER") == "1"
+        # Input bytes consumed so far, reported per stage by the timing spans
+        self.bytes_read = 0
+        self.spans = StageSpans("StatAnalysis", lambda: self.bytes_read)
+        # Dependency policy checked before serializing; None without a policy file
+        self.policy = load_policy("StatAnalysis")
+        self.policy_violations: Optional[List[Dict]] = None
 
     # --- Python dependencies ---
+    def _add_distributions(self, distributions):
+        for dist in distributions:
+            self.dependencies.add(Dependency(name=dist['name'], version=dist['version'], source="site-packages",
+                                             license=dist.get('license'), sha256=dist.get('sha256')))
+
     def parse_py_deps(self):
+        if self.site_packages is not None:
+            paths = [d for prefix in self.site_packages for d in dist_scan.site_packages_dirs(prefix)]
+            self._add_distributions(d.to_json() for d in dist_scan.scan(paths if self.site_packages else None))
+            return
+        if self.dist_file.exists():
+            self.bytes_read += self.dist_file.stat().st_size
+            with open(self.dist_file, "r", encoding="utf-8") as f:
+                self._add_distributions(json.load(f))
+            return
         if not self.py_file.exists():
             print(f"Python dependency file not found: {self.py_file}")
             return
 
+        self.bytes_read += self.py_file.stat().st_size
         with open(self.py_file, "r", encoding="utf-8") as f:
             for line in f:
                 line = line.strip()
@@ -64,6 +106,7 @@ class SBOMGenerator:
 
         pattern = r"^([A-Za-z0-9_]+)\s*:\s*(.*)$"
 
+        self.bytes_read += self.cpp_file.stat().st_size
         with open(self.cpp_file, "r", encoding="utf-8") as f:
             for line in f:
                 line = line.strip()
@@ -79,22 +122,55 @@ class SBOMGenerator:
                 self.dependencies.add(Dependency(name=name, version=version, source="cppDep.txt"))
 
 
+    # --- Policy ---
+    def check_policy(self) -> List[Dict]:
+        """Check the dependency set against the policy; the result is recorded in the SBOM metadata"""
+        if self.policy is None:
+            return []
+        self.policy_violations = self.policy.check((dep.name, dep.version, dep.source) for dep in self.dependencies)
+        for violation in self.policy_violations:
+            print(f"Policy violation: {violation['message']}")
+        return self.policy_violations
+
     # --- CycloneDX SBOM JSON ---
+    @staticmethod
+    def _properties(dep: Dependency):
+        """Component (name, value) pairs: where it came from, and its license and file hash if scanned"""
+        fields = (("source", dep.source), ("license", dep.license), ("sha256", dep.sha256))
+        return [(name, value) for name, value in fields if value]
+
+    def _component_rows(self):
+        """Component rows for the direct CycloneDX writer"""
+        return [(bom_ref(dep), dep.name, dep.version or "undefined", self._properties(dep))
+                for dep in self.dependencies]
+
+    def _metadata_properties(self):
+        """Metadata (name, value) pairs: the policy check, if one ran"""
+        if self.policy_violations is None:
+            return []
+        return policy_properties(self.policy.digest, self.policy_violations)
+
     def generate_cyclonedx_sbom(self) -> str:
+        if self.fast_writer:
+            return bom_json(self._component_rows(), properties=self._metadata_properties(), timestamp=reproducible_timestamp(), tools=[("StatAnalysis SBOM Generator", "2.0.0")])
         bom = Bom(
             metadata=BomMetaData(
-                tools=[Tool(name="StatAnalysis SBOM Generator", version="2.0.0")]
+                tools=[Tool(name="StatAnalysis SBOM Generator", version="2.0.0")],
+                properties=[Property(name=name, value=value) for name, value in self._metadata_properties()]
             )
         )
+        # BomMetaData defaults to the current time; drop it unless SOURCE_DATE_EPOCH is set
+        bom.metadata.timestamp = reproducible_timestamp()
 
         for dep in sorted(self.dependencies, key=lambda x: x.name.lower()):
             component = Component(
                 name=dep.name,
                 version=dep.version or "undefined",
-                type=ComponentType.LIBRARY
+                type=ComponentType.LIBRARY,
+                bom_ref=bom_ref(dep)
             )
-            if dep.source:
-                component.properties.add(Property(name="source", value=dep.source))
+            for name, value in self._properties(dep):
+                component.properties.add(Property(name=name, value=value))
             bom.components.add(component)
 
         outputter = make_outputter(
@@ -102,12 +178,16 @@ class SBOMGenerator:
             output_format=OutputFormat.JSON,
             schema_version=SchemaVersion.V1_4
         )
-        return outputter.output_as_string()
+        return canonical_json(outputter.output_as_string())
 
     def save_sbom(self, output_path="stat-analysis-sbom.json"):
-        sbom_json = self.generate_cyclonedx_sbom()
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(sbom_json)
+        if self.fast_writer:
+            with open(output_path, "w", encoding="utf-8") as f:
+                write_bom_json(f, self._component_rows(), properties=self._metadata_properties(), timestamp=reproducible_timestamp(), tools=[("StatAnalysis SBOM Generator", "2.0.0")])
+        else:
+            sbom_json = self.generate_cyclonedx_sbom()
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(sbom_json)
         print(f"SBOM saved to {output_path}")
 
     # --- Markdown report ---
@@ -117,6 +197,14 @@ class SBOMGenerator:
         md.append(f"**Generated on:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         md.append(f"**Total dependencies:** {len(self.dependencies)}\n")
 
+        if self.policy_violations:
+            md.append("## Policy Violations\n")
+            md.append("| Rule | Package | Version | Detail |")
+            md.append("|------|---------|---------|--------|")
+            for violation in self.policy_violations:
+                md.append(f"| {violation['rule']} | {violation['component']} | {violation['version']} | {violation['message']} |")
+            md.append("")
+
         if self.dependencies:
             by_source = {}
             for dep in self.dependencies:
@@ -124,10 +212,16 @@ class SBOMGenerator:
 
             for source, deps in sorted(by_source.items()):
                 md.append(f"## {source} Dependencies ({len(deps)})\n")
-                md.append("| Package | Version |")
-                md.append("|---------|---------|")
-                for dep in sorted(deps, key=lambda x: x.name.lower()):
-                    md.append(f"| {dep.name} | {dep.version or 'undefined'} |")
+                if any(dep.license for dep in deps):
+                    md.append("| Package | Version | License |")
+                    md.append("|---------|---------|---------|")
+                    for dep in sorted(deps, key=lambda x: x.name.lower()):
+                        md.append(f"| {dep.name} | {dep.version or 'undefined'} | {dep.license or ''} |")
+                else:
+                    md.append("| Package | Version |")
+                    md.append("|---------|---------|")
+                    for dep in sorted(deps, key=lambda x: x.name.lower()):
+                        md.append(f"| {dep.name} | {dep.version or 'undefined'} |")
                 md.append("")
 
         return "\n".join(md)
@@ -140,20 +234,59 @@ class SBOMGenerator:
 
     # --- Main generate ---
     def generate(self, output_json="stat-analysis-sbom.json", output_md="stat-analysis-sbom.md"):
-        print("Parsing Python dependencies...")
-        self.parse_py_deps()
-        print("Parsing C++ dependencies...")
-        self.parse_cpp_deps()
+        with self.spans.span("parse_py_deps") as span:
+            print("Parsing Python dependencies...")
+            before = len(self.dependencies)
+            self.parse_py_deps()
+            span['items'] = len(self.dependencies) - before
+        with self.spans.span("parse_cpp_deps") as span:
+            print("Parsing C++ dependencies...")
+            before = len(self.dependencies)
+            self.parse_cpp_deps()
+            span['items'] = len(self.dependencies) - before
         print(f"Found {len(self.dependencies)} dependencies total.")
 
-        self.save_sbom(output_json)
-        self.save_markdown_report(output_md)
+        if self.policy is not None:
+            with self.spans.span("policy") as span:
+                span['items'] = len(self.check_policy())
 
+        with self.spans.span("serialize") as span:
+            self.save_sbom(output_json)
+            span['items'] = len(self.dependencies)
+            span['bytes_written'] = os.path.getsize(output_json)
+        with self.spans.span("markdown") as span:
+            self.save_markdown_report(output_md)
+            span['items'] = len(self.dependencies)
+            span['bytes_written'] = os.path.getsize(output_md)
 
-def main():
+
+def run(args):
     try:
         generator = SBOMGenerator()
+        if args.fast_writer:
+            generator.fast_writer = True
+        if args.site_packages is not None:
+            generator.site_packages = args.site_packages
         generator.generate()
     except Exception as e:
         print(f"Error: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fast-writer', action='store_true', help='Write CycloneDX JSON directly instead of through the cyclonedx model')
+    parser.add_argument('--site-packages', nargs='*', metavar='PREFIX',
+                        help="Scan installed distributions under these prefixes (none: this interpreter's sys.path) instead of reading pyDist.json/pyDep.txt")
+    parser.add_argument('--profile', action='store_true', help='Write a cProfile dump and tracemalloc peak for this run to logs/profiles')
+    args = parser.parse_args()
+
+    if args.profile:
+        with profiled(" ".join(["StatAnalysis"] + sys.argv[1:])):
+            run(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
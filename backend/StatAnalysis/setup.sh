@@ -2,7 +2,7 @@
 set -e
 
 # --- Cleanup ---
-rm -f cppDep.txt pyDep.txt stat-analysis-sbom.json stat-analysis-sbom.md
+rm -f cppDep.txt pyDep.txt pyDist.json stat-analysis-sbom.json stat-analysis-sbom.md
 
 echo "Sourcing ATLAS environment..."
 set +e
@@ -13,12 +13,12 @@ echo "Setting up StatAnalysis..."
 asetup StatAnalysis,0.6.3 > cppDep.txt || { echo "asetup failed"; exit 1; }
 
 # --- Capture dependencies ---
-echo "Freezing Python dependencies..."
-pip freeze > pyDep.txt
+# Read the installed distributions' metadata directly, before cyclonedx is added to the environment
+echo "Scanning installed Python distributions..."
+python3 ../dist_scan.py --output pyDist.json
 
-echo "Ensuring pip + cyclonedx are available..."
-pip install --upgrade pip
-pip install cyclonedx-python-lib
+echo "Ensuring cyclonedx is available..."
+python3 -c "import cyclonedx" 2>/dev/null || pip install cyclonedx-python-lib
 
 # --- Run SBOM generator ---
 echo "Generating SBOM..."
@@ -29,6 +29,6 @@ echo "Versioning and saving SBOM..."
 python3 version_sbom.py
 
 # Clean up temporary files
-rm -f cppDep.txt pyDep.txt
+rm -f cppDep.txt pyDep.txt pyDist.json
 
 echo "SBOM generation complete!"
\ No newline at end of file
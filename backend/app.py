@@ -2,17 +2,119 @@
 Flask backend for ATLAS SBOM Management System
 """
 
+import base64
+import io
 import os
+import re
+import tarfile
+import threading
 import json
+import hashlib
+import queue
+import time
 from pathlib import Path
-from flask import Flask, send_from_directory, jsonify, request, send_file
+from flask import Flask, send_from_directory, jsonify, request, send_file, g, Response
 from flask_cors import CORS
-from datetime import datetime
+from datetime import datetime, timezone
+from functools import lru_cache
 import sys
 
+import dep_graph
+import locks
+import metrics
+import package_index
+import profiling
+import sbom_store
+import versions
+import vulnerabilities
+import watcher
+from sbom_store import get_sbom_signature
+
 app = Flask(__name__)
 CORS(app)
 
+# Exposed at /api/metrics; set SBOM_METRICS_DIR to aggregate across gunicorn workers
+HTTP_REQUESTS = metrics.counter('sbom_http_requests_total', 'HTTP requests by route, method and status',
+                                ('route', 'method', 'status'))
+HTTP_LATENCY = metrics.histogram('sbom_http_request_duration_seconds', 'HTTP request latency by route',
+                                 ('route', 'method'))
+CATALOG_SCAN = metrics.histogram('sbom_catalog_scan_duration_seconds', 'Time to scan the SBOM directories')
+CACHE_REQUESTS = metrics.counter('sbom_cache_requests_total', 'Cache lookups by cache and result',
+                                 ('cache', 'result'))
+GENERATOR_JOBS = metrics.histogram('sbom_generator_job_duration_seconds', 'SBOM generation jobs by project and outcome',
+                                   ('project', 'outcome'), buckets=metrics.JOB_BUCKETS)
+DAILY_RUNS = metrics.histogram('sbom_daily_run_duration_seconds', 'Daily runs by trigger and outcome',
+                               ('trigger', 'outcome'), buckets=metrics.JOB_BUCKETS)
+DAILY_RUN_LAST_SUCCESS = metrics.gauge('sbom_daily_run_last_success_timestamp_seconds',
+                                       'Unix time of the last successful daily run')
+EVENT_CLIENTS = metrics.gauge('sbom_event_clients', 'Clients connected to /api/events', aggregate='sum')
+
+
+@metrics.register_collector
+def collect_cache_stats():
+    """Mirror the sbom_store caches' hit/miss totals"""
+    for cache, func in (('delta', sbom_store._materialize), ('archive_index', sbom_store._load_archive_index),
+                        ('catalog', describe_stored), ('components', stored_components),
+                        ('dependency_index', dependency_index), ('component_versions', component_versions),
+                        ('version_keys', versions.version_key)):
+        info = func.cache_info()
+        CACHE_REQUESTS.set_total(info.hits, cache=cache, result='hit')
+        CACHE_REQUESTS.set_total(info.misses, cache=cache, result='miss')
+    info = vulnerabilities.cache_info()
+    CACHE_REQUESTS.set_total(info['hits'], cache='vulnerabilities', result='hit')
+    CACHE_REQUESTS.set_total(info['misses'], cache='vulnerabilities', result='miss')
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.before_request
+def start_request_profile():
+    """Profile this request when ?profile= or X-SBOM-Profile carries SBOM_PROFILE_TOKEN"""
+    flag = request.headers.get('X-SBOM-Profile') or request.args.get('profile')
+    if not flag:
+        return
+    if not profiling.request_allowed(flag):
+        print(f"Ignoring profile request for {request.path}: token missing or wrong", file=sys.stderr)
+        return
+    profile = profiling.Profile(f"{request.method}-{request.path}")
+    if profile.start():
+        g.profile = profile
+    else:
+        print(f"Profiling skipped for {request.path}: another profile is running", file=sys.stderr)
+
+
+@app.after_request
+def finish_request_profile(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        summary = profile.stop()
+        print(f"Profile written to {summary['path']}", file=sys.stderr)
+        response.headers['X-SBOM-Profile'] = summary['file']
+        response.headers['X-SBOM-Profile-Peak-Bytes'] = str(summary['peakBytes'])
+    return response
+
+
+@app.teardown_request
+def abandon_request_profile(exc):
+    # after_request does not run when a view raises
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.stop()
+
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # The URL rule, not the path, so SBOM ids do not each become a series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_LATENCY.observe(time.perf_counter() - start, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    return response
+
 # Base directory for backend
 BACKEND_DIR = Path(__file__).parent
 FRONTEND_DIR = BACKEND_DIR.parent / 'frontend'
@@ -25,162 +127,291 @@ SBOM_DIRS = {
 }
 
 
-def get_sbom_signature(sbom_data, build_info=None):
-    """Generate a signature for an SBOM to compare if it's identical
-    Includes all data except generation timestamp"""
-    signature_parts = []
+def get_next_version_number(base_dir, sboms_dir='SBOMs'):
+    """Get the next version number, counting archived versions too.
     
-    # 1. Components (dependencies) - sorted by name and version
-    components = sbom_data.get('components', [])
-    normalized_components = sorted([
-        (comp.get('name', ''), comp.get('version', ''))
-        for comp in components
-    ])
-    signature_parts.append(('components', tuple(normalized_components)))
+    Only meaningful while holding sbom_store.version_lock() on the directory.
+    """
+    return sbom_store.latest_version(base_dir / sboms_dir)[0] + 1
+
+
+# Longest a create request waits for another writer of the same SBOMs directory
+VERSION_LOCK_TIMEOUT = 60.0
+
+
+def sbom_entry(sbom_type, json_file, md_file, mtime, summary):
+    """Listing entry for one SBOM version"""
+    # Byte-stable SBOMs carry no generation timestamp; fall back to the file time
+    timestamp = summary['timestamp']
+    if not timestamp:
+        timestamp = datetime.fromtimestamp(mtime, tz=timezone.utc).isoformat()
+        
+    metadata = {
+        'timestamp': timestamp,
+        'dependencyCount': summary['dependencyCount'],
+        'sources': summary['sources'],
+        'properties': summary['properties'],
+        'buildInfo': summary.get('buildInfo', {}),
+        'policy': summary.get('policy')
+    }
     
-    # 2. Metadata properties (excluding timestamp)
-    metadata = sbom_data.get('metadata', {})
-    properties = metadata.get('properties', [])
-    # Convert properties list to sorted dict for consistent comparison
-    props_dict = {}
-    for prop in properties:
-        props_dict[prop.get('name', '')] = prop.get('value', '')
-    normalized_props = tuple(sorted(props_dict.items()))
-    signature_parts.append(('properties', normalized_props))
+    # Generate ID from path (use version directory name)
+    rel_path = json_file.relative_to(BACKEND_DIR)
+    # Extract version from path (e.g., AnalysisBase/SBOMs/v1/... -> v1)
+    path_parts = rel_path.parts
+    version_part = None
+    for i, part in enumerate(path_parts):
+        if part == 'SBOMs' and i + 1 < len(path_parts):
+            version_part = path_parts[i + 1]
+            break
+    sbom_id = f"{sbom_type}-{version_part}" if version_part else f"{sbom_type}-{rel_path.parent.name}"
     
-    # 3. Build information (if provided)
-    if build_info:
-        normalized_build = tuple(sorted(build_info.items()))
-        signature_parts.append(('build_info', normalized_build))
+    # Create display name with version
+    display_name = f"{sbom_type} {version_part}" if version_part else f"{sbom_type} {rel_path.parent.name}"
     
-    return tuple(signature_parts)
+    return {
+        'id': sbom_id,
+        'name': sbom_type,
+        'displayName': display_name,
+        'path': str(rel_path),
+        'jsonPath': str(json_file),
+        'mdPath': str(md_file) if md_file else None,
+        'metadata': metadata,
+        'mtime': mtime,
+        'digest': summary['digest'],
+        'signature': summary['signature']
+    }
 
 
-def get_next_version_number(base_dir, sboms_dir='SBOMs'):
-    """Get the next version number by checking existing version directories"""
-    sboms_path = base_dir / sboms_dir
+CATALOG_INDEX_FORMAT = 1
+
+
+def catalog_index_path() -> Path:
+    return Path(os.environ.get('SBOM_CATALOG_INDEX') or BACKEND_DIR / 'logs' / 'catalog-index.json')
+
+
+def _catalog_key(path, mtime_ns, size):
+    return f"{path}:{mtime_ns}:{size}"
+
+
+@lru_cache(maxsize=2)
+def _load_catalog_index(path, mtime_ns, size):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['entries'] if data.get('format') == CATALOG_INDEX_FORMAT else {}
+
+
+def shared_catalog():
+    """Listing summaries written by any worker, keyed by path, mtime and size"""
+    path = catalog_index_path()
+    try:
+        stat = path.stat()
+        return _load_catalog_index(str(path), stat.st_mtime_ns, stat.st_size)
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def save_shared_catalog(entries):
+    """Replace the shared catalog index with the summaries of the current scan"""
+    path = catalog_index_path()
+    try:
+        with locks.locked(path.with_suffix('.lock'), timeout=10):
+            tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'format': CATALOG_INDEX_FORMAT, 'entries': entries}, f)
+            os.replace(tmp, path)
+    except (OSError, locks.LockTimeout) as e:
+        print(f"Failed to write catalog index {path}: {e}", file=sys.stderr)
+
+
+@lru_cache(maxsize=4096)
+def describe_stored(path, mtime_ns, size):
+    """Listing summary of a stored SBOM, kept until the file changes"""
+    summary = shared_catalog().get(_catalog_key(path, mtime_ns, size))
+    if summary is None:
+        summary = sbom_store.describe_sbom(sbom_store.read_bytes(path))
+    return summary
+
+
+def scan_project(sbom_type, base_dir, catalog):
+    """Listing of one project's SBOMs, newest first; None if it has none.
     
-    if not sboms_path.exists():
-        return 1
+    Summaries of its hot SBOMs are added to catalog, keyed like the shared catalog index.
+    """
+    if not base_dir.exists():
+        return None
     
-    # Find all version directories (v1, v2, v3, etc.)
-    version_dirs = []
-    for item in sboms_path.iterdir():
-        if item.is_dir() and item.name.startswith('v'):
-            try:
-                version_num = int(item.name[1:])  # Extract number after 'v'
-                version_dirs.append(version_num)
-            except ValueError:
+    project_sboms = []
+        
+    # Look for SBOM directories (skip ExampleSBOM)
+    for sbom_dir in base_dir.rglob('*'):
+        if not sbom_dir.is_dir():
+            continue
+        
+        # Skip ExampleSBOM directories
+        if sbom_dir.name == 'ExampleSBOM':
+            continue
+        
+        # Versions being written live in hidden staging directories until renamed into place
+        if sbom_dir.name.startswith('.'):
+            continue
+        
+        # Archived versions are listed from the archive index alone
+        for archived in sbom_store.archived_versions(sbom_dir):
+            version_dir = sbom_dir / archived['version']
+            json_name = next((name for name in archived['files'] if name.endswith('-sbom.json')), None)
+            if not json_name:
                 continue
+            md_name = json_name[:-len('.json')] + '.md'
+            md_file = version_dir / md_name if md_name in archived['files'] else None
+            project_sboms.append(sbom_entry(sbom_type, version_dir / json_name, md_file, archived['mtime'], archived['summary']))
+            
+        json_files = sbom_store.list_files(sbom_dir, '*-sbom.json')
+        if json_files:
+            for json_file in json_files:
+                md_file = json_file.with_suffix('.md')
+                
+                # Extract metadata
+                try:
+                    # Get file modification time for sorting; unchanged files are not parsed again
+                    stat = (json_file if json_file.exists() else sbom_store.delta_path(json_file)).stat()
+                    summary = describe_stored(str(json_file), stat.st_mtime_ns, stat.st_size)
+                    catalog[_catalog_key(json_file, stat.st_mtime_ns, stat.st_size)] = summary
+                    
+                    project_sboms.append(sbom_entry(
+                        sbom_type, json_file, md_file if sbom_store.exists(md_file) else None,
+                        stat.st_mtime, summary
+                    ))
+                except Exception as e:
+                    print(f"Error reading {json_file}: {e}", file=sys.stderr)
+                    continue
     
-    if not version_dirs:
-        return 1
+    # Sort SBOMs by modification time (newest first)
+    project_sboms.sort(key=lambda x: x['mtime'], reverse=True)
     
-    return max(version_dirs) + 1
+    if not project_sboms:
+        return None
+    return {
+        'name': sbom_type,
+        'displayName': sbom_type,
+        'sboms': project_sboms
+    }
 
 
+@CATALOG_SCAN.timed()
 def find_sbom_files():
     """Scan directories for SBOM JSON files, grouped by project"""
     projects = {}
+    # Summaries of every hot SBOM in this scan, shared with the other workers
+    catalog = {}
     
     for sbom_type, base_dir in SBOM_DIRS.items():
-        if not base_dir.exists():
-            continue
-        
-        project_sboms = []
-            
-        # Look for SBOM directories (skip ExampleSBOM)
-        for sbom_dir in base_dir.rglob('*'):
-            if not sbom_dir.is_dir():
-                continue
-            
-            # Skip ExampleSBOM directories
-            if sbom_dir.name == 'ExampleSBOM':
-                continue
-                
-            json_files = list(sbom_dir.glob('*-sbom.json'))
-            if json_files:
-                for json_file in json_files:
-                    md_file = json_file.with_suffix('.md')
-                    
-                    # Extract metadata
-                    try:
-                        with open(json_file, 'r', encoding='utf-8') as f:
-                            data = json.load(f)
-                            
-                        metadata = {
-                            'timestamp': data.get('metadata', {}).get('timestamp', 'Unknown'),
-                            'dependencyCount': len(data.get('components', [])),
-                            'sources': [],
-                            'properties': {}
-                        }
-                        
-                        # Extract properties
-                        if 'metadata' in data and 'properties' in data['metadata']:
-                            for prop in data['metadata']['properties']:
-                                metadata['properties'][prop['name']] = prop['value']
-                        
-                        # Extract sources from components
-                        if 'components' in data:
-                            sources = set()
-                            for comp in data['components']:
-                                if 'properties' in comp:
-                                    for prop in comp['properties']:
-                                        if prop.get('name') == 'source':
-                                            sources.add(prop.get('value', ''))
-                            metadata['sources'] = list(sources)
-                        
-                        # Generate ID from path (use version directory name)
-                        rel_path = json_file.relative_to(BACKEND_DIR)
-                        # Extract version from path (e.g., AnalysisBase/SBOMs/v1/... -> v1)
-                        path_parts = rel_path.parts
-                        version_part = None
-                        for i, part in enumerate(path_parts):
-                            if part == 'SBOMs' and i + 1 < len(path_parts):
-                                version_part = path_parts[i + 1]
-                                break
-                        sbom_id = f"{sbom_type}-{version_part}" if version_part else f"{sbom_type}-{rel_path.parent.name}"
-                        
-                        # Create display name with version
-                        display_name = f"{sbom_type} {version_part}" if version_part else f"{sbom_type} {rel_path.parent.name}"
-                        
-                        # Get file modification time for sorting
-                        mtime = json_file.stat().st_mtime
-                        
-                        project_sboms.append({
-                            'id': sbom_id,
-                            'name': sbom_type,
-                            'displayName': display_name,
-                            'path': str(rel_path),
-                            'jsonPath': str(json_file),
-                            'mdPath': str(md_file) if md_file.exists() else None,
-                            'metadata': metadata,
-                            'mtime': mtime,
-                            'signature': get_sbom_signature(data)
-                        })
-                    except Exception as e:
-                        print(f"Error reading {json_file}: {e}", file=sys.stderr)
-                        continue
-        
-        # Sort SBOMs by modification time (newest first)
-        project_sboms.sort(key=lambda x: x['mtime'], reverse=True)
-        
-        if project_sboms:
-            projects[sbom_type] = {
-                'name': sbom_type,
-                'displayName': sbom_type,
-                'sboms': project_sboms
-            }
+        project = scan_project(sbom_type, base_dir, catalog)
+        if project:
+            projects[sbom_type] = project
     
+    # Entries of changed or removed files drop out; nothing is written when every worker is up to date
+    if catalog.keys() - shared_catalog().keys():
+        save_shared_catalog(catalog)
+    
+    with _catalog_lock:
+        _catalog['projects'] = projects
     return projects
 
 
+# Catalog kept in memory while a watcher reports changes to it
+_catalog_lock = threading.Lock()
+# 'announced' holds the SBOM ids per project that clients have been told about
+_catalog = {'projects': None, 'version': 0, 'watcher': None, 'announced': {}}
+# One bounded queue per connected /api/events client
+_event_clients = set()
+EVENT_QUEUE_SIZE = 100
+EVENT_KEEPALIVE = 15.0
+
+
+def catalog_projects():
+    """Projects as listed by find_sbom_files(), without rescanning while the watcher keeps them current"""
+    with _catalog_lock:
+        projects = _catalog['projects'] if _catalog['watcher'] is not None else None
+    return projects if projects is not None else find_sbom_files()
+
+
+def publish_event(event, data):
+    """Queue an SSE message for every connected client; a client that fell behind is told to resync"""
+    with _catalog_lock:
+        clients = list(_event_clients)
+    for client in clients:
+        try:
+            client.put_nowait((event, data))
+        except queue.Full:
+            with client.mutex:
+                client.queue.clear()
+            client.put_nowait(('resync', {'version': data.get('version')}))
+
+
+@CATALOG_SCAN.timed()
+def refresh_project(sbom_type):
+    """Rescan one project after the watcher saw it change, and announce added and removed versions"""
+    catalog = {}
+    project = scan_project(sbom_type, SBOM_DIRS[sbom_type], catalog)
+    with _catalog_lock:
+        projects = dict(_catalog['projects'] or {})
+        old_ids = _catalog['announced'].get(sbom_type, set())
+        if project:
+            projects[sbom_type] = project
+        else:
+            projects.pop(sbom_type, None)
+        # Keep the configured project order
+        _catalog['projects'] = {name: projects[name] for name in SBOM_DIRS if name in projects}
+        new_ids = {s['id'] for s in project['sboms']} if project else set()
+        if old_ids == new_ids:
+            return
+        _catalog['announced'][sbom_type] = new_ids
+        _catalog['version'] += 1
+        version = _catalog['version']
+    
+    # Share the new summaries with the other workers, keeping the other projects' entries
+    if catalog.keys() - shared_catalog().keys():
+        prefix = f"{SBOM_DIRS[sbom_type]}{os.sep}"
+        entries = {key: value for key, value in shared_catalog().items() if not key.startswith(prefix)}
+        entries.update(catalog)
+        save_shared_catalog(entries)
+    
+    added = [s for s in (project['sboms'] if project else []) if s['id'] not in old_ids]
+    removed = sorted(old_ids - new_ids)
+    print(f"Catalog: {sbom_type} {len(added)} version(s) added, {len(removed)} removed", file=sys.stderr)
+    publish_event('catalog', {
+        'version': version,
+        'project': sbom_type,
+        'added': added,
+        'removed': removed,
+        'count': len(new_ids)
+    })
+
+
+def start_watcher():
+    """Keep the catalog current from filesystem events instead of rescanning per request"""
+    if _catalog['watcher'] is not None or os.environ.get('SBOM_WATCH') == '0':
+        return
+    interval = float(os.environ['SBOM_WATCH_INTERVAL']) if os.environ.get('SBOM_WATCH_INTERVAL') else None
+    sbom_watcher = watcher.SBOMWatcher({name: base_dir / 'SBOMs' for name, base_dir in SBOM_DIRS.items()},
+                                       refresh_project, interval=interval,
+                                       # inotify misses changes made by other hosts on network filesystems
+                                       use_inotify=os.environ.get('SBOM_WATCH') != 'poll')
+    projects = find_sbom_files()
+    with _catalog_lock:
+        _catalog['announced'] = {name: {s['id'] for s in project['sboms']} for name, project in projects.items()}
+        _catalog['watcher'] = sbom_watcher
+    sbom_watcher.start()
+    print(f"Watching SBOMs directories ({sbom_watcher.mode}, checked every {sbom_watcher.interval:g} s)", file=sys.stderr)
+
+
 @app.route('/api/sboms', methods=['GET'])
 def list_sboms():
     """API endpoint to list all available SBOMs grouped by project"""
     try:
         print("API /api/sboms called", file=sys.stderr)
-        projects = find_sbom_files()
+        projects = catalog_projects()
         total_sboms = sum(len(p['sboms']) for p in projects.values())
         print(f"Found {len(projects)} projects with {total_sboms} total SBOMs", file=sys.stderr)
         return jsonify({
@@ -197,11 +428,46 @@ def list_sboms():
         }), 500
 
 
+@app.route('/api/events', methods=['GET'])
+def catalog_events():
+    """Server-Sent Events stream of catalog changes, replacing polling of /api/sboms"""
+    if _catalog['watcher'] is None:
+        return jsonify({
+            'success': False,
+            'error': 'Catalog events need the SBOMs watcher; start the server with it enabled'
+        }), 503
+    client = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+    with _catalog_lock:
+        _event_clients.add(client)
+        version = _catalog['version']
+        EVENT_CLIENTS.set(len(_event_clients))
+    
+    def stream():
+        try:
+            # Clients reconnecting with an older version than this know to reload /api/sboms
+            yield f"event: ready\ndata: {json.dumps({'version': version, 'mode': _catalog['watcher'].mode})}\n\n"
+            while True:
+                try:
+                    event, data = client.get(timeout=EVENT_KEEPALIVE)
+                except queue.Empty:
+                    # A comment line keeps proxies from closing the connection and detects gone clients
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"id: {data.get('version')}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            with _catalog_lock:
+                _event_clients.discard(client)
+                EVENT_CLIENTS.set(len(_event_clients))
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @app.route('/api/sboms/<sbom_id>', methods=['GET'])
 def get_sbom(sbom_id):
     """API endpoint to get a specific SBOM by ID"""
     try:
-        projects = find_sbom_files()
+        projects = catalog_projects()
         sbom = None
         for project in projects.values():
             sbom = next((s for s in project['sboms'] if s['id'] == sbom_id), None)
@@ -216,16 +482,14 @@ def get_sbom(sbom_id):
         
         # Load JSON data
         json_path = BACKEND_DIR / sbom['jsonPath']
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = json.loads(sbom_store.read_bytes(json_path))
         
         # Load markdown if available
         md_data = None
         if sbom['mdPath']:
             md_path = BACKEND_DIR / sbom['mdPath']
-            if md_path.exists():
-                with open(md_path, 'r', encoding='utf-8') as f:
-                    md_data = f.read()
+            if sbom_store.exists(md_path):
+                md_data = sbom_store.read_text(md_path)
         
         return jsonify({
             'success': True,
@@ -244,7 +508,7 @@ def get_sbom(sbom_id):
 def get_sbom_json(sbom_id):
     """API endpoint to get SBOM JSON file directly"""
     try:
-        projects = find_sbom_files()
+        projects = catalog_projects()
         sbom = None
         for project in projects.values():
             sbom = next((s for s in project['sboms'] if s['id'] == sbom_id), None)
@@ -255,7 +519,11 @@ def get_sbom_json(sbom_id):
             return jsonify({'error': 'SBOM not found'}), 404
         
         json_path = BACKEND_DIR / sbom['jsonPath']
-        return send_file(json_path, mimetype='application/json')
+        # Content digest as ETag: identical SBOMs are byte-identical
+        if not json_path.exists():
+            # Delta-stored version, rebuilt in memory
+            return send_file(io.BytesIO(sbom_store.read_bytes(json_path)), mimetype='application/json', etag=sbom['digest'])
+        return send_file(json_path, mimetype='application/json', etag=sbom['digest'])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -264,7 +532,7 @@ def get_sbom_json(sbom_id):
 def get_sbom_markdown(sbom_id):
     """API endpoint to get SBOM markdown file directly"""
     try:
-        projects = find_sbom_files()
+        projects = catalog_projects()
         sbom = None
         for project in projects.values():
             sbom = next((s for s in project['sboms'] if s['id'] == sbom_id), None)
@@ -275,17 +543,549 @@ def get_sbom_markdown(sbom_id):
             return jsonify({'error': 'SBOM or markdown not found'}), 404
         
         md_path = BACKEND_DIR / sbom['mdPath']
-        if not md_path.exists():
+        if not sbom_store.exists(md_path):
             return jsonify({'error': 'Markdown file not found'}), 404
         
+        if not md_path.exists():
+            return send_file(io.BytesIO(sbom_store.read_bytes(md_path)), mimetype='text/markdown')
         return send_file(md_path, mimetype='text/markdown')
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+def _version_order(component):
+    key = versions.version_key(component['version'])
+    # Unparsable versions ("undefined") sort last
+    return (key is None, key or (), component['name'].lower())
+
+
+COMPONENT_SORTS = {
+    'name': lambda c: (c['name'].lower(), c['version']),
+    'version': _version_order,
+    'source': lambda c: (c['source'] or '', c['name'].lower()),
+}
+MAX_PAGE_SIZE = 1000
+
+
+@lru_cache(maxsize=32)
+def stored_components(path, digest):
+    """Components of a stored SBOM as flat dicts; stored versions never change, so the digest is the key"""
+    data = json.loads(sbom_store.read_bytes(path))
+    components = []
+    for comp in data.get('components', []):
+        source = next((prop.get('value') for prop in comp.get('properties', []) if prop.get('name') == 'source'), None)
+        components.append({'name': comp.get('name', ''), 'version': comp.get('version', ''),
+                           'source': source, 'bomRef': comp.get('bom-ref')})
+    return tuple(components)
+
+
+@lru_cache(maxsize=1024)
+def component_versions(path, digest):
+    """Normalized component name -> (name as written, versions in release order) for a stored SBOM"""
+    by_name = {}
+    for comp in stored_components(path, digest):
+        entry = by_name.setdefault(vulnerabilities.normalize_name(comp['name']), (comp['name'], set()))
+        entry[1].add(comp['version'])
+    return {key: (name, tuple(sorted(found, key=versions.sort_key))) for key, (name, found) in by_name.items()}
+
+
+@lru_cache(maxsize=64)
+def sorted_components(path, digest, sort):
+    return tuple(sorted(stored_components(path, digest), key=COMPONENT_SORTS[sort]))
+
+
+def _component_cursor(digest, query, offset):
+    # Bound to the SBOM content and the query, so it cannot page through a different result
+    token = json.dumps({'d': digest[:16], 'q': query, 'o': offset}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(token.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _component_offset(cursor, digest, query):
+    try:
+        token = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if token['d'] != digest[:16] or token['q'] != query:
+            raise ValueError('cursor belongs to a different SBOM or query')
+        return int(token['o'])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+
+@app.route('/api/sboms/<sbom_id>/components', methods=['GET'])
+def get_sbom_components(sbom_id):
+    """API endpoint to filter, sort and page through one SBOM's components.
+    
+    ?prefix= and ?regex= match the name (case-insensitive), ?source= may be
+    repeated, ?range= keeps versions in a range such as ">=1.80,<1.87",
+    ?sort=name|version|source (prefix "-" to reverse), ?limit= (default 100),
+    ?cursor= from nextCursor, ?format=json|ndjson.
+    """
+    try:
+        sort = request.args.get('sort', 'name')
+        descending = sort.startswith('-')
+        if sort.lstrip('-') not in COMPONENT_SORTS:
+            return jsonify({'success': False, 'error': f'Invalid sort: {sort}. Must be one of {", ".join(COMPONENT_SORTS)}'}), 400
+        export_format = request.args.get('format', 'json')
+        if export_format not in ('json', 'ndjson'):
+            return jsonify({'success': False, 'error': f'Invalid format: {export_format}. Must be json or ndjson'}), 400
+        try:
+            limit = min(max(int(request.args.get('limit', 100)), 1), MAX_PAGE_SIZE)
+            pattern = re.compile(request.args['regex'], re.IGNORECASE) if request.args.get('regex') else None
+            version_range = versions.parse_range(request.args['range']) if request.args.get('range') else None
+        except (ValueError, re.error) as e:
+            return jsonify({'success': False, 'error': f'Invalid limit, regex or range: {e}'}), 400
+        prefix = request.args.get('prefix', '').lower()
+        sources = set(request.args.getlist('source'))
+        
+        projects = catalog_projects()
+        sbom = None
+        for project in projects.values():
+            sbom = next((s for s in project['sboms'] if s['id'] == sbom_id), None)
+            if sbom:
+                break
+        
+        if not sbom:
+            return jsonify({'success': False, 'error': 'SBOM not found'}), 404
+        
+        query = [sort, prefix, request.args.get('regex', ''), sorted(sources), request.args.get('range', '')]
+        offset = 0
+        if request.args.get('cursor'):
+            try:
+                offset = _component_offset(request.args['cursor'], sbom['digest'], query)
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+        
+        components = sorted_components(str(BACKEND_DIR / sbom['jsonPath']), sbom['digest'], sort.lstrip('-'))
+        if descending:
+            components = components[::-1]
+        matches = [c for c in components
+                   if c['name'].lower().startswith(prefix)
+                   and (pattern is None or pattern.search(c['name']))
+                   and (not sources or c['source'] in sources)
+                   and (version_range is None or version_range(c['version']))]
+        page = matches[offset:offset + limit]
+        next_cursor = _component_cursor(sbom['digest'], query, offset + limit) if offset + limit < len(matches) else None
+        
+        if export_format == 'ndjson':
+            headers = {'X-Total-Count': str(len(matches))}
+            if next_cursor:
+                headers['X-Next-Cursor'] = next_cursor
+            return Response(''.join(json.dumps(c) + '\n' for c in page), mimetype='application/x-ndjson', headers=headers)
+        return jsonify({
+            'success': True,
+            'sbom': sbom['id'],
+            'total': len(matches),
+            'count': len(page),
+            'components': page,
+            'nextCursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@lru_cache(maxsize=16)
+def dependency_index(path, digest):
+    """Transitive-closure index over a stored SBOM's dependency graph, built once per version"""
+    return dep_graph.ClosureIndex.from_sbom(json.loads(sbom_store.read_bytes(path)))
+
+
+def _dependency_query(sbom_id, name, direction):
+    """Shared body of the dependents/dependencies endpoints"""
+    try:
+        projects = catalog_projects()
+        sbom = None
+        for project in projects.values():
+            sbom = next((s for s in project['sboms'] if s['id'] == sbom_id), None)
+            if sbom:
+                break
+        
+        if not sbom:
+            return jsonify({'success': False, 'error': 'SBOM not found'}), 404
+        
+        index = dependency_index(str(BACKEND_DIR / sbom['jsonPath']), sbom['digest'])
+        matches = index.find(name, request.args.get('version'))
+        if not matches:
+            return jsonify({'success': False, 'error': f'Component not found: {name}'}), 404
+        
+        transitive = request.args.get('direct') not in ('1', 'true')
+        query = index.dependents if direction == 'dependents' else index.dependencies
+        direct = set()
+        found = set()
+        for node in matches:
+            direct.update(query(node, transitive=False))
+            found.update(query(node, transitive=transitive))
+        found.difference_update(matches)
+        components = sorted(({**index.nodes[i], 'direct': i in direct} for i in found),
+                            key=lambda c: (c['name'].lower(), c['version']))
+        return jsonify({
+            'success': True,
+            'sbom': sbom['id'],
+            'component': [index.nodes[i] for i in matches],
+            'transitive': transitive,
+            'count': len(components),
+            direction: components
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/sboms/<sbom_id>/components/<path:name>/dependents', methods=['GET'])
+def get_component_dependents(sbom_id, name):
+    """API endpoint for the components that depend on name, directly or transitively.
+    
+    ?version= narrows name to one version, ?direct=1 skips the transitive closure.
+    """
+    return _dependency_query(sbom_id, name, 'dependents')
+
+
+@app.route('/api/sboms/<sbom_id>/components/<path:name>/dependencies', methods=['GET'])
+def get_component_dependencies(sbom_id, name):
+    """API endpoint for the components name pulls in, directly or transitively.
+    
+    ?version= narrows name to one version, ?direct=1 skips the transitive closure.
+    """
+    return _dependency_query(sbom_id, name, 'dependencies')
+
+
+VERSION_CHANGES = ('added', 'removed', 'upgraded', 'downgraded', 'equivalent', 'changed')
+
+
+@app.route('/api/sboms/<sbom_id>/diff', methods=['GET'])
+def diff_sbom(sbom_id):
+    """API endpoint classifying component changes against another version (?base=, default the previous one).
+    
+    Each changed component is added, removed, upgraded, downgraded, equivalent
+    (1.0 -> 1.0.0) or changed (versions that cannot be ordered, such as git hashes).
+    """
+    try:
+        projects = catalog_projects()
+        sbom = None
+        project = None
+        for project in projects.values():
+            sbom = next((s for s in project['sboms'] if s['id'] == sbom_id), None)
+            if sbom:
+                break
+        
+        if not sbom:
+            return jsonify({'success': False, 'error': 'SBOM not found'}), 404
+        
+        if request.args.get('base'):
+            base = next((s for p in projects.values() for s in p['sboms'] if s['id'] == request.args['base']), None)
+            if not base:
+                return jsonify({'success': False, 'error': 'Base SBOM not found'}), 404
+        else:
+            history = sorted(project['sboms'], key=export_order)
+            position = history.index(sbom)
+            if position == 0:
+                return jsonify({'success': False, 'error': 'No earlier version to compare against'}), 404
+            base = history[position - 1]
+        
+        old = component_versions(str(BACKEND_DIR / base['jsonPath']), base['digest'])
+        new = component_versions(str(BACKEND_DIR / sbom['jsonPath']), sbom['digest'])
+        changes = []
+        unchanged = 0
+        for key in old.keys() | new.keys():
+            name, before = old.get(key, (None, ()))
+            name, after = new.get(key, (name, ()))
+            if before == after:
+                unchanged += 1
+                continue
+            if not before:
+                change = 'added'
+            elif not after:
+                change = 'removed'
+            else:
+                # Several versions of one package: compare the newest on each side
+                change = versions.classify(versions.newest(before) or before[-1], versions.newest(after) or after[-1])
+                if change == 'unchanged':
+                    change = 'changed'
+            changes.append({'name': name, 'change': change, 'from': list(before), 'to': list(after)})
+        changes.sort(key=lambda c: (c['name'].lower(), c['name']))
+        
+        summary = {change: 0 for change in VERSION_CHANGES}
+        for change in changes:
+            summary[change['change']] += 1
+        summary['unchanged'] = unchanged
+        return jsonify({
+            'success': True,
+            'sbom': sbom['id'],
+            'base': base['id'],
+            'summary': summary,
+            'changes': changes
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/packages/<path:name>/history', methods=['GET'])
+def package_history(name):
+    """API endpoint listing every version of a package across stored SBOMs, newest first (?project= narrows it)"""
+    try:
+        wanted = request.args.get('project')
+        key = vulnerabilities.normalize_name(name)
+        seen = {}
+        for project in catalog_projects().values():
+            if wanted and project['name'] != wanted:
+                continue
+            for sbom in project['sboms']:
+                found = component_versions(str(BACKEND_DIR / sbom['jsonPath']), sbom['digest']).get(key)
+                if not found:
+                    continue
+                for version in found[1]:
+                    entry = seen.setdefault(version, {'version': version, 'projects': set(), 'sboms': [],
+                                                      'firstSeen': sbom['mtime'], 'lastSeen': sbom['mtime']})
+                    entry['projects'].add(project['name'])
+                    entry['sboms'].append(sbom['id'])
+                    entry['firstSeen'] = min(entry['firstSeen'], sbom['mtime'])
+                    entry['lastSeen'] = max(entry['lastSeen'], sbom['mtime'])
+        
+        if not seen:
+            return jsonify({'success': False, 'error': f'Package not found: {name}'}), 404
+        
+        # Release order, newest first; versions that cannot be ordered come last
+        ordered = sorted((v for v in seen if versions.version_key(v) is not None), key=versions.version_key, reverse=True)
+        ordered += sorted(v for v in seen if versions.version_key(v) is None)
+        history = []
+        for version in ordered:
+            entry = seen[version]
+            entry['projects'] = sorted(entry['projects'])
+            # Ids are <project>-vN; order each project's versions numerically
+            entry['sboms'] = sorted(entry['sboms'], key=lambda sbom_id: (sbom_id.rsplit('-', 1)[0], versions.sort_key(sbom_id.rsplit('-', 1)[-1])))
+            history.append(entry)
+        return jsonify({
+            'success': True,
+            'package': name,
+            'count': len(history),
+            'versions': history
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+PACKAGE_INDEX = package_index.PackageIndex()
+# Rescan at least this often even if no SBOMs directory changed (other output dirs, clock skew)
+PACKAGE_INDEX_TTL = 60.0
+_package_index_lock = threading.Lock()
+_package_index_state = {'signature': None, 'checked': 0.0}
+
+
+def _sboms_signature():
+    """mtimes of each project's SBOMs directory and archive index; a new version changes the former"""
+    signature = []
+    for name, base_dir in sorted(SBOM_DIRS.items()):
+        for path in (base_dir / 'SBOMs', base_dir / 'SBOMs' / sbom_store.ARCHIVE_INDEX):
+            try:
+                signature.append((str(path), path.stat().st_mtime_ns))
+            except FileNotFoundError:
+                pass
+    return tuple(signature)
+
+
+def refresh_package_index():
+    """Index SBOM versions added or removed since the last refresh"""
+    signature = _sboms_signature()
+    state = _package_index_state
+    if signature == state['signature'] and time.monotonic() - state['checked'] < PACKAGE_INDEX_TTL:
+        return
+    # Only the first build makes requests wait; later ones answer from the current index meanwhile
+    if not _package_index_lock.acquire(blocking=state['signature'] is None):
+        return
+    try:
+        if signature == state['signature'] and time.monotonic() - state['checked'] < PACKAGE_INDEX_TTL:
+            return
+        sboms = []
+        for project in catalog_projects().values():
+            for sbom in project['sboms']:
+                path = str(BACKEND_DIR / sbom['jsonPath'])
+                sboms.append((sbom['id'], project['name'], sbom['digest'],
+                              lambda path=path, digest=sbom['digest']: [c['name'] for c in stored_components(path, digest)]))
+        changes = PACKAGE_INDEX.update(sboms)
+        if changes:
+            print(f"Package index: {changes} SBOM(s) added, changed or removed; {len(PACKAGE_INDEX)} distinct names", file=sys.stderr)
+        state['signature'] = signature
+        state['checked'] = time.monotonic()
+    finally:
+        _package_index_lock.release()
+
+
+@app.route('/api/packages/suggest', methods=['GET'])
+def suggest_packages():
+    """API endpoint for component name autocomplete (?q=prefix, ?limit= default 10)"""
+    try:
+        try:
+            limit = min(max(int(request.args.get('limit', 10)), 1), 100)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': f'Invalid limit: {e}'}), 400
+        refresh_package_index()
+        return jsonify({
+            'success': True,
+            'query': request.args.get('q', ''),
+            'suggestions': PACKAGE_INDEX.suggest(request.args.get('q', ''), limit)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+class _ChunkBuffer:
+    """Write-only file object collecting what tarfile writes until it is drained"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def export_tar(sboms, compression=''):
+    """Yield a tar of the SBOM files one member at a time, without holding the whole archive"""
+    buffer = _ChunkBuffer()
+    with tarfile.open(fileobj=buffer, mode=f'w|{compression}') as tar:
+        for sbom in sboms:
+            for path in (sbom['jsonPath'], sbom['mdPath']):
+                if not path:
+                    continue
+                path = BACKEND_DIR / path
+                content = sbom_store.read_bytes(path)
+                info = tarfile.TarInfo(str(path.relative_to(BACKEND_DIR)))
+                info.size = len(content)
+                info.mtime = int(sbom['mtime'])
+                tar.addfile(info, io.BytesIO(content))
+                # tarfile hands over whole 10 KiB records; nothing to send until one is full
+                data = buffer.drain()
+                if data:
+                    yield data
+    yield buffer.drain()
+
+
+def export_ndjson(sboms):
+    """Yield one JSON line per SBOM version, the stored document embedded as is"""
+    for sbom in sboms:
+        raw = sbom_store.read_bytes(BACKEND_DIR / sbom['jsonPath']).strip()
+        if b'\n' in raw:
+            # Pretty-printed documents are compacted to keep one line per version
+            raw = json.dumps(json.loads(raw), sort_keys=True).encode('utf-8')
+        header = json.dumps({'id': sbom['id'], 'path': sbom['path'], 'digest': sbom['digest'], 'mtime': sbom['mtime']})
+        yield header[:-1].encode('utf-8') + b', "sbom": ' + raw + b'}\n'
+
+
+def export_order(sbom):
+    """Sort key: the vN number of the version directory, then the file time"""
+    version = Path(sbom['path']).parent.name
+    number = int(version[1:]) if version[:1] == 'v' and version[1:].isdigit() else float('inf')
+    return (str(Path(sbom['path']).parent.parent), number, sbom['mtime'])
+
+
+EXPORT_FORMATS = {
+    'tar': ('application/x-tar', 'tar'),
+    'tgz': ('application/gzip', 'tar.gz'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+@app.route('/api/projects/<name>/export', methods=['GET'])
+def export_project(name):
+    """API endpoint streaming every stored version of a project (?format=tar, tgz or ndjson)"""
+    try:
+        export_format = request.args.get('format', 'tar')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'success': False, 'error': f'Invalid format: {export_format}. Must be one of {", ".join(EXPORT_FORMATS)}'}), 400
+        if name not in SBOM_DIRS:
+            return jsonify({'success': False, 'error': f'Unknown project: {name}'}), 404
+        
+        # Oldest version first, so the history reads in order
+        sboms = sorted(catalog_projects().get(name, {}).get('sboms', []), key=export_order)
+        if export_format == 'ndjson':
+            body = export_ndjson(sboms)
+        else:
+            body = export_tar(sboms, 'gz' if export_format == 'tgz' else '')
+        
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        return Response(body, mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="{name}-sboms.{extension}"',
+            'X-SBOM-Count': str(len(sboms))
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/sboms/<sbom_id>/vulnerabilities', methods=['GET'])
+def get_sbom_vulnerabilities(sbom_id):
+    """API endpoint to match one SBOM against the local advisory database"""
+    try:
+        projects = catalog_projects()
+        sbom = None
+        for project in projects.values():
+            sbom = next((s for s in project['sboms'] if s['id'] == sbom_id), None)
+            if sbom:
+                break
+        
+        if not sbom:
+            return jsonify({'success': False, 'error': 'SBOM not found'}), 404
+        
+        result = vulnerabilities.match_stored(BACKEND_DIR / sbom['jsonPath'], sbom['digest'])
+        if result is None:
+            return jsonify({'success': False, 'error': 'No advisory database configured'}), 404
+        
+        return jsonify({'success': True, 'sbom': sbom['id'], **result})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/vulnerabilities', methods=['GET'])
+def list_vulnerabilities():
+    """API endpoint for exposure per project version and per advisory across projects"""
+    try:
+        projects = catalog_projects()
+        index = vulnerabilities.load_index()
+        if index is None:
+            return jsonify({'success': False, 'error': 'No advisory database configured'}), 404
+        
+        # ?latest=1 limits the report to each project's newest version
+        latest_only = request.args.get('latest') in ('1', 'true')
+        version_reports = []
+        advisories = {}
+        for project in projects.values():
+            for sbom in project['sboms'][:1] if latest_only else project['sboms']:
+                result = vulnerabilities.match_stored(BACKEND_DIR / sbom['jsonPath'], sbom['digest'], index)
+                version_reports.append({'id': sbom['id'], 'project': project['name'], 'summary': result['summary']})
+                for finding in result['findings']:
+                    advisory = advisories.setdefault(finding['advisory'], {
+                        'advisory': finding['advisory'],
+                        'aliases': finding['aliases'],
+                        'summary': finding['summary'],
+                        'severity': finding['severity'],
+                        'components': set(),
+                        'sboms': set(),
+                    })
+                    advisory['components'].add(f"{finding['component']}@{finding['version']}")
+                    advisory['sboms'].add(sbom['id'])
+        
+        for advisory in advisories.values():
+            advisory['components'] = sorted(advisory['components'])
+            advisory['sboms'] = sorted(advisory['sboms'])
+        
+        return jsonify({
+            'success': True,
+            'advisoryDb': index.fingerprint[:16],
+            'advisoryCount': len(index.advisories),
+            'versions': version_reports,
+            'advisories': sorted(advisories.values(), key=lambda a: (-len(a['sboms']), a['advisory'] or ''))
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @app.route('/api/sboms/create', methods=['POST'])
 def create_sbom():
     """API endpoint to create a new SBOM"""
+    job_start = time.perf_counter()
+    sbom_type = None
+    outcome = 'error'
     try:
         data = request.get_json()
         sbom_type = data.get('type')  # 'AnalysisBase' or 'StatAnalysis'
@@ -333,82 +1133,91 @@ def create_sbom():
                 SBOMGenerator = sbom_module.SBOMGenerator
                 
                 generator = SBOMGenerator()
+                # Stage spans go to the server log and into the response
+                generator.spans.stream = sys.stderr
+                spans = generator.spans
                 
                 # Parse dependencies
-                generator.parse_py_deps()
-                generator.parse_cpp_deps()
-                
+                with spans.span('parse_py_deps') as span:
+                    generator.parse_py_deps()
+                    span['items'] = len(generator.dependencies)
+                with spans.span('parse_cpp_deps') as span:
+                    before = len(generator.dependencies)
+                    generator.parse_cpp_deps()
+                    span['items'] = len(generator.dependencies) - before
+                # Dependency edges, as generate() records them; the signature compares them too
+                with spans.span('parse_dep_graph') as span:
+                    generator.parse_dep_graph()
+                    span['items'] = sum(len(targets) for targets in generator.edges.values())
+
                 # Get build info if available
-                build_info = generator.parse_build_info()
+                with spans.span('parse_build_info') as span:
+                    build_info = generator.parse_build_info()
+                    span['items'] = len(build_info)
                 
-                # Generate and check SBOM first
-                analysisbase_version = data.get('analysisbase_version', '24.0')
-                externals_version = data.get('externals_version', '24.2.42')
+                # Policy check before anything is saved; its result goes into the SBOM metadata
+                if generator.policy is not None:
+                    with spans.span('policy') as span:
+                        span['items'] = len(generator.check_policy())
+                    if generator.policy.enforce and generator.policy_violations:
+                        outcome = 'rejected'
+                        return jsonify({
+                            'success': False,
+                            'error': f'{len(generator.policy_violations)} policy violation(s); no new version created',
+                            'policyViolations': generator.policy_violations,
+                            'spans': spans.records
+                        }), 422
                 
-                sbom_json = generator.generate_cyclonedx_sbom(analysisbase_version, externals_version)
-                new_sbom_data = json.loads(sbom_json)
+                # Generate and check SBOM first
+                analysisbase_version = data.get('analysisbase_version', sbom_module.ANALYSISBASE_VERSION)
+                externals_version = data.get('externals_version', sbom_module.EXTERNALS_VERSION)
                 
-                # Check for duplicates before saving
-                projects = find_sbom_files()
-                project_sboms = projects.get(sbom_type, {}).get('sboms', [])
-                new_signature = get_sbom_signature(new_sbom_data, build_info)
+                # Build info is recorded in the SBOM metadata, so the document alone is compared
+                with spans.span('serialize') as span:
+                    sbom_json = generator.generate_cyclonedx_sbom(analysisbase_version, externals_version, build_info)
+                    span['items'] = len(generator.dependencies)
                 
-                if project_sboms:
-                    # Get the most recent SBOM and parse its build info from markdown
-                    most_recent = project_sboms[0]
-                    recent_md_path = BACKEND_DIR / most_recent.get('mdPath') if most_recent.get('mdPath') else None
-                    recent_build_info = None
+                # The duplicate check and the new version number must see the same latest version,
+                # so both happen under the SBOMs directory lock shared with version_sbom.py
+                with sbom_store.version_lock(base_dir / output_dir, timeout=VERSION_LOCK_TIMEOUT):
+                    # Check for duplicates before saving
+                    projects = find_sbom_files()
+                    project_sboms = projects.get(sbom_type, {}).get('sboms', [])
                     
-                    if recent_md_path and recent_md_path.exists():
-                        # Parse build info from markdown
-                        import re
-                        try:
-                            with open(recent_md_path, 'r', encoding='utf-8') as f:
-                                md_content = f.read()
-                            
-                            recent_build_info = {}
-                            c_match = re.search(r'\|\s*C Compiler\s*\|\s*(.+?)\s*\|', md_content)
-                            if c_match:
-                                recent_build_info['C Compiler'] = c_match.group(1).strip()
+                    if project_sboms:
+                        most_recent = project_sboms[0]
+                        recent_json_path = BACKEND_DIR / most_recent.get('jsonPath')
+                        # Generator output is byte-stable, so identical bytes mean an identical SBOM
+                        if most_recent.get('digest') == hashlib.sha256(sbom_json.encode('utf-8')).hexdigest():
+                            is_duplicate = True
+                            existing_sbom = most_recent
+                        elif sbom_store.exists(recent_json_path):
+                            # Load the existing SBOM JSON to get full data
+                            recent_sbom_data = json.loads(sbom_store.read_bytes(recent_json_path))
                             
-                            cxx_match = re.search(r'\|\s*CXX Compiler\s*\|\s*(.+?)\s*\|', md_content)
-                            if cxx_match:
-                                recent_build_info['CXX Compiler'] = cxx_match.group(1).strip()
+                            recent_signature = get_sbom_signature(recent_sbom_data)
+                            # Only parse the new document when the bytes differ
+                            new_signature = get_sbom_signature(json.loads(sbom_json))
                             
-                            platform_match = re.search(r'\|\s*Platform\s*\|\s*(.+?)\s*\|', md_content)
-                            if platform_match:
-                                recent_build_info['Platform'] = platform_match.group(1).strip()
-                        except Exception as e:
-                            print(f"Warning: Could not parse build info from markdown: {e}", file=sys.stderr)
+                            if recent_signature == new_signature:
+                                is_duplicate = True
+                                existing_sbom = most_recent
                     
-                    # Load the existing SBOM JSON to get full data
-                    recent_json_path = BACKEND_DIR / most_recent.get('jsonPath')
-                    if recent_json_path.exists():
-                        with open(recent_json_path, 'r', encoding='utf-8') as f:
-                            recent_sbom_data = json.load(f)
+                    if not is_duplicate:
+                        # Get next version number and create versioned directory
+                        version_num = get_next_version_number(base_dir, output_dir)
+                        version_dir = base_dir / output_dir / f'v{version_num}'
                         
-                        recent_signature = get_sbom_signature(recent_sbom_data, recent_build_info)
+                        json_file = version_dir / f'{sbom_type.lower()}-sbom.json'
+                        md_file = version_dir / f'{sbom_type.lower()}-sbom.md'
                         
-                        if recent_signature == new_signature:
-                            is_duplicate = True
-                            existing_sbom = most_recent
-                
-                if not is_duplicate:
-                    # Get next version number and create versioned directory
-                    version_num = get_next_version_number(base_dir, output_dir)
-                    version_dir = base_dir / output_dir / f'v{version_num}'
-                    version_dir.mkdir(parents=True, exist_ok=True)
-                    
-                    json_file = version_dir / f'{sbom_type.lower()}-sbom.json'
-                    md_file = version_dir / f'{sbom_type.lower()}-sbom.md'
-                    
-                    # Save SBOM files
-                    with open(json_file, 'w', encoding='utf-8') as f:
-                        f.write(sbom_json)
-                    
-                    md_content = generator.generate_markdown_report(analysisbase_version, externals_version, build_info)
-                    with open(md_file, 'w', encoding='utf-8') as f:
-                        f.write(md_content)
+                        # Save SBOM files
+                        with spans.span('markdown') as span:
+                            md_content = generator.generate_markdown_report(analysisbase_version, externals_version, build_info)
+                            span['items'] = len(generator.dependencies)
+                        with spans.span('store') as span:
+                            sbom_store.store_version(version_dir, {json_file.name: sbom_json, md_file.name: md_content})
+                            span['bytes_written'] = len(sbom_json.encode('utf-8')) + len(md_content.encode('utf-8'))
                 
             elif sbom_type == 'StatAnalysis':
                 # Import using importlib
@@ -422,55 +1231,73 @@ def create_sbom():
                 SBOMGenerator = sbom_module.SBOMGenerator
                 
                 generator = SBOMGenerator()
-                
-                # Generate SBOM to get the data first
-                generator.parse_py_deps()
-                generator.parse_cpp_deps()
+                # Stage spans go to the server log and into the response
+                generator.spans.stream = sys.stderr
+                spans = generator.spans
                 
                 # Create temporary files to get the SBOM data
                 import tempfile
                 with tempfile.NamedTemporaryFile(mode='w', suffix='.json', delete=False) as tmp_json:
                     with tempfile.NamedTemporaryFile(mode='w', suffix='.md', delete=False) as tmp_md:
+                        # generate() records its own parse, policy, serialize and markdown spans
                         generator.generate(tmp_json.name, tmp_md.name)
                         
-                        # Load the generated SBOM data
-                        with open(tmp_json.name, 'r', encoding='utf-8') as f:
-                            new_sbom_data = json.load(f)
+                        if generator.policy is not None and generator.policy.enforce and generator.policy_violations:
+                            os.unlink(tmp_json.name)
+                            os.unlink(tmp_md.name)
+                            outcome = 'rejected'
+                            return jsonify({
+                                'success': False,
+                                'error': f'{len(generator.policy_violations)} policy violation(s); no new version created',
+                                'policyViolations': generator.policy_violations,
+                                'spans': spans.records
+                            }), 422
                         
-                        # Check for duplicates before saving
-                        projects = find_sbom_files()
-                        project_sboms = projects.get(sbom_type, {}).get('sboms', [])
-                        # StatAnalysis doesn't have build info, so pass None
-                        new_signature = get_sbom_signature(new_sbom_data, None)
+                        # Load the generated SBOM data
+                        with open(tmp_json.name, 'rb') as f:
+                            new_raw = f.read()
                         
-                        if project_sboms:
-                            # Get the most recent SBOM
-                            most_recent = project_sboms[0]
-                            # Load the existing SBOM JSON to get full data
-                            recent_json_path = BACKEND_DIR / most_recent.get('jsonPath')
-                            if recent_json_path.exists():
-                                with open(recent_json_path, 'r', encoding='utf-8') as f:
-                                    recent_sbom_data = json.load(f)
-                                
-                                recent_signature = get_sbom_signature(recent_sbom_data, None)
-                                
-                                if recent_signature == new_signature:
+                        # The duplicate check and the new version number must see the same latest version,
+                        # so both happen under the SBOMs directory lock shared with version_sbom.py
+                        with sbom_store.version_lock(base_dir / output_dir, timeout=VERSION_LOCK_TIMEOUT):
+                            # Check for duplicates before saving
+                            projects = find_sbom_files()
+                            project_sboms = projects.get(sbom_type, {}).get('sboms', [])
+                            
+                            if project_sboms:
+                                # Get the most recent SBOM
+                                most_recent = project_sboms[0]
+                                # Load the existing SBOM JSON to get full data
+                                recent_json_path = BACKEND_DIR / most_recent.get('jsonPath')
+                                if most_recent.get('digest') == hashlib.sha256(new_raw).hexdigest():
+                                    # Byte-identical output, no need to compare signatures
                                     is_duplicate = True
                                     existing_sbom = most_recent
-                        
-                        if not is_duplicate:
-                            # Get next version number and create versioned directory
-                            version_num = get_next_version_number(base_dir, output_dir)
-                            version_dir = base_dir / output_dir / f'v{version_num}'
-                            version_dir.mkdir(parents=True, exist_ok=True)
-                            
-                            json_file = version_dir / f'{sbom_type.lower()}-sbom.json'
-                            md_file = version_dir / f'{sbom_type.lower()}-sbom.md'
+                                elif sbom_store.exists(recent_json_path):
+                                    recent_sbom_data = json.loads(sbom_store.read_bytes(recent_json_path))
+                                    
+                                    # StatAnalysis doesn't have build info, so pass None
+                                    recent_signature = get_sbom_signature(recent_sbom_data, None)
+                                    new_signature = get_sbom_signature(json.loads(new_raw), None)
+                                    
+                                    if recent_signature == new_signature:
+                                        is_duplicate = True
+                                        existing_sbom = most_recent
                             
-                            # Copy temp files to final location
-                            import shutil
-                            shutil.copy(tmp_json.name, json_file)
-                            shutil.copy(tmp_md.name, md_file)
+                            if not is_duplicate:
+                                # Get next version number and create versioned directory
+                                version_num = get_next_version_number(base_dir, output_dir)
+                                version_dir = base_dir / output_dir / f'v{version_num}'
+                                
+                                json_file = version_dir / f'{sbom_type.lower()}-sbom.json'
+                                md_file = version_dir / f'{sbom_type.lower()}-sbom.md'
+                                
+                                # Copy temp files to final location
+                                with open(tmp_md.name, 'rb') as f:
+                                    md_raw = f.read()
+                                with spans.span('store') as span:
+                                    sbom_store.store_version(version_dir, {json_file.name: new_raw, md_file.name: md_raw})
+                                    span['bytes_written'] = len(new_raw) + len(md_raw)
                         
                         # Clean up temp files
                         os.unlink(tmp_json.name)
@@ -478,11 +1305,14 @@ def create_sbom():
             
             # Return response
             if is_duplicate:
+                outcome = 'duplicate'
                 return jsonify({
                     'success': True,
                     'message': 'SBOM is identical to the most recent one',
                     'isDuplicate': True,
-                    'sbom': existing_sbom
+                    'sbom': existing_sbom,
+                    'policyViolations': generator.policy_violations,
+                    'spans': spans.records
                 })
             else:
                 # Reload to get the new SBOM
@@ -496,13 +1326,16 @@ def create_sbom():
                         new_sbom = s
                         break
                 
+                outcome = 'created'
                 return jsonify({
                     'success': True,
                     'message': 'SBOM created successfully',
                     'isDuplicate': False,
                     'sbom': new_sbom,
                     'jsonPath': str(json_file.relative_to(BACKEND_DIR)),
-                    'mdPath': str(md_file.relative_to(BACKEND_DIR)) if md_file.exists() else None
+                    'mdPath': str(md_file.relative_to(BACKEND_DIR)) if sbom_store.exists(md_file) else None,
+                    'policyViolations': generator.policy_violations,
+                    'spans': spans.records
                 })
             
         finally:
@@ -516,6 +1349,9 @@ def create_sbom():
             'success': False,
             'error': error_msg
         }), 500
+    finally:
+        if sbom_type in ('AnalysisBase', 'StatAnalysis'):
+            GENERATOR_JOBS.observe(time.perf_counter() - job_start, project=sbom_type, outcome=outcome)
 
 
 @app.route('/api/test', methods=['GET'])
@@ -524,6 +1360,12 @@ def test_api():
     return jsonify({'success': True, 'message': 'API is working!', 'routes': [str(rule) for rule in app.url_map.iter_rules()]})
 
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of the service metrics"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
 @app.route('/api/sbom-types', methods=['GET'])
 def get_sbom_types():
     """API endpoint to get available SBOM types"""
@@ -569,25 +1411,109 @@ def serve_frontend(path):
         return send_from_directory(str(FRONTEND_DIR), 'index.html')
 
 
+def record_daily_run(trigger, returncode, started):
+    """Count a finished DailyRun.sh run"""
+    outcome = 'success' if returncode == 0 else 'failure'
+    DAILY_RUNS.observe(time.time() - started, trigger=trigger, outcome=outcome)
+    if returncode == 0:
+        DAILY_RUN_LAST_SUCCESS.set(time.time())
+
+
 # Schedule daily SBOM generation
+# Retry interval of workers waiting to take over the scheduler
+SCHEDULER_RETRY = 30.0
+_scheduler = {'started': False, 'lock': None, 'leader': None}
+
+
+def scheduler_lock_path() -> Path:
+    return Path(os.environ.get('SBOM_SCHEDULER_LOCK') or BACKEND_DIR / 'logs' / 'scheduler.lock')
+
+
+def daily_run_lock_path() -> Path:
+    return BACKEND_DIR / 'logs' / 'daily_run.lock'
+
+
+def scheduler_leader():
+    """{pid, host, since} of the process owning the scheduler, or None"""
+    try:
+        with open(scheduler_lock_path().with_suffix('.json'), 'r', encoding='utf-8') as f:
+            leader = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # The lock outlives no process, so a free lock means the recorded leader is gone
+    probe = locks.FileLock(scheduler_lock_path())
+    if probe.acquire(blocking=False):
+        probe.release()
+        return None
+    return leader
+
+
+def scheduler_status():
+    """Which process owns the scheduler, as seen from this worker"""
+    return {
+        'leader': _scheduler['leader'] or scheduler_leader(),
+        'isLeader': _scheduler['lock'] is not None,
+        'pid': os.getpid()
+    }
+
+
+def start_scheduler():
+    """Join the scheduler leader election; safe to call in every gunicorn worker.
+    
+    Every process waits on the scheduler lock file in the background. The one
+    holding it runs the daily schedule; when it exits the kernel drops the lock
+    and another process takes over within SCHEDULER_RETRY seconds.
+    """
+    if _scheduler['started'] or os.environ.get('SBOM_SCHEDULER') == '0':
+        return
+    _scheduler['started'] = True
+    try:
+        import schedule
+    except ImportError:
+        print("Warning: 'schedule' package not installed. Daily runs will not be scheduled.", file=sys.stderr)
+        print("Install with: pip install schedule", file=sys.stderr)
+        return
+    
+    def elect():
+        lock = locks.FileLock(scheduler_lock_path())
+        while not lock.acquire(blocking=False):
+            time.sleep(SCHEDULER_RETRY)
+        _scheduler['lock'] = lock
+        leader = {'pid': os.getpid(), 'host': os.uname().nodename, 'since': datetime.now(timezone.utc).isoformat()}
+        info_path = scheduler_lock_path().with_suffix('.json')
+        tmp = info_path.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(leader, f)
+        os.replace(tmp, info_path)
+        _scheduler['leader'] = leader
+        print(f"Process {os.getpid()} is the scheduler leader", file=sys.stderr)
+        schedule_daily_runs()
+    
+    threading.Thread(target=elect, daemon=True, name='scheduler-election').start()
+
+
 def schedule_daily_runs():
     """Schedule daily SBOM generation runs"""
-    import threading
     import schedule
-    import time
     import subprocess
     
     def run_daily_sbom_generation():
         """Run the daily SBOM generation script"""
+        run_lock = locks.FileLock(daily_run_lock_path())
+        if not run_lock.acquire(blocking=False):
+            print("Daily SBOM generation skipped: a run is already in progress", file=sys.stderr)
+            return
         try:
             script_path = BACKEND_DIR / 'DailyRun.sh'
             if script_path.exists():
+                started = time.time()
                 result = subprocess.run(
                     ['bash', str(script_path)],
                     cwd=str(BACKEND_DIR),
                     capture_output=True,
                     text=True
                 )
+                record_daily_run('schedule', result.returncode, started)
                 print(f"Daily SBOM generation completed. Exit code: {result.returncode}", file=sys.stderr)
                 if result.stdout:
                     print(f"Output: {result.stdout}", file=sys.stderr)
@@ -596,7 +1522,10 @@ def schedule_daily_runs():
             else:
                 print(f"DailyRun.sh not found at {script_path}", file=sys.stderr)
         except Exception as e:
+            DAILY_RUNS.observe(0, trigger='schedule', outcome='error')
             print(f"Error running daily SBOM generation: {e}", file=sys.stderr)
+        finally:
+            run_lock.release()
     
     # Schedule to run daily at 2 AM
     schedule.every().day.at("02:00").do(run_daily_sbom_generation)
@@ -626,13 +1555,36 @@ def trigger_daily_sbom():
                 'error': 'DailyRun.sh not found'
             }), 404
         
+        # Scheduled and manual runs, from any worker, never overlap
+        run_lock = locks.FileLock(daily_run_lock_path())
+        if not run_lock.acquire(blocking=False):
+            return jsonify({
+                'success': False,
+                'error': 'A daily run is already in progress'
+            }), 409
+        
         # Run in background
-        subprocess.Popen(
-            ['bash', str(script_path)],
-            cwd=str(BACKEND_DIR),
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+        started = time.time()
+        try:
+            proc = subprocess.Popen(
+                ['bash', str(script_path)],
+                cwd=str(BACKEND_DIR),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+        except Exception:
+            run_lock.release()
+            raise
+        
+        def wait_for_run():
+            # communicate() also drains the pipes so a chatty run cannot block
+            try:
+                proc.communicate()
+                record_daily_run('manual', proc.returncode, started)
+            finally:
+                run_lock.release()
+        
+        threading.Thread(target=wait_for_run, daemon=True).start()
         
         return jsonify({
             'success': True,
@@ -654,7 +1606,8 @@ def get_daily_run_status():
             return jsonify({
                 'success': True,
                 'hasRun': False,
-                'message': 'No daily runs have been executed yet'
+                'message': 'No daily runs have been executed yet',
+                'scheduler': scheduler_status()
             })
         
         # Find the most recent log file
@@ -664,7 +1617,8 @@ def get_daily_run_status():
             return jsonify({
                 'success': True,
                 'hasRun': False,
-                'message': 'No log files found'
+                'message': 'No log files found',
+                'scheduler': scheduler_status()
             })
         
         latest_log = log_files[0]
@@ -679,7 +1633,8 @@ def get_daily_run_status():
             'hasRun': True,
             'logFile': latest_log.name,
             'lastModified': datetime.fromtimestamp(latest_log.stat().st_mtime).isoformat(),
-            'lastLines': ''.join(last_lines)
+            'lastLines': ''.join(last_lines),
+            'scheduler': scheduler_status()
         })
     except Exception as e:
         return jsonify({
@@ -689,13 +1644,9 @@ def get_daily_run_status():
 
 
 if __name__ == '__main__':
-    # Start daily scheduler
-    try:
-        import schedule
-        schedule_daily_runs()
-    except ImportError:
-        print("Warning: 'schedule' package not installed. Daily runs will not be scheduled.", file=sys.stderr)
-        print("Install with: pip install schedule", file=sys.stderr)
+    # Start daily scheduler (gunicorn workers join the election from gunicorn.conf.py)
+    start_scheduler()
+    start_watcher()
     
     # Get port from environment variable, default to 8080
     port = int(os.environ.get('PORT', 8080))
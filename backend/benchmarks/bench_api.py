@@ -0,0 +1,323 @@
+"""
+Load and latency benchmark for the SBOM API over a synthetic SBOM repository.
+
+Generates <root>/<Project>/SBOMs/vN trees (projects x versions x components),
+points the Flask app at them and drives the listing, detail, JSON/Markdown
+download, project export and create endpoints, either in-process through the Flask test
+client or over HTTP against gunicorn with concurrent clients. Each phase
+reports p50/p95/p99 latency, throughput and resident memory.
+
+    python benchmarks/bench_api.py --projects 3 --versions 200 --components 500
+    python benchmarks/bench_api.py --mode gunicorn --workers 4 --concurrency 16
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import random
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from cyclonedx_writer import bom_json
+
+# The first two keep /api/sboms/create working; further projects are listing-only
+PROJECT_NAMES = ["AnalysisBase", "StatAnalysis", "Athena"]
+CREATE_TYPES = ("AnalysisBase", "StatAnalysis")
+
+
+def project_names(count):
+    return (PROJECT_NAMES + [f"Project{i}" for i in range(len(PROJECT_NAMES) + 1, count + 1)])[:count]
+
+
+def synthetic_components(count, version, rng):
+    """Component rows for one version; a few versions move on each release"""
+    rows = []
+    for i in range(count):
+        name = f"package{i:05d}"
+        patch = version // 7 if rng.random() < 0.5 else version // 3
+        ver = f"{i % 5}.{i % 11}.{patch}"
+        bom_ref = "BomRef." + hashlib.sha256(f"{name}\0{ver}".encode("utf-8")).hexdigest()[:32]
+        rows.append((bom_ref, name, ver, [("source", f"src/{i % 13}.txt")] if i % 3 == 0 else []))
+    return rows
+
+
+def generate_tree(root: Path, projects, versions, components, seed=0):
+    """Write the synthetic repository and return the number of SBOM files"""
+    rng = random.Random(seed)
+    start = time.time() - versions * 3600
+    for project in projects:
+        project_dir = root / project
+        sboms_dir = project_dir / "SBOMs"
+        for version in range(1, versions + 1):
+            rows = synthetic_components(components, version, rng)
+            version_dir = sboms_dir / f"v{version}"
+            version_dir.mkdir(parents=True, exist_ok=True)
+            json_path = version_dir / f"{project.lower()}-sbom.json"
+            md_path = version_dir / f"{project.lower()}-sbom.md"
+            json_path.write_text(bom_json(rows, properties=[(project, "24.0")]), encoding="utf-8")
+            md_lines = [f"# {project} SBOM Report\n", f"**Total dependencies:** {len(rows)}\n",
+                        "| Package | Version |", "|---------|---------|"]
+            md_lines += [f"| {name} | {ver} |" for _, name, ver, _ in rows]
+            md_path.write_text("\n".join(md_lines), encoding="utf-8")
+            mtime = start + version * 3600
+            os.utime(json_path, (mtime, mtime))
+            os.utime(md_path, (mtime, mtime))
+
+        if project in CREATE_TYPES:
+            # Dependency inputs and the real generator, so create runs end to end
+            shutil.copy(BACKEND_DIR / project / "sbomGenerator.py", project_dir / "sbomGenerator.py")
+            rows = synthetic_components(components, versions, rng)
+            with open(project_dir / "cppDep.txt", "w", encoding="utf-8") as f:
+                f.writelines(f"{name}: {ver}\n" for _, name, ver, _ in rows[: components // 2])
+            with open(project_dir / "pyDep.txt", "w", encoding="utf-8") as f:
+                if project == "StatAnalysis":
+                    f.writelines(f"{name}=={ver}\n" for _, name, ver, _ in rows[components // 2:])
+                else:
+                    f.writelines(f"{name}: {ver}\n" for _, name, ver, _ in rows[components // 2:])
+    return len(projects) * versions * 2
+
+
+def create_app():
+    """gunicorn factory: the real app pointed at SBOM_BENCH_ROOT"""
+    import app as app_module
+    root = Path(os.environ["SBOM_BENCH_ROOT"])
+    app_module.BACKEND_DIR = root
+    app_module.SBOM_DIRS = {p.name: p for p in sorted(root.iterdir()) if (p / "SBOMs").is_dir()}
+    return app_module.app
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _proc_rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r", encoding="utf-8") as f:
+                if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                    children.append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    return children
+
+
+def rss_mb(server_pid=None):
+    """Resident memory of the server (gunicorn master plus workers) or of this process"""
+    if server_pid is None:
+        current = _proc_rss_kb(os.getpid())
+        if current:
+            return current / 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return sum(_proc_rss_kb(pid) for pid in [server_pid] + _children(server_pid)) / 1024
+
+
+def run_phase(name, call, requests, concurrency, server_pid=None):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        start = time.perf_counter()
+        ok = call(i)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            if not ok:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(requests):
+            one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    print(f"  {name:<10} n={requests:<5} c={concurrency:<3} "
+          f"p50 {percentile(latencies, 50) * 1000:8.1f} ms  "
+          f"p95 {percentile(latencies, 95) * 1000:8.1f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:8.1f} ms  "
+          f"{requests / wall if wall else 0:7.1f} req/s  "
+          f"rss {rss_mb(server_pid):7.1f} MB  errors {errors}")
+    return errors
+
+
+def phases(sbom_ids, project_names, create_types, args):
+    """(name, method, path builder, body, concurrency) for each benchmark phase"""
+    pick = lambda i: sbom_ids[i % len(sbom_ids)]
+    result = [
+        ("list", "GET", lambda i: "/api/sboms", None, args.concurrency),
+        ("detail", "GET", lambda i: f"/api/sboms/{pick(i)}", None, args.concurrency),
+        ("json", "GET", lambda i: f"/api/sboms/{pick(i)}/json", None, args.concurrency),
+        ("markdown", "GET", lambda i: f"/api/sboms/{pick(i)}/markdown", None, args.concurrency),
+        ("export", "GET", lambda i: f"/api/projects/{project_names[i % len(project_names)]}/export", None, args.concurrency),
+    ]
+    if create_types and not args.skip_create:
+        # create_sbom changes the working directory, so it is driven serially
+        result.append(("create", "POST", lambda i: "/api/sboms/create",
+                       lambda i: {"type": create_types[i % len(create_types)]}, 1))
+    return result
+
+
+def bench_test_client(root, args):
+    os.environ["SBOM_BENCH_ROOT"] = str(root)
+    app = create_app()
+    client = app.test_client()
+    listing = client.get("/api/sboms").get_json()
+    sbom_ids = [s["id"] for p in listing["projects"] for s in p["sboms"]]
+    project_names = [p["name"] for p in listing["projects"]]
+    create_types = [t for t in CREATE_TYPES if (root / t / "sbomGenerator.py").exists()]
+    print(f"Flask test client ({len(sbom_ids)} SBOMs):")
+    errors = 0
+    devnull = open(os.devnull, "w")
+    for name, method, path, body, concurrency in phases(sbom_ids, project_names, create_types, args):
+        def call(i, method=method, path=path, body=body):
+            # The generators print progress during create, which runs serially; keep the report readable
+            quiet = contextlib.redirect_stdout(devnull) if method == "POST" else contextlib.nullcontext()
+            with quiet:
+                response = client.open(path(i), method=method, json=body(i) if body else None)
+                # Streamed responses only do their work as the body is read
+                response.get_data()
+            return response.status_code < 400
+        errors += run_phase(name, call, args.requests, concurrency)
+    return errors
+
+
+def _wait_ready(base_url, proc, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(base_url + "/api/test", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def bench_gunicorn(root, args):
+    env = dict(os.environ, SBOM_BENCH_ROOT=str(root))
+    base_url = f"http://127.0.0.1:{args.port}"
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(args.workers), "--bind", f"127.0.0.1:{args.port}",
+         "--chdir", str(BACKEND_DIR), "--pythonpath", str(BENCH_DIR), "--log-level", "warning",
+         "bench_api:create_app()"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL if not args.verbose else None
+    )
+    try:
+        _wait_ready(base_url, proc)
+        with urllib.request.urlopen(base_url + "/api/sboms") as response:
+            listing = json.loads(response.read())
+        sbom_ids = [s["id"] for p in listing["projects"] for s in p["sboms"]]
+        project_names = [p["name"] for p in listing["projects"]]
+        create_types = [t for t in CREATE_TYPES if (root / t / "sbomGenerator.py").exists()]
+        print(f"gunicorn, {args.workers} worker(s) ({len(sbom_ids)} SBOMs):")
+        errors = 0
+        for name, method, path, body, concurrency in phases(sbom_ids, project_names, create_types, args):
+            def call(i, method=method, path=path, body=body):
+                data = json.dumps(body(i)).encode("utf-8") if body else None
+                request = urllib.request.Request(base_url + path(i), data=data, method=method,
+                                                 headers={"Content-Type": "application/json"})
+                try:
+                    with urllib.request.urlopen(request, timeout=300) as response:
+                        response.read()
+                        return response.status < 400
+                except urllib.error.HTTPError:
+                    return False
+            errors += run_phase(name, call, args.requests, concurrency, server_pid=proc.pid)
+        return errors
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--projects', type=int, default=3)
+    parser.add_argument('--versions', type=int, default=50)
+    parser.add_argument('--components', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per phase')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients for read phases')
+    parser.add_argument('--mode', choices=['test-client', 'gunicorn', 'both'], default='test-client')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers')
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--skip-create', action='store_true')
+    parser.add_argument('--root', help='Reuse or keep the synthetic repository here instead of a temp dir')
+    parser.add_argument('--verbose', action='store_true', help='Show server output')
+    args = parser.parse_args()
+
+    tmp = None
+    if args.root:
+        root = Path(args.root)
+        root.mkdir(parents=True, exist_ok=True)
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="sbom-bench-")
+        root = Path(tmp.name)
+
+    try:
+        if not any(root.iterdir()):
+            start = time.perf_counter()
+            files = generate_tree(root, project_names(args.projects), args.versions, args.components)
+            print(f"Generated {files} files ({args.projects} projects x {args.versions} versions x "
+                  f"{args.components} components) in {time.perf_counter() - start:.1f} s at {root}")
+        if not args.verbose:
+            # The app logs every listing call to stderr
+            sys.stderr = open(os.devnull, "w")
+
+        errors = 0
+        if args.mode in ("test-client", "both"):
+            errors += bench_test_client(root, args)
+        if args.mode in ("gunicorn", "both"):
+            errors += bench_gunicorn(root, args)
+    finally:
+        if tmp:
+            tmp.cleanup()
+
+    if errors:
+        print(f"{errors} request(s) failed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark the single-pass build log parser against the previous readlines() parser.
+
+Writes synthetic externalBuild.txt files of the requested sizes, checks both
+parsers extract the same fields and reports time and peak memory. The
+"tail" layout puts the package section at the end of the log, so the
+streaming parser cannot stop early.
+
+    python benchmarks/bench_build_log.py --sizes-mb 1 10 50
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from build_log import parse_build_log
+
+HEAD = [
+    "-- The C compiler identification is GNU 13.1.0",
+    "-- The CXX compiler identification is GNU 13.1.0",
+] + [f"-- Detecting C compiler ABI info - step {i}" for i in range(22)] + [
+    "-- Using platform name: x86_64-el9-gcc13-opt",
+    '-- Using LCG release "LCG_106b_ATLAS_1" for platform: x86_64-el9-gcc13-opt',
+]
+FILLER = "-- Looking for include file pthread.h - found in /cvmfs/sft.cern.ch/lcg/releases/gcc/13.1.0/x86_64-el9"
+
+
+def package_section(count):
+    lines = ["-- Package filtering rules read:"]
+    lines += [f"--   + External/Package{i:04d}" for i in range(count)]
+    lines += ["--   - .*", "-- Configuring the build of the externals"]
+    return lines
+
+
+def write_log(path, size_mb, layout, packages=300):
+    target = size_mb * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(HEAD) + "\n")
+        if layout == "head":
+            f.write("\n".join(package_section(packages)) + "\n")
+        written = f.tell()
+        filler = (FILLER + "\n") * 1000
+        while written < target:
+            f.write(filler)
+            written += len(filler)
+        if layout == "tail":
+            f.write("\n".join(package_section(packages)) + "\n")
+
+
+def legacy_parse(build_txt_path):
+    """The readlines() parser the Athena generator used before"""
+    result = {'lcg_version': None, 'platform': None, 'packages': [],
+              'C Compiler': None, 'CXX Compiler': None, 'Platform': None}
+    with open(build_txt_path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+        if len(lines) > 0:
+            c_match = re.search(r'The C compiler identification is (.+)', lines[0].strip())
+            if c_match:
+                result['C Compiler'] = c_match.group(1)
+        if len(lines) > 1:
+            cxx_match = re.search(r'The CXX compiler identification is (.+)', lines[1].strip())
+            if cxx_match:
+                result['CXX Compiler'] = cxx_match.group(1)
+        for line in lines:
+            lcg_match = re.search(r'LCG release "LCG_([^"]+)" for platform: (.+)', line.strip())
+            if lcg_match:
+                result['lcg_version'] = lcg_match.group(1)
+                result['platform'] = lcg_match.group(2)
+                break
+        for line in lines:
+            platform_match = re.search(r'Using platform name: (.+)', line.strip())
+            if platform_match:
+                result['Platform'] = platform_match.group(1)
+                break
+        in_package_section = False
+        for line in lines:
+            line = line.strip()
+            if 'Package filtering rules read:' in line:
+                in_package_section = True
+                continue
+            if in_package_section:
+                if line.startswith('-- Configuring') or (line == '' and result['packages']):
+                    break
+                pkg_match = re.search(r'--\s+\+\s+External/(.+)', line)
+                if pkg_match:
+                    result['packages'].append(pkg_match.group(1).strip())
+                elif line.startswith('--   -'):
+                    break
+    return result
+
+
+def measure(func, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes-mb', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.sizes_mb:
+            for layout in ("head", "tail"):
+                path = os.path.join(tmp, f"externalBuild-{size_mb}-{layout}.txt")
+                write_log(path, size_mb, layout)
+                old_time, old_peak, expected = measure(legacy_parse, path)
+                new_time, new_peak, actual = measure(parse_build_log, path)
+                same = expected == actual
+                failed = failed or not same
+                print(f"{size_mb:>4} MB, packages at {layout}: "
+                      f"readlines {old_time * 1000:8.1f} ms / {old_peak / 1e6:7.1f} MB peak, "
+                      f"streaming {new_time * 1000:8.1f} ms / {new_peak / 1e6:5.2f} MB peak, "
+                      f"same={same}")
+
+    if failed:
+        print("Streaming parser result differs from the readlines() parser")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark the direct CycloneDX writer against cyclonedx-python-lib.
+
+Builds the same synthetic component list both ways, checks the output is
+byte-identical for each spec version, with and without dependency edges,
+and reports the time per document.
+
+    python benchmarks/bench_cyclonedx_writer.py --components 10000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cyclonedx.model import Property
+from cyclonedx.model.bom import Bom, BomMetaData
+from cyclonedx.model.component import Component, ComponentType
+from cyclonedx.output import make_outputter
+from cyclonedx.schema import OutputFormat, SchemaVersion
+
+from cyclonedx_writer import bom_json
+
+SCHEMA_VERSIONS = {"1.4": SchemaVersion.V1_4, "1.5": SchemaVersion.V1_5}
+METADATA = [("AnalysisBase", "24.0"), ("AnalysisBaseExternals", "24.2.42")]
+
+
+def synthetic_rows(count):
+    rows = []
+    for i in range(count):
+        name = f"pkg{i % (count // 3 or 1)}"
+        version = f"{i % 7}.{i % 13}.{i % 5}"
+        bom_ref = "BomRef." + hashlib.sha256(f"{name}\0{version}\0{i}".encode("utf-8")).hexdigest()[:32]
+        props = [("source", f"src/{i % 11}.txt")] if i % 2 else []
+        rows.append((bom_ref, name, version, props))
+    return rows
+
+
+def synthetic_edges(rows):
+    """Each component depends on up to three earlier ones"""
+    refs = [row[0] for row in rows]
+    return {ref: [refs[j] for j in (i // 2, i // 3, i - 1) if 0 <= j < i] for i, ref in enumerate(refs)}
+
+
+def library_json(rows, spec_version, edges=None):
+    metadata = BomMetaData(properties=[Property(name=n, value=v) for n, v in METADATA])
+    metadata.timestamp = None
+    bom = Bom(metadata=metadata)
+    components = {}
+    for bom_ref, name, version, props in rows:
+        components[bom_ref] = Component(
+            name=name,
+            version=version,
+            type=ComponentType.LIBRARY,
+            bom_ref=bom_ref,
+            properties=[Property(name=n, value=v) for n, v in props]
+        )
+        bom.components.add(components[bom_ref])
+    for bom_ref, targets in (edges or {}).items():
+        if targets:
+            bom.register_dependency(components[bom_ref], [components[t] for t in targets])
+    outputter = make_outputter(bom=bom, output_format=OutputFormat.JSON,
+                               schema_version=SCHEMA_VERSIONS[spec_version])
+    data = json.loads(outputter.output_as_string())
+    data.pop("serialNumber", None)
+    body = json.dumps(data, sort_keys=True)
+    data["serialNumber"] = f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, hashlib.sha256(body.encode('utf-8')).hexdigest())}"
+    return json.dumps(data, sort_keys=True)
+
+
+def fast_json(rows, spec_version, edges=None):
+    return bom_json(rows, properties=METADATA, spec_version=spec_version, dependencies=edges)
+
+
+def schema_check(document, spec_version):
+    from cyclonedx.exception import MissingOptionalDependencyException
+    from cyclonedx.validation.json import JsonStrictValidator
+    try:
+        error = JsonStrictValidator(SCHEMA_VERSIONS[spec_version]).validate_str(document)
+    except MissingOptionalDependencyException:
+        return "skipped (needs cyclonedx-python-lib[json-validation])"
+    return "ok" if error is None else f"FAILED: {error}"
+
+
+def timed(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--components', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    failed = False
+    for count in sorted({0, 1, args.components}):
+        rows = synthetic_rows(count)
+        for edges, label in ((None, ""), (synthetic_edges(rows), " +edges")):
+            for spec_version in SCHEMA_VERSIONS:
+                lib_time, expected = timed(library_json, rows, spec_version, edges, repeat=args.repeat)
+                fast_time, actual = timed(fast_json, rows, spec_version, edges, repeat=args.repeat)
+                identical = expected == actual
+                failed = failed or not identical
+                print(f"{count:>7} components{label}, spec {spec_version}: "
+                      f"library {lib_time * 1000:9.1f} ms, direct {fast_time * 1000:8.1f} ms "
+                      f"({lib_time / fast_time if fast_time else 0:5.1f}x), "
+                      f"identical={identical}, schema {schema_check(actual, spec_version)}")
+
+    if failed:
+        print("Direct writer output differs from cyclonedx-python-lib")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
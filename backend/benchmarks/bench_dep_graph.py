@@ -0,0 +1,84 @@
+"""
+Benchmark dependency-graph queries against a per-query graph search.
+
+Builds a synthetic SBOM whose components form a layered graph with a few
+cycles, then times building the ClosureIndex, answering "who depends on X"
+and "what does X pull in" for every component from the index, and the same
+queries by breadth-first search. Every answer is checked against the search.
+
+    python benchmarks/bench_dep_graph.py --components 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dep_graph import ClosureIndex
+
+
+def synthetic_sbom(count, fanout, cycles, rng):
+    components = [{'type': 'library', 'name': f"package-{i:05d}", 'version': f"1.{i % 10}.0",
+                   'bom-ref': f"ref-{i:05d}"} for i in range(count)]
+    dependencies = []
+    for i in range(count):
+        # Mostly edges to lower-numbered packages, like libraries built on top of each other
+        targets = {rng.randrange(i) for _ in range(rng.randint(0, fanout))} if i else set()
+        dependencies.append({'ref': f"ref-{i:05d}", 'dependsOn': sorted(f"ref-{j:05d}" for j in targets)})
+    for _ in range(cycles):
+        i = rng.randrange(1, count)
+        dependencies[rng.randrange(i)]['dependsOn'].append(f"ref-{i:05d}")
+    return {'bomFormat': 'CycloneDX', 'specVersion': '1.4', 'components': components, 'dependencies': dependencies}
+
+
+def search(edges, start):
+    """Reference: breadth-first search from start"""
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        for target in edges[queue.popleft()]:
+            if target not in seen:
+                seen.add(target)
+                queue.append(target)
+    seen.discard(start)
+    return sorted(seen)
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<36} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--components', type=int, default=5000)
+    parser.add_argument('--fanout', type=int, default=6, help='Maximum direct dependencies per component')
+    parser.add_argument('--cycles', type=int, default=20, help='Back edges added to create cycles')
+    args = parser.parse_args()
+
+    sbom = synthetic_sbom(args.components, args.fanout, args.cycles, random.Random(1))
+    index = timed("build index", lambda: ClosureIndex.from_sbom(sbom))
+    print(f"{len(index.nodes)} components, {index.edge_count} edges")
+    nodes = range(len(index.nodes))
+
+    down = timed("index: dependencies of every node", lambda: [index.dependencies(i) for i in nodes])
+    timed("index: again, decoded sets cached", lambda: [index.dependencies(i) for i in nodes])
+    up = timed("index: dependents of every node", lambda: [index.dependents(i) for i in nodes])
+    down_ref = timed("search: dependencies of every node", lambda: [search(index.edges, i) for i in nodes])
+    up_ref = timed("search: dependents of every node", lambda: [search(index.reverse, i) for i in nodes])
+    print(f"{sum(map(len, up)) / len(up):.1f} dependents per component on average")
+
+    if down != down_ref or up != up_ref:
+        print("Closure index disagrees with graph search")
+        sys.exit(1)
+    print("All answers match graph search")
+
+
+if __name__ == "__main__":
+    main()
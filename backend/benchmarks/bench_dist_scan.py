@@ -0,0 +1,73 @@
+"""
+Benchmark reading installed distributions against pip freeze.
+
+Writes a synthetic site-packages directory with --distributions *.dist-info
+entries, each with METADATA and a RECORD of --files hashed files. It then
+times dist_scan.scan() with one thread and with the default pool, and
+`pip freeze --path` over the same directory. The scanned names and versions
+are checked against pip's.
+
+    python benchmarks/bench_dist_scan.py --distributions 2000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dist_scan
+
+
+def write_site_packages(site_dir, count, files):
+    for i in range(count):
+        name, version = f"package_{i:05d}", f"{i % 7}.{i % 13}.{i % 5}"
+        meta_dir = os.path.join(site_dir, f"{name}-{version}.dist-info")
+        os.makedirs(meta_dir)
+        with open(os.path.join(meta_dir, "METADATA"), "w", encoding="utf-8") as f:
+            f.write(f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+                    f"Classifier: License :: OSI Approved :: MIT License\n\n{name} description\n")
+        with open(os.path.join(meta_dir, "RECORD"), "w", encoding="utf-8") as f:
+            for j in range(files):
+                f.write(f"{name}/module_{j}.py,sha256={i:05d}{j:05d}abcdefghijklmnopqrstuvwxyz0123,{100 + j}\n")
+            f.write(f"{os.path.basename(meta_dir)}/RECORD,,\n")
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<32} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def pip_freeze(site_dir):
+    output = subprocess.run([sys.executable, "-m", "pip", "freeze", "--all", "--path", site_dir],
+                            capture_output=True, text=True, check=True).stdout
+    return sorted(tuple(line.split("==", 1)) for line in output.splitlines() if "==" in line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--distributions', type=int, default=2000)
+    parser.add_argument('--files', type=int, default=20, help='RECORD entries per distribution')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as site_dir:
+        write_site_packages(site_dir, args.distributions, args.files)
+        timed("scan, 1 thread", lambda: dist_scan.scan([site_dir], jobs=1))
+        found = timed("scan, thread pool", lambda: dist_scan.scan([site_dir]))
+        timed("scan without hashes", lambda: dist_scan.scan([site_dir], hashes=False))
+        frozen = timed("pip freeze --path", lambda: pip_freeze(site_dir))
+
+    scanned = sorted((dist.name, dist.version) for dist in found)
+    if scanned != frozen:
+        print(f"Scan found {len(scanned)} distributions, pip freeze {len(frozen)}; they differ")
+        sys.exit(1)
+    print(f"{len(scanned)} distributions match pip freeze, {sum(len(d.files) for d in found)} file hashes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Stage timings for the three SBOM generators, replayed from recorded inputs.
+
+For every scale a fixture tree is written (or reused with --fixtures):
+externalBuild.txt, an LCG release page, an AtlasExternals/External tree,
+package_filters.txt and cppDep.txt/pyDep.txt. A copy of each project's
+sbomGenerator.py is placed next to its fixtures, so the generators resolve
+their inputs exactly as they do in production, and every pipeline stage is
+timed. The Athena generator runs offline against the recorded LCG page.
+
+Results are printed and can be written as JSON. Given a previous results file
+with --baseline, any stage slower than --tolerance times its baseline exits 1.
+
+    python benchmarks/bench_generators.py --scales 100 1000 --json results.json
+    python benchmarks/bench_generators.py --baseline results.json
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+PROJECTS = ("AnalysisBase", "Athena", "StatAnalysis")
+# Baseline differences below this are treated as noise
+NOISE_FLOOR = 0.005
+
+LCG_VERSION = "106b_ATLAS_1"
+LCG_PLATFORM = "x86_64-el9-gcc13-opt"
+
+
+def package(i):
+    return f"Package{i:05d}"
+
+
+def version(i):
+    return f"{i % 7}.{i % 13}.{i % 5}"
+
+
+def build_log(packages):
+    lines = [
+        "-- The C compiler identification is GNU 13.1.0",
+        "-- The CXX compiler identification is GNU 13.1.0",
+        f"-- Using platform name: {LCG_PLATFORM}",
+        f'-- Using LCG release "LCG_{LCG_VERSION}" for platform: {LCG_PLATFORM}',
+        "-- Package filtering rules read:",
+    ]
+    lines += [f"--   + External/{name}" for name in packages]
+    lines += ["--   - .*", "-- Configuring the build of the externals", ""]
+    return "\n".join(lines)
+
+
+def lcg_page(count):
+    rows = [f'<tr><td><a href="/pkg/{package(i)}/">{package(i)}</a></td>'
+            f'<td><a href="/pkgver/{package(i)}/{version(i)}/">{version(i)}</a></td></tr>'
+            for i in range(count)]
+    return '<html><body><table id="release">\n' + "\n".join(rows) + "\n</table></body></html>\n"
+
+
+def write_externals(external_dir: Path, packages):
+    for i, name in enumerate(packages):
+        pkg_dir = external_dir / name
+        pkg_dir.mkdir(parents=True, exist_ok=True)
+        (pkg_dir / "CMakeLists.txt").write_text(
+            f"# Build {name}\n"
+            f"set( {name}_SOURCE\n"
+            f"   \"http://cern.ch/atlas-software-dist-eos/externals/{name}/sources/{name}-{version(i)}.tar.gz\" )\n"
+            f"ExternalProject_Add( {name} URL ${{{name}_SOURCE}} )\n",
+            encoding="utf-8")
+
+
+def write_fixtures(root: Path, scale):
+    """Recorded inputs for one scale; `scale` is the number of packages per input"""
+    packages = [package(i) for i in range(scale)]
+    cpp = "".join(f"Cpp{i:05d}: {version(i)} 2024-05-01 12:00\n" for i in range(scale // 2))
+
+    # AnalysisBase: package_filters.txt and External/ are read from the working directory
+    ab = root / "AnalysisBase"
+    write_externals(ab / "External", packages)
+    (ab / "External" / "package_filters.txt").write_text(
+        "".join(f"+ External/{name}\n" for name in packages) + "- .*\n", encoding="utf-8")
+    (ab / "externalBuild.txt").write_text(build_log(packages), encoding="utf-8")
+    (ab / "cppDep.txt").write_text(cpp, encoding="utf-8")
+    (ab / "pyDep.txt").write_text("".join(f"py{i:05d}: {version(i)}\n" for i in range(scale // 2)), encoding="utf-8")
+
+    # Athena: four in five build packages are on the LCG page, the rest come from AtlasExternals
+    athena = root / "Athena"
+    athena.mkdir(parents=True, exist_ok=True)
+    on_lcg = scale * 4 // 5
+    (athena / "externalBuild.txt").write_text(build_log(packages), encoding="utf-8")
+    (athena / "ExampleLcgInfoWebsiteHtmlCode.html").write_text(lcg_page(on_lcg), encoding="utf-8")
+    write_externals(athena / "AtlasExternals" / "External", packages[on_lcg:])
+    (athena / "cppDep.txt").write_text(cpp, encoding="utf-8")
+
+    stat = root / "StatAnalysis"
+    stat.mkdir(parents=True, exist_ok=True)
+    (stat / "cppDep.txt").write_text(cpp, encoding="utf-8")
+    (stat / "pyDep.txt").write_text("".join(f"py{i:05d}=={version(i)}\n" for i in range(scale // 2)), encoding="utf-8")
+
+    for project in PROJECTS:
+        shutil.copy(BACKEND_DIR / project / "sbomGenerator.py", root / project / "sbomGenerator.py")
+
+
+def load_generator(path: Path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def analysisbase_stages(module, project_dir: Path):
+    """(stage, callable) pairs run in order against one generator"""
+    gen = module.SBOMGenerator()
+    state = {}
+
+    def parse_cmakelists():
+        with working_directory(project_dir / "External"):
+            gen.parse_cmakelists(full_scan=True)
+
+    def parse_deps():
+        gen.parse_py_deps()
+        gen.parse_cpp_deps()
+
+    def parse_build_info():
+        state["build_info"] = gen.parse_build_info()
+
+    def serialize(fast):
+        gen.fast_writer = fast
+        return gen.generate_cyclonedx_sbom(build_info=state["build_info"])
+
+    return gen, [
+        ("parse_cmakelists", parse_cmakelists),
+        ("parse_deps", parse_deps),
+        ("parse_build_info", parse_build_info),
+        ("serialize", lambda: serialize(False)),
+        ("serialize_fast", lambda: serialize(True)),
+        ("markdown", lambda: gen.generate_markdown_report(build_info=state["build_info"])),
+    ]
+
+
+def athena_stages(module, project_dir: Path):
+    gen = module.SBOMGenerator()
+    gen.offline = True
+    state = {}
+
+    def parse_build_info():
+        state["build_info"] = gen.parse_build_info()
+
+    def fetch_lcg():
+        info = state["build_info"]
+        state["lcg"] = gen.fetch_and_parse_lcg_packages(
+            info["lcg_version"], info["platform"], fallback_html_path="ExampleLcgInfoWebsiteHtmlCode.html")
+        for name, ver in state["lcg"].items():
+            gen.dependencies.add(module.Dependency(name=name, version=ver, source="LCG Website"))
+
+    def find_missing():
+        state["missing"] = gen.find_missing_packages(state["build_info"]["packages"], state["lcg"])
+
+    def parse_atlasexternals():
+        for name, ver in gen.parse_atlasexternals_packages(state["missing"], full_scan=True).items():
+            gen.dependencies.add(module.Dependency(name=name, version=ver, source="AtlasExternals"))
+
+    def serialize(fast):
+        gen.fast_writer = fast
+        return gen.generate_cyclonedx_sbom(build_info=state["build_info"])
+
+    return gen, [
+        ("parse_build_info", parse_build_info),
+        ("fetch_and_parse_lcg_packages", fetch_lcg),
+        ("find_missing_packages", find_missing),
+        ("parse_atlasexternals_packages", parse_atlasexternals),
+        ("parse_cpp_deps", gen.parse_cpp_deps),
+        ("serialize", lambda: serialize(False)),
+        ("serialize_fast", lambda: serialize(True)),
+        ("markdown", lambda: gen.generate_markdown_report(build_info=state["build_info"])),
+    ]
+
+
+def statanalysis_stages(module, project_dir: Path):
+    gen = module.SBOMGenerator(py_file=str(project_dir / "pyDep.txt"), cpp_file=str(project_dir / "cppDep.txt"))
+
+    def serialize(fast):
+        gen.fast_writer = fast
+        return gen.generate_cyclonedx_sbom()
+
+    return gen, [
+        ("parse_py_deps", gen.parse_py_deps),
+        ("parse_cpp_deps", gen.parse_cpp_deps),
+        ("serialize", lambda: serialize(False)),
+        ("serialize_fast", lambda: serialize(True)),
+        ("markdown", gen.generate_markdown_report),
+    ]
+
+
+STAGES = {
+    "AnalysisBase": analysisbase_stages,
+    "Athena": athena_stages,
+    "StatAnalysis": statanalysis_stages,
+}
+
+
+def run_project(project, project_dir: Path, scale, repeat, skip):
+    """Median and minimum seconds per stage over `repeat` fresh pipeline runs"""
+    module = load_generator(project_dir / "sbomGenerator.py", f"bench_sbomGenerator_{project}_{scale}")
+    # parse_cmakelists appends to cppDep.txt; every run starts from the recorded inputs
+    recorded = {name: (project_dir / name).read_bytes() for name in ("cppDep.txt", "pyDep.txt")
+                if (project_dir / name).exists()}
+    timings = {}
+    components = 0
+    for _ in range(repeat):
+        for name, data in recorded.items():
+            (project_dir / name).write_bytes(data)
+        gen, stages = STAGES[project](module, project_dir)
+        for stage, func in stages:
+            if stage in skip:
+                continue
+            # The generators report progress on stdout; keep the results readable
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                start = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - start
+            timings.setdefault(stage, []).append(elapsed)
+        components = len(gen.dependencies)
+    for name, data in recorded.items():
+        (project_dir / name).write_bytes(data)
+    return components, [
+        {"project": project, "scale": scale, "stage": stage, "components": components,
+         "median": statistics.median(values), "min": min(values)}
+        for stage, values in timings.items()
+    ]
+
+
+def compare(results, baseline, tolerance):
+    """Stages whose median regressed beyond tolerance against a previous results file"""
+    previous = {(r["project"], r["scale"], r["stage"]): r["median"] for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        before = previous.get((r["project"], r["scale"], r["stage"]))
+        if before is None:
+            continue
+        if r["median"] > before * tolerance and r["median"] - before > NOISE_FLOOR:
+            regressions.append((r, before))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scales', type=int, nargs='+', default=[100, 1000],
+                        help='Packages per recorded input')
+    parser.add_argument('--projects', nargs='+', choices=PROJECTS, default=list(PROJECTS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip', nargs='*', default=[], help='Stages to leave out, e.g. serialize')
+    parser.add_argument('--fixtures', help='Replay (or record into) this directory instead of a temp dir')
+    parser.add_argument('--json', help='Write machine-readable results here')
+    parser.add_argument('--baseline', help='Previous --json output to compare against')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='Allowed slowdown against the baseline')
+    args = parser.parse_args()
+
+    tmp = None
+    if args.fixtures:
+        fixtures = Path(args.fixtures)
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="sbom-fixtures-")
+        fixtures = Path(tmp.name)
+
+    results = []
+    try:
+        for scale in args.scales:
+            scale_dir = fixtures / str(scale)
+            if not scale_dir.exists():
+                write_fixtures(scale_dir, scale)
+            for project in args.projects:
+                components, rows = run_project(project, scale_dir / project, scale, args.repeat, set(args.skip))
+                print(f"{project} @ {scale} ({components} components)")
+                for r in rows:
+                    print(f"  {r['stage']:<32} {r['median'] * 1000:10.1f} ms  (min {r['min'] * 1000:.1f} ms)")
+                results.extend(rows)
+    finally:
+        if tmp:
+            tmp.cleanup()
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for r, before in regressions:
+            print(f"REGRESSION {r['project']} @ {r['scale']} {r['stage']}: "
+                  f"{before * 1000:.1f} ms -> {r['median'] * 1000:.1f} ms")
+        if regressions:
+            sys.exit(1)
+        print(f"No stage regressed beyond {args.tolerance:.2f}x the baseline")
+
+
+if __name__ == "__main__":
+    main()
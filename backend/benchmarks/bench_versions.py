@@ -0,0 +1,126 @@
+"""
+Benchmark version parsing and ordering with and without the key cache.
+
+Draws a list of version strings in the spellings found in stored SBOMs
+(dotted, Boost underscores, LCG releases, pip pre/post releases, dates) and
+times sorting it and comparing random pairs, once through the cached
+version_key() and once parsing every string again. Known orderings are
+checked first.
+
+    python benchmarks/bench_versions.py --versions 1000000 --pairs 2000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import versions
+
+# Each chain must sort strictly ascending
+ORDERINGS = [
+    ['1.0.dev0', '1.0a1', '1.0b2', '1.0rc1', '1.0', '1.0.post1', '1.0.1', '1.1'],
+    ['1_85_0', '1_86_0', '1.87.0'],
+    ['105', '106', '106a', '106b', '106b_ATLAS_1', '106b_ATLAS_2', '107'],
+    ['LCG_104', 'LCG_106b_ATLAS_1'],
+    ['1.1.1', '1.1.1k', '1.1.1w', '3.0.0'],
+    ['9.6.3.15', '10.6.3.15'],
+    ['2.0-beta', '2.0-beta.2', '2.0'],
+    ['1.2', '1:0.5', '2!0.1'],
+    ['231005', '20231005'],
+]
+# Each pair must compare equal
+EQUIVALENT = [('1.0', '1.0.0'), ('1_86_0', '1.86.0'), ('v2.1', '2.1'), ('boost_1_86_0', '1.86'), ('1.0rc1', '1.0.0rc1')]
+# Each must have no key: git hashes, even when they start with digits
+NOT_COMPARABLE = ['undefined', '1e5a7f3', '20ab9c1', 'deadbeef', '3f786850e387550fdab836ed7e6dc881de23001b']
+
+
+def check():
+    failures = []
+    for chain in ORDERINGS:
+        for older, newer in zip(chain, chain[1:]):
+            if versions.compare(older, newer) != -1:
+                failures.append(f"{older} < {newer}")
+    for a, b in EQUIVALENT:
+        if versions.compare(a, b) != 0:
+            failures.append(f"{a} == {b}")
+    for version in NOT_COMPARABLE:
+        if versions.version_key(version) is not None:
+            failures.append(f"{version} not comparable")
+    return failures
+
+
+def synthetic_versions(count, distinct, rng):
+    pool = set()
+    while len(pool) < distinct:
+        major, minor, patch = rng.randint(0, 30), rng.randint(0, 40), rng.randint(0, 20)
+        style = rng.randrange(8)
+        if style == 0:
+            pool.add(f"{major}_{minor}_{patch}")
+        elif style == 1:
+            pool.add(f"{100 + major}{rng.choice(['', 'a', 'b', 'c'])}_ATLAS_{rng.randint(1, 5)}")
+        elif style == 2:
+            pool.add(f"{major}.{minor}.{patch}{rng.choice(['a', 'b', 'rc'])}{rng.randint(1, 3)}")
+        elif style == 3:
+            pool.add(f"{major}.{minor}.post{patch}")
+        elif style == 4:
+            pool.add(f"20{rng.randint(10, 25)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}")
+        elif style == 5:
+            pool.add(f"{major}.{minor}.{patch}.{rng.randint(0, 99)}")
+        else:
+            pool.add(f"{major}.{minor}.{patch}")
+    pool = sorted(pool)
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def parsed_sort_key(version):
+    key = versions.version_key.__wrapped__(version)
+    return (key is None, key or (), version)
+
+
+def parsed_compare(a, b):
+    key_a, key_b = versions.version_key.__wrapped__(a), versions.version_key.__wrapped__(b)
+    return (key_a > key_b) - (key_a < key_b)
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<40} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--versions', type=int, default=1000000)
+    parser.add_argument('--distinct', type=int, default=5000, help='Distinct version strings in the list')
+    parser.add_argument('--pairs', type=int, default=2000000, help='Random pairs compared')
+    args = parser.parse_args()
+
+    failures = check()
+    if failures:
+        print("Wrong ordering: " + ", ".join(failures))
+        sys.exit(1)
+    print(f"{sum(len(c) - 1 for c in ORDERINGS) + len(EQUIVALENT) + len(NOT_COMPARABLE)} known orderings hold")
+
+    rng = random.Random(1)
+    values = synthetic_versions(args.versions, args.distinct, rng)
+    pairs = [(rng.choice(values), rng.choice(values)) for _ in range(args.pairs)]
+
+    versions.version_key.cache_clear()
+    cached_order = timed(f"sort {args.versions} (cached keys)", lambda: sorted(values, key=versions.sort_key))
+    parsed_order = timed(f"sort {args.versions} (parse every time)", lambda: sorted(values, key=parsed_sort_key))
+    timed(f"compare {args.pairs} pairs (cached keys)", lambda: [versions.compare(a, b) for a, b in pairs])
+    timed(f"compare {args.pairs} pairs (parse every time)", lambda: [parsed_compare(a, b) for a, b in pairs])
+    print(versions.cache_info())
+
+    if cached_order != parsed_order:
+        print("Cached and uncached keys sort differently")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
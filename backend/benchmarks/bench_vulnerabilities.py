@@ -0,0 +1,143 @@
+"""
+Benchmark offline vulnerability matching at advisory-database scale.
+
+Writes a synthetic OSV dump (an all.zip, as osv.dev publishes it) of the
+requested size over a few thousand package names, and an SBOMs directory with
+many versions. It then times building the index, loading the pickled index,
+a cold scan of every version and a warm scan served from the per-digest
+result cache. Sampled components are checked against a linear scan of every
+advisory.
+
+    python benchmarks/bench_vulnerabilities.py --advisories 100000 --versions 1000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vulnerabilities
+
+
+def version(rng):
+    return f"{rng.randint(0, 9)}.{rng.randint(0, 30)}.{rng.randint(0, 9)}"
+
+
+def write_dump(path, count, packages, rng):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for i in range(count):
+            affected = {'package': {'ecosystem': 'PyPI', 'name': rng.choice(packages)}}
+            if i % 10 == 0:
+                affected['versions'] = [version(rng) for _ in range(3)]
+            else:
+                # Real advisories mostly cover a few minor releases
+                major, minor = rng.randint(0, 9), rng.randint(0, 30)
+                lower, upper = f"{major}.{minor}.0", f"{major}.{minor + rng.randint(1, 3)}.{rng.randint(0, 9)}"
+                events = [{'introduced': '0' if i % 50 == 0 else lower}, {'fixed': upper}]
+                affected['ranges'] = [{'type': 'ECOSYSTEM', 'events': events}]
+            advisory = {'id': f"BENCH-{i:07d}", 'summary': f"Synthetic advisory {i}",
+                        'database_specific': {'severity': rng.choice(['LOW', 'MODERATE', 'HIGH', 'CRITICAL'])},
+                        'affected': [affected]}
+            archive.writestr(f"BENCH-{i:07d}.json", json.dumps(advisory))
+
+
+def write_sboms(sboms_dir, versions, components, packages, rng):
+    for v in range(1, versions + 1):
+        version_dir = sboms_dir / f"v{v}"
+        version_dir.mkdir(parents=True)
+        chosen = rng.sample(packages, components)
+        data = {'bomFormat': 'CycloneDX', 'specVersion': '1.6',
+                'components': [{'type': 'library', 'name': name, 'version': version(rng)} for name in chosen]}
+        (version_dir / 'bench-sbom.json').write_text(json.dumps(data), encoding='utf-8')
+
+
+def linear_match(db_dir, name, ver, ecosystem):
+    """Reference: every advisory record checked one by one"""
+    key = vulnerabilities.version_key(ver)
+    hits = set()
+    for doc in vulnerabilities._documents(db_dir):
+        for advisory, package, intervals, exact in vulnerabilities._records(doc):
+            if vulnerabilities.normalize_name(package) != vulnerabilities.normalize_name(name):
+                continue
+            if ecosystem not in (None, advisory['ecosystem']):
+                continue
+            if key in exact or any(lower <= key and (upper is None or key < upper or (inclusive and key == upper))
+                                   for lower, upper, inclusive in intervals):
+                hits.add(advisory['id'])
+    return hits
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<28} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--advisories', type=int, default=100000)
+    parser.add_argument('--packages', type=int, default=5000)
+    parser.add_argument('--versions', type=int, default=1000)
+    parser.add_argument('--components', type=int, default=150)
+    parser.add_argument('--samples', type=int, default=10, help='Components checked against a linear scan')
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    packages = [f"package-{i:05d}" for i in range(args.packages)]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        db_dir = tmp / 'advisories'
+        db_dir.mkdir()
+        sboms_dir = tmp / 'SBOMs'
+        os.environ['SBOM_ADVISORY_DB'] = str(db_dir)
+        os.environ['SBOM_VULN_CACHE'] = str(tmp / 'cache')
+
+        timed(f"write {args.advisories} advisories", lambda: write_dump(db_dir / 'all.zip', args.advisories, packages, rng))
+        write_sboms(sboms_dir, args.versions, args.components, packages, rng)
+        print(f"{args.versions} versions x {args.components} components over {args.packages} packages")
+
+        index = timed("build index", vulnerabilities.load_index)
+        vulnerabilities._index_cache.clear()
+        index = timed("load pickled index", vulnerabilities.load_index)
+
+        stored = vulnerabilities.stored_sboms(sboms_dir)
+
+        def scan():
+            return [vulnerabilities.match_stored(path, index=index) for _, path in stored]
+
+        results = timed("cold scan", scan)
+        vulnerabilities._matches.clear()
+        timed("warm scan (per-digest cache)", scan)
+        findings = sum(r['summary']['total'] for r in results)
+        print(f"{findings} findings, {findings / len(results):.1f} per version")
+
+        failed = False
+        # Half affected components, half from anywhere, so misses are checked too
+        affected = [(f['component'], f['version'], f['ecosystem']) for r in results for f in r['findings']]
+        components = vulnerabilities.sbom_components(json.loads(stored[0][1].read_bytes()))
+        sample = rng.sample(affected, min(len(affected), args.samples // 2))
+        sample += rng.sample(components, min(len(components), args.samples - len(sample)))
+        # The same components as C/C++ externals: NVD only, so no PyPI advisory may match
+        sample += [(name, ver, vulnerabilities.NVD) for name, ver, _ in sample]
+        for name, ver, ecosystem in sample:
+            expected = linear_match(db_dir, name, ver, ecosystem)
+            actual = {index.advisories[i]['id'] for i in index.lookup(name, ver, ecosystem)}
+            if expected != actual:
+                failed = True
+                print(f"Mismatch for {name} {ver} ({ecosystem or 'any'}): index {sorted(actual)}, linear {sorted(expected)}")
+        print(f"{len(sample)} sampled components match the linear scan: {not failed}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Single-pass parser for the CMake configure log (externalBuild.txt).
+
+The log is memory-mapped and scanned once. Outside the package filtering
+section the scanner jumps straight to the next line containing a marker for
+a still-missing field (mmap.find runs at C speed), regexes only run on those
+lines, and the scan stops as soon as every requested field has been found,
+so usually only the head of a multi-megabyte log is touched.
+"""
+
+import mmap
+import os
+import re
+from typing import Dict, Iterable, Optional
+
+C_COMPILER = "C Compiler"
+CXX_COMPILER = "CXX Compiler"
+PLATFORM = "Platform"
+LCG_VERSION = "lcg_version"
+LCG_PLATFORM = "platform"
+PACKAGES = "packages"
+ALL_FIELDS = (C_COMPILER, CXX_COMPILER, PLATFORM, LCG_VERSION, LCG_PLATFORM, PACKAGES)
+
+_C_COMPILER_RE = re.compile(rb'The C compiler identification is (.+)')
+_CXX_COMPILER_RE = re.compile(rb'The CXX compiler identification is (.+)')
+_PLATFORM_RE = re.compile(rb'Using platform name: (.+)')
+# Pattern: LCG release "LCG_106b_ATLAS_1" for platform: x86_64-el9-gcc13-opt
+_LCG_RE = re.compile(rb'LCG release "LCG_([^"]+)" for platform: (.+)')
+# Package lines look like: "--   + External/Acts"
+_PACKAGE_RE = re.compile(rb'--\s+\+\s+External/(.+)')
+
+
+def _text(value: bytes) -> str:
+    return value.decode("utf-8", errors="replace").strip()
+
+
+# Every field is introduced by one of these substrings
+_MARKERS = {
+    C_COMPILER: b'compiler identification is',
+    CXX_COMPILER: b'compiler identification is',
+    PLATFORM: b'Using platform name:',
+    LCG_VERSION: b'LCG release',
+    LCG_PLATFORM: b'LCG release',
+    PACKAGES: b'Package filtering rules read:',
+}
+
+
+class _BuildLogParser:
+    """Line-fed state machine; outside the package section only marker lines matter"""
+
+    def __init__(self, fields):
+        self.result = {
+            LCG_VERSION: None,
+            LCG_PLATFORM: None,
+            PACKAGES: [],
+            C_COMPILER: None,
+            CXX_COMPILER: None,
+            PLATFORM: None,
+        }
+        self.pending = set(fields)
+        # True while inside the package filtering rules section
+        self.in_packages = False
+
+    @property
+    def done(self) -> bool:
+        return not self.pending
+
+    def markers(self):
+        """Substrings that can advance the parser, or None if every line matters"""
+        if self.in_packages:
+            return None
+        return {_MARKERS[field] for field in self.pending}
+
+    def _end_packages(self):
+        self.in_packages = False
+        self.pending.discard(PACKAGES)
+
+    def feed(self, line: bytes):
+        line = line.strip()
+        result = self.result
+        pending = self.pending
+
+        if self.in_packages:
+            # Stop at the next section or empty line after packages
+            if line.startswith(b'-- Configuring') or (not line and result[PACKAGES]):
+                self._end_packages()
+            else:
+                pkg_match = _PACKAGE_RE.search(line)
+                if pkg_match:
+                    result[PACKAGES].append(_text(pkg_match.group(1)))
+                elif line.startswith(b'--   -'):
+                    # End of package list
+                    self._end_packages()
+            # Section lines may still carry other fields
+        elif PACKAGES in pending and _MARKERS[PACKAGES] in line:
+            self.in_packages = True
+            return
+
+        if b'compiler identification is' in line:
+            if C_COMPILER in pending:
+                match = _C_COMPILER_RE.search(line)
+                if match:
+                    result[C_COMPILER] = _text(match.group(1))
+                    pending.discard(C_COMPILER)
+            if CXX_COMPILER in pending:
+                match = _CXX_COMPILER_RE.search(line)
+                if match:
+                    result[CXX_COMPILER] = _text(match.group(1))
+                    pending.discard(CXX_COMPILER)
+        elif PLATFORM in pending and _MARKERS[PLATFORM] in line:
+            match = _PLATFORM_RE.search(line)
+            if match:
+                result[PLATFORM] = _text(match.group(1))
+                pending.discard(PLATFORM)
+        elif (LCG_VERSION in pending or LCG_PLATFORM in pending) and _MARKERS[LCG_VERSION] in line:
+            match = _LCG_RE.search(line)
+            if match:
+                result[LCG_VERSION] = _text(match.group(1))
+                result[LCG_PLATFORM] = _text(match.group(2))
+                pending.discard(LCG_VERSION)
+                pending.discard(LCG_PLATFORM)
+
+
+def parse_build_log_lines(lines: Iterable[bytes], fields=ALL_FIELDS) -> Dict:
+    """Extract the requested fields from an iterable of raw log lines"""
+    parser = _BuildLogParser(fields)
+    for line in lines:
+        parser.feed(line)
+        if parser.done:
+            break
+    return parser.result
+
+
+def _parse_mapped(mm, fields) -> Dict:
+    """Drive the parser over a memory map, jumping between marker lines with find()"""
+    parser = _BuildLogParser(fields)
+    size = len(mm)
+    pos = 0
+    # Next occurrence of each marker at or after pos (-1 once there is none)
+    next_hit = {}
+    while pos < size and not parser.done:
+        markers = parser.markers()
+        if markers is not None:
+            hits = []
+            for marker in markers:
+                hit = next_hit.get(marker)
+                if hit is None or (hit != -1 and hit < pos):
+                    hit = next_hit[marker] = mm.find(marker, pos)
+                if hit != -1:
+                    hits.append(hit)
+            if not hits:
+                break
+            pos = mm.rfind(b"\n", 0, min(hits)) + 1
+        end = mm.find(b"\n", pos)
+        end = size if end == -1 else end + 1
+        parser.feed(mm[pos:end])
+        pos = end
+    return parser.result
+
+
+def parse_build_log(path: str, fields=ALL_FIELDS) -> Optional[Dict]:
+    """Parse a build log file in one pass; None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return parse_build_log_lines([], fields)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return _parse_mapped(mm, fields)
@@ -0,0 +1,115 @@
+"""
+Direct CycloneDX JSON writer for the SBOM generators.
+
+Produces the same bytes as building a cyclonedx-python-lib Bom, serializing it
+with make_outputter() and re-serializing canonically (sorted keys, serialNumber
+derived from the content), but streams straight from the dependency data
+without building the model graph or parsing the output back.
+"""
+
+import hashlib
+import io
+import json
+import uuid
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+SCHEMA_URLS = {
+    "1.4": "http://cyclonedx.org/schema/bom-1.4.schema.json",
+    "1.5": "http://cyclonedx.org/schema/bom-1.5.schema.json",
+}
+
+# (bom_ref, name, version, [(property name, value), ...])
+ComponentRow = Tuple[str, str, str, Sequence[Tuple[str, str]]]
+
+_dumps = json.dumps
+
+
+def _properties_json(properties: Iterable[Tuple[str, str]]) -> str:
+    # The library keeps properties in a sorted set ordered by (name, value)
+    return "[" + ", ".join(
+        f'{{"name": {_dumps(name)}, "value": {_dumps(value)}}}' for name, value in sorted(properties)
+    ) + "]"
+
+
+def _metadata_json(properties, tools, timestamp: Optional[datetime]) -> str:
+    parts = []
+    if properties:
+        parts.append(f'"properties": {_properties_json(properties)}')
+    if timestamp is not None:
+        parts.append(f'"timestamp": {_dumps(timestamp.isoformat())}')
+    if tools:
+        tools_json = ", ".join(
+            f'{{"name": {_dumps(name)}, "version": {_dumps(version)}}}' for name, version in sorted(tools)
+        )
+        parts.append(f'"tools": [{tools_json}]')
+    return "{" + ", ".join(parts) + "}"
+
+
+def write_bom_json(fp: TextIO, components: Iterable[ComponentRow], properties=None, tools=None,
+                   timestamp: Optional[datetime] = None, spec_version: str = "1.4",
+                   dependencies: Optional[Dict[str, Iterable[str]]] = None) -> str:
+    """Stream a CycloneDX JSON document to fp and return its serialNumber.
+
+    properties and tools are (name, value) / (name, version) pairs for the
+    metadata section. Components are written in the library's order
+    (name, version, bom-ref). dependencies maps a bom-ref to the bom-refs it
+    depends on; every component gets a dependency entry, bare if it has none.
+    """
+    if spec_version not in SCHEMA_URLS:
+        raise ValueError(f"Unsupported CycloneDX spec version: {spec_version}")
+
+    # Same ordering as the library's Component comparison for our fields;
+    # identical rows collapse, as they do in the library's component set
+    rows: List[ComponentRow] = []
+    for row in sorted(components, key=lambda row: (row[1], row[2], row[0], sorted(row[3]))):
+        if not rows or rows[-1][:3] != row[:3] or sorted(rows[-1][3]) != sorted(row[3]):
+            rows.append(row)
+
+    # The serialNumber is a hash of the document without it. Everything
+    # before it is written and hashed as it is produced; the short constant
+    # tail is hashed before the serialNumber is written.
+    digest = hashlib.sha256()
+
+    def emit(chunk: str):
+        digest.update(chunk.encode("utf-8"))
+        fp.write(chunk)
+
+    emit(f'{{"$schema": {_dumps(SCHEMA_URLS[spec_version])}, "bomFormat": "CycloneDX", ')
+    if rows:
+        emit('"components": [')
+        for i, (bom_ref, name, version, props) in enumerate(rows):
+            chunk = f'{{"bom-ref": {_dumps(bom_ref)}, "name": {_dumps(name)}, '
+            if props:
+                chunk += f'"properties": {_properties_json(props)}, '
+            chunk += f'"type": "library", "version": {_dumps(version)}}}'
+            emit(chunk if i == 0 else ", " + chunk)
+        emit('], "dependencies": [')
+        dependencies = dependencies or {}
+        entries = []
+        for ref in sorted(row[0] for row in rows):
+            depends_on = sorted(set(dependencies.get(ref, ())))
+            if depends_on:
+                entries.append(f'{{"dependsOn": [{", ".join(_dumps(target) for target in depends_on)}], "ref": {_dumps(ref)}}}')
+            else:
+                entries.append(f'{{"ref": {_dumps(ref)}}}')
+        emit(", ".join(entries))
+        emit('], ')
+    emit(f'"metadata": {_metadata_json(properties, tools, timestamp)}')
+
+    tail = f', "specVersion": "{spec_version}", "version": 1}}'
+    digest.update(tail.encode("utf-8"))
+    serial = f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, digest.hexdigest())}"
+    fp.write(f', "serialNumber": "{serial}"')
+    fp.write(tail)
+    return serial
+
+
+def bom_json(components: Iterable[ComponentRow], properties=None, tools=None,
+             timestamp: Optional[datetime] = None, spec_version: str = "1.4",
+             dependencies: Optional[Dict[str, Iterable[str]]] = None) -> str:
+    """Return the document write_bom_json() would stream, as a string"""
+    buf = io.StringIO()
+    write_bom_json(buf, components, properties=properties, tools=tools,
+                   timestamp=timestamp, spec_version=spec_version, dependencies=dependencies)
+    return buf.getvalue()
@@ -0,0 +1,305 @@
+"""
+Dependency graph between SBOM components.
+
+Generators extract package-to-package edges from the AtlasExternals CMake
+files (find_package, DEPENDS of ExternalProject_Add, add_dependencies and
+ExternalProject_Add_StepDependencies, with set()/list(APPEND) variables
+expanded) and record them as the CycloneDX "dependencies" section.
+
+The API answers "who depends on X" and "what does X pull in" from a
+ClosureIndex built once per stored SBOM: strongly connected components are
+collapsed, and each one gets the set of nodes reachable from it (and reaching
+it) as an integer bitset, filled in one pass in topological order. A query is
+then a lookup and a walk over the set bits instead of a graph search; the
+decoded positions are kept, so repeated queries only copy them out.
+"""
+
+import hashlib
+import json
+import re
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from vulnerabilities import normalize_name
+
+# Keywords ending a DEPENDS list in ExternalProject_Add
+EXTERNALPROJECT_KEYWORDS = frozenset("""
+    PREFIX TMP_DIR STAMP_DIR LOG_DIR DOWNLOAD_DIR SOURCE_DIR BINARY_DIR INSTALL_DIR
+    DOWNLOAD_COMMAND DOWNLOAD_NAME DOWNLOAD_NO_EXTRACT DOWNLOAD_NO_PROGRESS DOWNLOAD_EXTRACT_TIMESTAMP
+    URL URL_HASH URL_MD5 TLS_VERIFY TLS_CAINFO NETRC TIMEOUT INACTIVITY_TIMEOUT HTTP_USERNAME HTTP_PASSWORD HTTP_HEADER
+    GIT_REPOSITORY GIT_TAG GIT_REMOTE_NAME GIT_SUBMODULES GIT_SHALLOW GIT_PROGRESS GIT_CONFIG
+    SVN_REPOSITORY SVN_REVISION HG_REPOSITORY HG_TAG CVS_REPOSITORY CVS_MODULE CVS_TAG
+    UPDATE_COMMAND UPDATE_DISCONNECTED PATCH_COMMAND SOURCE_SUBDIR
+    CONFIGURE_COMMAND CONFIGURE_HANDLED_BY_BUILD CMAKE_COMMAND CMAKE_GENERATOR CMAKE_GENERATOR_PLATFORM
+    CMAKE_GENERATOR_TOOLSET CMAKE_GENERATOR_INSTANCE CMAKE_ARGS CMAKE_CACHE_ARGS CMAKE_CACHE_DEFAULT_ARGS
+    BUILD_COMMAND BUILD_IN_SOURCE BUILD_ALWAYS BUILD_BYPRODUCTS BUILD_JOB_SERVER_AWARE
+    INSTALL_COMMAND INSTALL_BYPRODUCTS TEST_COMMAND TEST_BEFORE_INSTALL TEST_AFTER_INSTALL TEST_EXCLUDE_FROM_MAIN
+    LOG_DOWNLOAD LOG_UPDATE LOG_PATCH LOG_CONFIGURE LOG_BUILD LOG_INSTALL LOG_TEST LOG_MERGED_STDOUTERR
+    LOG_OUTPUT_ON_FAILURE USES_TERMINAL_DOWNLOAD USES_TERMINAL_UPDATE USES_TERMINAL_CONFIGURE
+    USES_TERMINAL_BUILD USES_TERMINAL_INSTALL USES_TERMINAL_TEST
+    DEPENDS EXCLUDE_FROM_ALL STEP_TARGETS INDEPENDENT_STEP_TARGETS LIST_SEPARATOR COMMAND
+""".split())
+
+# find_package() names that differ from the External/<pkg> directory
+CMAKE_ALIASES = {
+    "eigen3": "Eigen",
+    "gtest": "GoogleTest",
+    "openblas": "Blas",
+    "pythoninterp": "Python",
+    "pythonlibs": "Python",
+    "sqlite3": "SQLite",
+    "tbb": "TBB",
+}
+
+_COMMAND = re.compile(r'([A-Za-z_][A-Za-z0-9_]*)\s*\(((?:[^()]|\([^()]*\))*)\)', re.S)
+_ARGUMENT = re.compile(r'"(?:[^"\\]|\\.)*"|[^\s"]+')
+_VARIABLE = re.compile(r'\$\{([A-Za-z0-9_]+)\}')
+_NAME = re.compile(r'^[A-Za-z][A-Za-z0-9_.+-]*$')
+
+
+def rules_fingerprint() -> str:
+    """Hash of the extraction rules, folded into the generators' externals index fingerprint"""
+    rules = json.dumps([sorted(EXTERNALPROJECT_KEYWORDS), CMAKE_ALIASES, _COMMAND.pattern], sort_keys=True)
+    return hashlib.sha1(rules.encode("utf-8")).hexdigest()
+
+
+def _strip_comments(text: str) -> str:
+    lines = []
+    for line in text.splitlines():
+        # '#' inside a quoted argument does not start a comment
+        quoted = False
+        for i, c in enumerate(line):
+            if c == '"' and (i == 0 or line[i - 1] != '\\'):
+                quoted = not quoted
+            elif c == '#' and not quoted:
+                line = line[:i]
+                break
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _commands(text: str) -> Iterable[Tuple[str, List[str]]]:
+    for m in _COMMAND.finditer(_strip_comments(text)):
+        yield m.group(1).lower(), [arg.strip('"') for arg in _ARGUMENT.findall(m.group(2))]
+
+
+def cmake_dependencies(package: str, text: str) -> List[str]:
+    """Names of the packages External/<package>/CMakeLists.txt depends on, sorted"""
+    variables: Dict[str, List[str]] = {}
+
+    def expand(args: List[str]) -> List[str]:
+        out = []
+        for arg in args:
+            m = _VARIABLE.fullmatch(arg)
+            if m:
+                out.extend(variables.get(m.group(1), []))
+            elif '${' not in arg:
+                out.append(arg)
+        return out
+
+    found: List[str] = []
+    for command, args in _commands(text):
+        if command == "set" and args:
+            variables[args[0]] = expand(args[1:])
+        elif command == "list" and len(args) >= 2 and args[0].upper() == "APPEND":
+            variables.setdefault(args[1], []).extend(expand(args[2:]))
+        elif command == "find_package" and args:
+            found.extend(expand(args[:1]))
+        elif command == "externalproject_add" and args:
+            args = expand(args)
+            for i, arg in enumerate(args):
+                if arg != "DEPENDS":
+                    continue
+                for dep in args[i + 1:]:
+                    if dep in EXTERNALPROJECT_KEYWORDS:
+                        break
+                    found.append(dep)
+        elif command == "add_dependencies" and len(args) >= 2:
+            found.extend(expand(args[1:]))
+        elif command == "externalproject_add_stepdependencies" and len(args) >= 3:
+            found.extend(expand(args[2:]))
+
+    deps = set()
+    own = normalize_name(package)
+    for name in found:
+        if not _NAME.match(name):
+            continue
+        name = CMAKE_ALIASES.get(name.lower(), name)
+        # Targets named after the package itself (Package_ROOT, ROOT) are not dependencies
+        if normalize_name(name) in (own, normalize_name(f"Package_{package}")):
+            continue
+        deps.add(name)
+    return sorted(deps)
+
+
+def resolve_edges(components: Iterable[Tuple[str, str]], edges: Dict[str, Iterable[str]]) -> Dict[str, List[str]]:
+    """bom-ref -> sorted bom-refs it depends on, from package-name edges and (bom-ref, name) components.
+
+    Names match like package names; edges to names with no component are dropped.
+    """
+    by_name: Dict[str, List[str]] = {}
+    for ref, name in components:
+        by_name.setdefault(normalize_name(name), []).append(ref)
+    resolved: Dict[str, Set[str]] = {}
+    for package, deps in edges.items():
+        for ref in by_name.get(normalize_name(package), []):
+            targets = {target for dep in deps for target in by_name.get(normalize_name(dep), []) if target != ref}
+            if targets:
+                resolved.setdefault(ref, set()).update(targets)
+    return {ref: sorted(targets) for ref, targets in resolved.items()}
+
+
+def read_edges(path) -> Dict[str, List[str]]:
+    """Edges recorded as "<package>: <dep> <dep> ..." lines (depGraph.txt)"""
+    edges: Dict[str, List[str]] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                package, sep, deps = line.partition(":")
+                if sep and package.strip():
+                    edges.setdefault(package.strip(), []).extend(deps.split())
+    except FileNotFoundError:
+        pass
+    return edges
+
+
+def _bits(mask: int) -> List[int]:
+    """Positions of the set bits, ascending"""
+    # One pass over the binary digits; peeling off the lowest bit costs O(size) per bit on big ints
+    digits = bin(mask)[:1:-1]
+    positions = []
+    i = digits.find('1')
+    while i != -1:
+        positions.append(i)
+        i = digits.find('1', i + 1)
+    return positions
+
+
+class ClosureIndex:
+    """Precomputed reachability over the dependency graph of one SBOM"""
+
+    def __init__(self, nodes: List[Dict], edges: List[List[int]]):
+        # nodes: {name, version, bomRef}; edges[i]: indices node i depends on directly
+        self.nodes = nodes
+        self.edges = edges
+        self.reverse: List[List[int]] = [[] for _ in nodes]
+        for i, targets in enumerate(edges):
+            for j in targets:
+                self.reverse[j].append(i)
+        self.by_name: Dict[str, List[int]] = {}
+        for i, node in enumerate(nodes):
+            self.by_name.setdefault(normalize_name(node['name']), []).append(i)
+        self.edge_count = sum(len(targets) for targets in edges)
+        self._component, components = self._strongly_connected()
+        self._cyclic = [len(members) > 1 for members in components]
+        self._down = self._closure(components, self.edges, forward=True)
+        self._up = self._closure(components, self.reverse, forward=False)
+        # Decoded bitsets as compact int arrays, filled on first query; members of a cycle share one
+        self._decoded: Dict[Tuple[bool, int], array] = {}
+
+    @classmethod
+    def from_sbom(cls, sbom_data) -> "ClosureIndex":
+        nodes = []
+        index = {}
+        for comp in sbom_data.get('components', []):
+            ref = comp.get('bom-ref') or f"{comp.get('name')}@{comp.get('version')}"
+            if ref in index:
+                continue
+            index[ref] = len(nodes)
+            nodes.append({'name': comp.get('name', ''), 'version': comp.get('version', ''), 'bomRef': ref})
+        edges: List[List[int]] = [[] for _ in nodes]
+        for dep in sbom_data.get('dependencies', []):
+            source = index.get(dep.get('ref'))
+            if source is None:
+                continue
+            edges[source] = sorted({index[ref] for ref in dep.get('dependsOn', []) if ref in index and index[ref] != source})
+        return cls(nodes, edges)
+
+    def _strongly_connected(self) -> Tuple[List[int], List[List[int]]]:
+        """Tarjan's algorithm, iteratively; components come out in reverse topological order"""
+        count = len(self.nodes)
+        index = [-1] * count
+        low = [0] * count
+        on_stack = [False] * count
+        stack: List[int] = []
+        component = [-1] * count
+        components: List[List[int]] = []
+        counter = 0
+        for root in range(count):
+            if index[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, child = work.pop()
+                if child == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                targets = self.edges[node]
+                if child < len(targets):
+                    work.append((node, child + 1))
+                    target = targets[child]
+                    if index[target] == -1:
+                        work.append((target, 0))
+                    elif on_stack[target]:
+                        low[node] = min(low[node], index[target])
+                    continue
+                if low[node] == index[node]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component[member] = len(components)
+                        members.append(member)
+                        if member == node:
+                            break
+                    components.append(members)
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+        return component, components
+
+    def _closure(self, components: List[List[int]], edges: List[List[int]], forward: bool) -> List[int]:
+        """Per component, the bitset of nodes reachable from it along edges (its own members if cyclic)"""
+        # Tarjan emits dependencies before their dependents, so each component's targets are done first
+        order = range(len(components)) if forward else range(len(components) - 1, -1, -1)
+        reach = [0] * len(components)
+        for c in order:
+            members = components[c]
+            mask = 0
+            for node in members:
+                for target in edges[node]:
+                    tc = self._component[target]
+                    if tc != c:
+                        mask |= reach[tc] | (1 << target)
+            if len(members) > 1:
+                for node in members:
+                    mask |= 1 << node
+            reach[c] = mask
+        return reach
+
+    def find(self, name: str, version: Optional[str] = None) -> List[int]:
+        """Indices of the components with this name (and version, if given)"""
+        matches = self.by_name.get(normalize_name(name), [])
+        return [i for i in matches if version is None or self.nodes[i]['version'] == version]
+
+    def dependencies(self, node: int, transitive: bool = True) -> List[int]:
+        """What node pulls in"""
+        if not transitive:
+            return list(self.edges[node])
+        return self._reachable(node, True)
+
+    def dependents(self, node: int, transitive: bool = True) -> List[int]:
+        """Who depends on node"""
+        if not transitive:
+            return sorted(self.reverse[node])
+        return self._reachable(node, False)
+
+    def _reachable(self, node: int, forward: bool) -> List[int]:
+        c = self._component[node]
+        positions = self._decoded.get((forward, c))
+        if positions is None:
+            positions = self._decoded[(forward, c)] = array('l', _bits((self._down if forward else self._up)[c]))
+        # Only a cycle reaches the node itself
+        return [i for i in positions if i != node] if self._cyclic[c] else positions.tolist()
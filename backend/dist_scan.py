@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Installed Python distributions, read straight from their metadata.
+
+Replaces `pip freeze` for the SBOM generators. Every site-packages
+directory is listed for *.dist-info and *.egg-info entries, and each entry
+is read in a worker thread. From METADATA/PKG-INFO it takes the name,
+version and license. From RECORD it takes the hash of every installed file;
+for egg-info, which records no hashes, the files in installed-files.txt are
+hashed instead. No pip subprocess is started, and any prefix can be scanned,
+for example a local copy of an LCG view.
+
+Uses only the standard library, so it runs in an environment before
+anything is installed into it:
+
+    python3 dist_scan.py --output pyDist.json              # this interpreter's sys.path
+    python3 dist_scan.py --output pyDist.json /cvmfs/sft.cern.ch/lcg/views/LCG_106b/x86_64-el9-gcc13-opt
+"""
+
+import argparse
+import base64
+import csv
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.parser import HeaderParser
+from typing import Iterable, List, Optional, Tuple
+
+METADATA_SUFFIXES = (".dist-info", ".egg-info")
+# A License field longer than this is the license text itself, not its name
+MAX_LICENSE_LENGTH = 80
+
+
+@dataclass
+class Distribution:
+    name: str
+    version: str
+    license: Optional[str] = None
+    # (path relative to site-packages, "sha256=<urlsafe base64>") per installed file
+    files: List[Tuple[str, str]] = field(default_factory=list)
+    location: str = ""
+
+    @property
+    def digest(self) -> Optional[str]:
+        """SHA-256 over the sorted file hashes; None if no file was hashed"""
+        if not self.files:
+            return None
+        h = hashlib.sha256()
+        for path, file_hash in sorted(self.files):
+            h.update(f"{path}\0{file_hash}\n".encode("utf-8"))
+        return h.hexdigest()
+
+    def to_json(self) -> dict:
+        return {'name': self.name, 'version': self.version, 'license': self.license,
+                'sha256': self.digest, 'files': len(self.files)}
+
+
+def canonical_name(name: str) -> str:
+    """PEP 503 normalized project name"""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def site_packages_dirs(prefix: str) -> List[str]:
+    """site-packages directories below an installation prefix, or the prefix itself if it is one"""
+    found = []
+    for pattern in ("lib/python*/site-packages", "lib64/python*/site-packages", "lib/site-packages"):
+        found.extend(sorted(glob.glob(os.path.join(prefix, pattern))))
+    if not found and os.path.isdir(prefix):
+        found.append(prefix)
+    return found
+
+
+def default_paths() -> List[str]:
+    """This interpreter's import path, which is what pip freeze lists"""
+    return [os.path.abspath(p or ".") for p in sys.path if os.path.isdir(p or ".")]
+
+
+def _license(headers) -> Optional[str]:
+    expression = (headers.get("License-Expression") or "").strip()
+    if expression:
+        return expression
+    text = (headers.get("License") or "").strip()
+    if text and text.upper() != "UNKNOWN" and "\n" not in text and len(text) <= MAX_LICENSE_LENGTH:
+        return text
+    classifiers = [c.split("::")[-1].strip() for c in headers.get_all("Classifier") or []
+                   if c.startswith("License ::") and c.count("::") > 1]
+    return " OR ".join(sorted(set(classifiers))) or None
+
+
+def _record_files(meta_dir: str) -> List[Tuple[str, str]]:
+    files = []
+    try:
+        with open(os.path.join(meta_dir, "RECORD"), "r", encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                if len(row) >= 2 and row[1]:
+                    files.append((row[0], row[1]))
+    except OSError:
+        pass
+    return files
+
+
+def _hash_file(path: str) -> Optional[str]:
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return "sha256=" + base64.urlsafe_b64encode(h.digest()).rstrip(b"=").decode("ascii")
+
+
+def _installed_files(meta_dir: str, location: str) -> List[Tuple[str, str]]:
+    """Hash the files an egg-info lists, relative to site-packages like RECORD paths"""
+    files = []
+    try:
+        with open(os.path.join(meta_dir, "installed-files.txt"), "r", encoding="utf-8") as f:
+            listed = [line.strip() for line in f if line.strip()]
+    except OSError:
+        return files
+    for relpath in listed:
+        path = os.path.normpath(os.path.join(meta_dir, relpath))
+        if relpath.endswith(".pyc") or not os.path.isfile(path):
+            continue
+        file_hash = _hash_file(path)
+        if file_hash:
+            files.append((os.path.relpath(path, location), file_hash))
+    return files
+
+
+def read_distribution(meta_dir: str, hashes: bool = True) -> Optional[Distribution]:
+    """The distribution described by one *.dist-info or *.egg-info entry, or None if unreadable"""
+    if os.path.isdir(meta_dir):
+        candidates = ("METADATA", "PKG-INFO")
+        metadata_path = next((os.path.join(meta_dir, n) for n in candidates
+                              if os.path.isfile(os.path.join(meta_dir, n))), None)
+    else:
+        # Old setuptools installs a single PKG-INFO file named <name>.egg-info
+        metadata_path = meta_dir
+    if metadata_path is None:
+        return None
+    try:
+        with open(metadata_path, "r", encoding="utf-8", errors="replace") as f:
+            headers = HeaderParser().parse(f)
+    except OSError:
+        return None
+    name, version = headers.get("Name"), headers.get("Version")
+    if not name or not version:
+        return None
+
+    location = os.path.dirname(meta_dir)
+    files: List[Tuple[str, str]] = []
+    if hashes and os.path.isdir(meta_dir):
+        if meta_dir.endswith(".dist-info"):
+            files = _record_files(meta_dir)
+        else:
+            files = _installed_files(meta_dir, location)
+    return Distribution(name=name.strip(), version=version.strip(), license=_license(headers),
+                        files=files, location=location)
+
+
+def scan(paths: Optional[Iterable[str]] = None, jobs: Optional[int] = None, hashes: bool = True) -> List[Distribution]:
+    """Distributions installed in paths (default: this interpreter's sys.path), sorted by name.
+
+    When a project is installed in several directories, the one earliest in
+    paths wins, as it does for imports.
+    """
+    entries = []
+    for directory in (default_paths() if paths is None else paths):
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            continue
+        entries.extend(os.path.join(directory, n) for n in names if n.endswith(METADATA_SUFFIXES))
+
+    with ThreadPoolExecutor(max_workers=jobs or min(32, (os.cpu_count() or 1) + 4)) as pool:
+        found = list(pool.map(lambda entry: read_distribution(entry, hashes=hashes), entries))
+
+    distributions = {}
+    for dist in found:
+        if dist is not None:
+            distributions.setdefault(canonical_name(dist.name), dist)
+    return sorted(distributions.values(), key=lambda d: canonical_name(d.name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List installed Python distributions without pip")
+    parser.add_argument('prefixes', nargs='*', help="Installation prefixes or site-packages directories (default: this interpreter's sys.path)")
+    parser.add_argument('--output', '-o', help='Write JSON here instead of stdout')
+    parser.add_argument('--no-hashes', action='store_true', help='Skip RECORD and file hashes')
+    parser.add_argument('--jobs', type=int, default=None, help='Worker threads')
+    args = parser.parse_args()
+
+    paths = None
+    if args.prefixes:
+        paths = [d for prefix in args.prefixes for d in site_packages_dirs(prefix)]
+    distributions = [d.to_json() for d in scan(paths, jobs=args.jobs, hashes=not args.no_hashes)]
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(distributions, f, indent=1)
+        print(f"Wrote {len(distributions)} distribution(s) to {args.output}", file=sys.stderr)
+    else:
+        json.dump(distributions, sys.stdout, indent=1)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Generate and version every project's SBOM in one Python process.
+
+The per-project setup.sh scripts start a new interpreter for every step:
+AnalysisBase runs sbomGenerator.py five times, then version_sbom.py and pip
+twice, and each of them imports cyclonedx again. This runner performs the
+same steps in-process. Each project's sbomGenerator.py and version_sbom.py
+are imported once, and AnalysisBase and Athena share one AtlasExternals
+clone and one cache of the CMake files read from it. Only the StatAnalysis
+environment capture (asetup and dist_scan.py) still needs a shell, because it
+runs inside the ATLAS setup.
+
+    python3 generate_all.py
+    python3 generate_all.py --projects Athena AnalysisBase --externals ~/atlasexternals
+    python3 generate_all.py --results logs/results.txt
+
+Projects run in the order given; one failing does not stop the others.
+The exit status is 1 if any project failed.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import traceback
+from pathlib import Path
+from typing import Dict, Optional
+
+from profiling import profiled
+from spans import StageSpans
+
+BACKEND_DIR = Path(__file__).resolve().parent
+# Same order as DailyRun.sh: the two AtlasExternals projects first
+PROJECTS = ("Athena", "AnalysisBase", "StatAnalysis")
+ATLASEXTERNALS_URL = "https://gitlab.cern.ch/atlas/atlasexternals.git"
+
+# StatAnalysis takes its dependencies from the ATLAS environment, which only exists in a shell
+STATANALYSIS_CAPTURE = """
+source /cvmfs/atlas.cern.ch/repo/ATLASLocalRootBase/user/atlasLocalSetup.sh
+asetup StatAnalysis,0.6.3 > cppDep.txt || { echo "asetup failed"; exit 1; }
+python3 ../dist_scan.py --output pyDist.json
+"""
+
+
+def load_module(project: str, script: str):
+    """Import <project>/<script>.py under a name of its own; every project has the same file names"""
+    path = BACKEND_DIR / project / f"{script}.py"
+    spec = importlib.util.spec_from_file_location(f"{project}_{script}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def remove_files(directory: Path, *names):
+    for name in names:
+        (directory / name).unlink(missing_ok=True)
+
+
+def store_version(versioner) -> bool:
+    """Run a project's version_sbom.main(); True if it stored a version or found a duplicate"""
+    try:
+        versioner.main()
+    except SystemExit as e:
+        return not e.code
+    return True
+
+
+def run_athena(generator_module, versioner, externals: Optional[Path], read_cache: Dict, args) -> bool:
+    project_dir = BACKEND_DIR / "Athena"
+    remove_files(project_dir, "cppDep.txt", "athena-sbom.json", "athena-sbom.md")
+    generator = generator_module.SBOMGenerator()
+    generator.read_cache = read_cache
+    generator.fast_writer = generator.fast_writer or args.fast_writer
+    generator.offline = generator.offline or args.offline
+    try:
+        with working_directory(project_dir):
+            generator.generate(full_scan=args.full_scan, atlasexternals_path=str(externals))
+            return store_version(versioner)
+    finally:
+        remove_files(project_dir, "cppDep.txt")
+
+
+def run_analysisbase(generator_module, versioner, externals: Optional[Path], read_cache: Dict, args) -> bool:
+    project_dir = BACKEND_DIR / "AnalysisBase"
+    external_dir = externals / "External"
+    inputs = ("cppDep.txt", "pyDep.txt", "depGraph.txt", "package_filters.txt")
+    remove_files(project_dir, *inputs)
+    generator = generator_module.SBOMGenerator()
+    generator.read_cache = read_cache
+    generator.fast_writer = generator.fast_writer or args.fast_writer
+    try:
+        # The steps setup.sh runs as separate --parse-* invocations, from the same directories
+        with working_directory(external_dir):
+            with generator.spans.span("parse_cmakelists") as span:
+                results = generator.parse_cmakelists(full_scan=args.full_scan)
+                span['items'] = sum(len(entries) for entries in results.values())
+        with working_directory(externals / "Projects" / "AnalysisBaseExternals"):
+            generator.export_package_filters()
+        with working_directory(external_dir / "PyModules"):
+            with generator.spans.span("parse_python_packages_1"):
+                generator.parse_python_packages_1()
+        with working_directory(external_dir / "PyAnalysis"):
+            with generator.spans.span("parse_python_packages_2"):
+                generator.parse_python_packages_2()
+        with working_directory(project_dir):
+            generator.extract_python_version_and_update_cppdep()
+            generator.generate()
+            return store_version(versioner)
+    finally:
+        remove_files(project_dir, *inputs)
+
+
+def run_statanalysis(generator_module, versioner, externals: Optional[Path], read_cache: Dict, args) -> bool:
+    project_dir = BACKEND_DIR / "StatAnalysis"
+    if not args.skip_capture:
+        remove_files(project_dir, "cppDep.txt", "pyDep.txt", "pyDist.json")
+    remove_files(project_dir, "stat-analysis-sbom.json", "stat-analysis-sbom.md")
+    try:
+        with working_directory(project_dir):
+            if not args.skip_capture:
+                print("Capturing the StatAnalysis environment...")
+                if subprocess.run(["bash", "-c", STATANALYSIS_CAPTURE]).returncode != 0:
+                    return False
+            generator = generator_module.SBOMGenerator()
+            generator.fast_writer = generator.fast_writer or args.fast_writer
+            generator.generate()
+            return store_version(versioner)
+    finally:
+        if not args.skip_capture:
+            remove_files(project_dir, "cppDep.txt", "pyDep.txt", "pyDist.json")
+
+
+RUNNERS = {
+    "Athena": run_athena,
+    "AnalysisBase": run_analysisbase,
+    "StatAnalysis": run_statanalysis,
+}
+USES_EXTERNALS = {"Athena", "AnalysisBase"}
+
+
+def run(args) -> Dict[str, bool]:
+    spans = StageSpans("generate_all")
+    outcomes: Dict[str, bool] = {}
+    # CMakeLists.txt contents by path, read once for both AtlasExternals projects
+    read_cache: Dict[str, Optional[str]] = {}
+    with contextlib.ExitStack() as stack:
+        externals = Path(args.externals).resolve() if args.externals else None
+        if externals is None and USES_EXTERNALS & set(args.projects):
+            externals = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="atlasexternals-"))) / "AtlasExternals"
+            with spans.span("clone_atlasexternals"):
+                print("Cloning AtlasExternals...")
+                if subprocess.run(["git", "clone", ATLASEXTERNALS_URL, str(externals)]).returncode != 0:
+                    print("Cloning AtlasExternals failed", file=sys.stderr)
+                    externals = None
+
+        for project in args.projects:
+            with spans.span(project):
+                print(f"=== {project} ===")
+                if project in USES_EXTERNALS and externals is None:
+                    outcomes[project] = False
+                    continue
+                try:
+                    outcomes[project] = RUNNERS[project](load_module(project, "sbomGenerator"),
+                                                         load_module(project, "version_sbom"),
+                                                         externals, read_cache, args)
+                except Exception:
+                    traceback.print_exc()
+                    outcomes[project] = False
+            print(f"{'✓' if outcomes[project] else '✗'} {project}: SBOM generation {'completed' if outcomes[project] else 'failed'}")
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and version every project's SBOM in one process")
+    parser.add_argument('--projects', nargs='+', choices=PROJECTS, default=list(PROJECTS))
+    parser.add_argument('--externals', help='Existing AtlasExternals checkout to use instead of a fresh clone')
+    parser.add_argument('--full-scan', action='store_true', help='Ignore the externals indexes and re-extract every package')
+    parser.add_argument('--fast-writer', action='store_true', help='Write CycloneDX JSON directly instead of through the cyclonedx model')
+    parser.add_argument('--offline', action='store_true', help='Athena: parse the recorded LCG release page instead of fetching it')
+    parser.add_argument('--skip-capture', action='store_true',
+                        help='StatAnalysis: use the existing cppDep.txt and pyDist.json/pyDep.txt instead of running asetup')
+    parser.add_argument('--results', help='Write one "<project> ok|failed" line per project here')
+    parser.add_argument('--profile', action='store_true', help='Write a cProfile dump and tracemalloc peak for this run to logs/profiles')
+    args = parser.parse_args()
+
+    if args.profile:
+        with profiled(" ".join(["generate_all"] + sys.argv[1:])):
+            outcomes = run(args)
+    else:
+        outcomes = run(args)
+
+    if args.results:
+        with open(args.results, "w", encoding="utf-8") as f:
+            for project, ok in outcomes.items():
+                f.write(f"{project} {'ok' if ok else 'failed'}\n")
+    sys.exit(0 if all(outcomes.values()) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+gunicorn settings for the SBOM backend:
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Every worker joins the scheduler leader election; exactly one runs the daily
+schedule and another takes over if it dies. Every worker also watches the
+SBOMs directories, so /api/sboms is served from memory and /api/events can
+push changes. Workers share logs/metrics (SBOM_METRICS_DIR), so every
+/api/metrics scrape reports the totals of all workers.
+"""
+
+import os
+import shutil
+
+# Set before the workers fork, so they and the generators they start inherit it
+os.environ.setdefault('SBOM_METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'metrics'))
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+# Threaded workers, so open /api/events streams do not occupy a whole worker each
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+
+def on_starting(server):
+    # Samples from a previous deployment would otherwise be added to the new totals
+    shutil.rmtree(os.environ['SBOM_METRICS_DIR'], ignore_errors=True)
+
+
+def post_worker_init(worker):
+    from app import start_scheduler, start_watcher
+    start_scheduler()
+    start_watcher()
@@ -0,0 +1,78 @@
+"""
+Advisory file locks (flock) shared by gunicorn workers, generator processes
+and the daily run.
+
+The kernel drops a flock when the process holding it exits, however it
+exits, so a lock can never be left behind by a crashed worker. Locks are per
+open file, so two FileLock objects on the same path exclude each other even
+within one process.
+"""
+
+import fcntl
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+POLL_INTERVAL = 0.05
+
+
+class LockTimeout(Exception):
+    pass
+
+
+class FileLock:
+    """Exclusive lock on a file, created if needed"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """Take the lock; False if it is busy and blocking is off or the timeout passed"""
+        if self._fd is not None:
+            raise RuntimeError(f"{self.path} is already locked by this object")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | (fcntl.LOCK_NB if not blocking or deadline else 0))
+                    self._fd = fd
+                    return True
+                except BlockingIOError:
+                    if not blocking or time.monotonic() >= deadline:
+                        os.close(fd)
+                        return False
+                    time.sleep(POLL_INTERVAL)
+        except BaseException:
+            if self._fd is None:
+                os.close(fd)
+            raise
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        if not self.held:
+            self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def locked(path, timeout: Optional[float] = None) -> FileLock:
+    """Acquired FileLock, for use in a with statement; raises LockTimeout after timeout seconds"""
+    lock = FileLock(path)
+    if not lock.acquire(timeout=timeout):
+        raise LockTimeout(f"Timed out after {timeout} s waiting for {path}")
+    return lock
@@ -0,0 +1,356 @@
+"""
+Counters, gauges and histograms exposed in the Prometheus text format.
+
+Each process keeps its samples in memory. When SBOM_METRICS_DIR is set (one
+directory shared by every gunicorn worker and generator process) they are
+also written to metrics-<pid>-<token>.json there, at most once per
+FLUSH_INTERVAL seconds and at exit, and render() merges every file:
+counters and histograms are summed, gauges use the metric's aggregate
+("max" or "sum"). When a process has exited, the next collect() folds its
+counters and histograms into metrics-retired.json and deletes its file, so
+totals never go backwards. Its gauges are dropped, because they describe a
+process that no longer exists. gunicorn.conf.py clears the directory when
+the service starts.
+"""
+
+import atexit
+import contextlib
+import functools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import locks
+
+FLUSH_INTERVAL = 1.0
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Generator jobs and daily runs take seconds to minutes
+JOB_BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+_lock = threading.RLock()
+_flush_lock = threading.Lock()
+_registry: Dict[str, "_Metric"] = {}
+_collectors = []
+_token = uuid.uuid4().hex[:8]
+_last_flush = 0.0
+_pending: Optional[threading.Timer] = None
+RETIRED_FILE = "metrics-retired.json"
+_PROCESS_FILE = re.compile(r"^metrics-(\d+)-[0-9a-f]+\.json$")
+
+
+def metrics_dir() -> Optional[Path]:
+    value = os.environ.get("SBOM_METRICS_DIR")
+    return Path(value) if value else None
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.samples = {}
+
+    def _key(self, labels) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def dump(self):
+        return {"type": self.kind, "help": self.documentation, "labels": list(self.labelnames),
+                "samples": [[list(key), value] for key, value in self.samples.items()]}
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.samples[key] = self.samples.get(key, 0.0) + amount
+        _maybe_flush()
+
+    def set_total(self, value, **labels):
+        """Mirror a total kept elsewhere, e.g. functools cache_info()"""
+        key = self._key(labels)
+        with _lock:
+            self.samples[key] = float(value)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), aggregate="max"):
+        super().__init__(name, documentation, labelnames)
+        self.aggregate = aggregate
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.samples[key] = float(value)
+        _maybe_flush()
+
+    def dump(self):
+        data = super().dump()
+        data["aggregate"] = self.aggregate
+        return data
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample["buckets"][i] += 1
+            sample["sum"] += value
+            sample["count"] += 1
+        _maybe_flush()
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """Decorator form of time()"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def dump(self):
+        data = super().dump()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+def _register(metric):
+    with _lock:
+        existing = _registry.get(metric.name)
+        if existing is not None:
+            # Generator modules may be loaded more than once per process
+            return existing
+        _registry[metric.name] = metric
+    return metric
+
+
+def counter(name, documentation, labelnames=()) -> Counter:
+    return _register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=(), aggregate="max") -> Gauge:
+    return _register(Gauge(name, documentation, labelnames, aggregate))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def register_collector(func):
+    """Call func() before every snapshot, to refresh metrics mirrored from elsewhere"""
+    _collectors.append(func)
+    return func
+
+
+def snapshot() -> Dict:
+    for collect in _collectors:
+        try:
+            collect()
+        except Exception as e:
+            print(f"Metrics collector {collect.__name__} failed: {e}")
+    with _lock:
+        return {name: metric.dump() for name, metric in _registry.items()}
+
+
+def flush():
+    """Write this process's samples to the shared metrics directory"""
+    global _last_flush
+    directory = metrics_dir()
+    if directory is None:
+        return
+    with _flush_lock:
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            target = directory / f"metrics-{os.getpid()}-{_token}.json"
+            tmp = target.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(snapshot(), f)
+            os.replace(tmp, target)
+            _last_flush = time.monotonic()
+        except OSError as e:
+            print(f"Failed to write metrics to {directory}: {e}")
+
+
+def _deferred_flush():
+    global _pending
+    with _lock:
+        _pending = None
+    flush()
+
+
+def _maybe_flush():
+    global _pending
+    if metrics_dir() is None:
+        return
+    wait = FLUSH_INTERVAL - (time.monotonic() - _last_flush)
+    if wait <= 0:
+        flush()
+        return
+    # Throttled: make sure the update still lands even if this process goes idle
+    with _lock:
+        if _pending is None:
+            _pending = threading.Timer(wait, _deferred_flush)
+            _pending.daemon = True
+            _pending.start()
+
+
+atexit.register(flush)
+
+
+def _merge(into, data):
+    for name, metric in data.items():
+        target = into.get(name)
+        if target is None:
+            into[name] = {**metric, "samples": [[list(k), v] for k, v in metric["samples"]]}
+            continue
+        merged = {tuple(k): v for k, v in target["samples"]}
+        for key, value in metric["samples"]:
+            key = tuple(key)
+            current = merged.get(key)
+            if current is None:
+                merged[key] = value
+            elif metric["type"] == "histogram":
+                merged[key] = {"buckets": [a + b for a, b in zip(current["buckets"], value["buckets"])],
+                               "sum": current["sum"] + value["sum"], "count": current["count"] + value["count"]}
+            elif metric["type"] == "gauge" and metric.get("aggregate") == "max":
+                merged[key] = max(current, value)
+            else:
+                merged[key] = current + value
+        target["samples"] = [[list(k), v] for k, v in merged.items()]
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Skipping unreadable metrics file {path}: {e}")
+        return None
+
+
+def _retire_exited(directory: Path):
+    """Fold the counters and histograms of exited processes into RETIRED_FILE and delete their files"""
+    exited = [path for path in directory.glob("metrics-*.json")
+              if (m := _PROCESS_FILE.match(path.name)) and not _alive(int(m.group(1)))]
+    if not exited:
+        return
+    # Workers scraping at the same time must not fold the same file twice
+    with locks.locked(directory / ".retire.lock"):
+        retired = _read(directory / RETIRED_FILE) or {}
+        folded = []
+        for path in exited:
+            data = _read(path)
+            if data is None:
+                continue
+            _merge(retired, {name: metric for name, metric in data.items() if metric["type"] != "gauge"})
+            folded.append(path)
+        if not folded:
+            return
+        target = directory / RETIRED_FILE
+        tmp = target.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(retired, f)
+        os.replace(tmp, target)
+        for path in folded:
+            path.unlink(missing_ok=True)
+
+
+def collect() -> Dict:
+    """Samples of every process sharing the metrics directory, or of this one"""
+    directory = metrics_dir()
+    if directory is None:
+        return snapshot()
+    flush()
+    try:
+        _retire_exited(directory)
+    except OSError as e:
+        print(f"Failed to retire metrics files in {directory}: {e}")
+    merged = {}
+    for path in sorted(directory.glob("metrics-*.json")):
+        data = _read(path)
+        if data is not None:
+            _merge(merged, data)
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render() -> str:
+    """Prometheus text exposition of collect()"""
+    lines = []
+    for name, metric in sorted(collect().items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labels"]
+        for values, value in sorted(metric["samples"]):
+            if metric["type"] == "histogram":
+                # Buckets are stored cumulatively
+                for bound, count in zip(metric["buckets"] + [float("inf")], value["buckets"] + [value["count"]]):
+                    le = 'le="%s"' % _number(bound)
+                    lines.append(f"{name}_bucket{_labels(names, values, le)} {count}")
+                lines.append(f"{name}_sum{_labels(names, values)} {value['sum']!r}")
+                lines.append(f"{name}_count{_labels(names, values)} {value['count']}")
+            else:
+                lines.append(f"{name}{_labels(names, values)} {_number(value)}")
+    return "\n".join(lines) + "\n"
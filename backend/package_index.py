@@ -0,0 +1,101 @@
+"""
+In-memory index of every distinct component name across stored SBOMs, for
+search-as-you-type.
+
+Names are kept in a sorted array of normalized keys (case-insensitive, with
+'-', '_' and '.' folded together), so a prefix lookup is a bisect followed by
+a short forward walk. The index remembers which SBOMs it has seen by id and
+content digest; update() only reads SBOMs that are new or changed and
+reference-counts names, so versions can be added or removed without a rebuild.
+"""
+
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from vulnerabilities import normalize_name
+
+
+class PackageIndex:
+    """Sorted array of component names with per-SBOM reference counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        # key -> {'spellings': Counter of names as written, 'projects': Counter}
+        self._entries: Dict[str, Dict[str, Counter]] = {}
+        # sbom id -> (digest, project, names)
+        self._indexed: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _add(self, project: str, names: Iterable[str]):
+        for name in names:
+            key = normalize_name(name)
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {'spellings': Counter(), 'projects': Counter()}
+                insort(self._keys, key)
+            entry['spellings'][name] += 1
+            entry['projects'][project] += 1
+
+    def _remove(self, project: str, names: Iterable[str]):
+        for name in names:
+            key = normalize_name(name)
+            entry = self._entries[key]
+            entry['spellings'][name] -= 1
+            entry['projects'][project] -= 1
+            if entry['spellings'][name] <= 0:
+                del entry['spellings'][name]
+            if entry['projects'][project] <= 0:
+                del entry['projects'][project]
+            if not entry['spellings']:
+                del self._entries[key]
+                del self._keys[bisect_left(self._keys, key)]
+
+    def update(self, sboms: Iterable[Tuple[str, str, str, Callable[[], Iterable[str]]]]) -> int:
+        """Bring the index in line with (id, project, digest, names loader) for every current SBOM.
+
+        Loaders are only called for SBOMs that are new or whose digest changed.
+        Returns the number of SBOMs added, changed or removed.
+        """
+        current = {}
+        for sbom_id, project, digest, load_names in sboms:
+            current[sbom_id] = (project, digest, load_names)
+        changes = 0
+        with self._lock:
+            for sbom_id in list(self._indexed):
+                digest, project, names = self._indexed[sbom_id]
+                if sbom_id not in current or current[sbom_id][1] != digest:
+                    self._remove(project, names)
+                    del self._indexed[sbom_id]
+                    changes += 1
+            for sbom_id, (project, digest, load_names) in current.items():
+                if sbom_id in self._indexed:
+                    continue
+                # A name listed twice in one SBOM still counts once
+                names = tuple(sorted(set(load_names())))
+                self._add(project, names)
+                self._indexed[sbom_id] = (digest, project, names)
+                changes += 1
+        return changes
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Names starting with prefix, alphabetically, as {name, spellings, projects, sboms}"""
+        key = normalize_name(prefix) if prefix.strip() else ''
+        results = []
+        with self._lock:
+            i = bisect_left(self._keys, key)
+            while i < len(self._keys) and len(results) < limit and self._keys[i].startswith(key):
+                entry = self._entries[self._keys[i]]
+                spellings = entry['spellings'].most_common()
+                results.append({
+                    'name': spellings[0][0],
+                    'spellings': sorted(name for name, _ in spellings),
+                    'projects': sorted(entry['projects']),
+                    'sboms': sum(entry['spellings'].values()),
+                })
+                i += 1
+        return results
@@ -0,0 +1,136 @@
+"""
+Dependency policy checked by the generators before a new SBOM version is saved.
+
+The policy is a JSON file, SBOM_POLICY (default backend/policy.json):
+
+    {
+        "enforce": false,
+        "banned": ["pycrypto", "log4j-*"],
+        "minimumVersions": {"numpy": "1.22", "Boost": "1.80"},
+        "allowedSources": ["site-packages", "pyDep.txt", "cppDep.txt", "LCG Website", "External/*"],
+        "projects": {"Athena": {"allowedSources": ["AtlasExternals", "PyModules"]}}
+    }
+
+A project section extends the top-level lists and maps and may override
+"enforce". Names compare like package names (case and '-', '_', '.' ignored)
+and may be globs. Sources are the generator's dependency sources, with file
+paths reduced to the file name. Without allowedSources any source is accepted.
+
+Rules are compiled once per policy file: exact names into sets, globs into a
+single alternation regex, minimum versions into a dict of parsed version
+keys. Checking a dependency is then a few lookups whatever the number of rules.
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from versions import version_key
+from vulnerabilities import normalize_name
+
+DEFAULT_POLICY = Path(__file__).parent / 'policy.json'
+
+
+def policy_path() -> Path:
+    return Path(os.environ.get('SBOM_POLICY') or DEFAULT_POLICY)
+
+
+class _Matcher:
+    """Exact values in a set, glob patterns in one compiled regex"""
+
+    def __init__(self, patterns: Iterable[str], normalize=lambda value: value):
+        self.normalize = normalize
+        self.exact = set()
+        globs = []
+        for pattern in patterns:
+            pattern = normalize(pattern)
+            if any(c in pattern for c in '*?['):
+                globs.append(fnmatch.translate(pattern))
+            else:
+                self.exact.add(pattern)
+        self.regex = re.compile('|'.join(globs)) if globs else None
+
+    def __call__(self, value: str) -> bool:
+        value = self.normalize(value)
+        return value in self.exact or bool(self.regex and self.regex.match(value))
+
+
+def _source_name(source: str) -> str:
+    # A source given as a file path counts by its file name
+    return os.path.basename(source) if os.path.isabs(source) else source
+
+
+class Policy:
+    """Compiled policy rules for one project"""
+
+    def __init__(self, rules: Dict, digest: str):
+        self.rules = rules
+        self.digest = digest
+        self.enforce = bool(rules.get('enforce', False))
+        self.banned = _Matcher(rules.get('banned', []), normalize_name)
+        self.minimum = {}
+        for name, minimum in rules.get('minimumVersions', {}).items():
+            key = version_key(minimum)
+            if key is None:
+                raise ValueError(f"Unparsable minimum version {minimum!r} for {name} in {policy_path()}")
+            self.minimum[normalize_name(name)] = (key, minimum)
+        sources = rules.get('allowedSources')
+        self.allowed_source = _Matcher(sources) if sources is not None else None
+
+    def check(self, dependencies: Iterable[Tuple[str, Optional[str], Optional[str]]]) -> List[Dict]:
+        """Violations of (name, version, source) dependencies, as {rule, component, version, message}"""
+        violations = []
+        for name, version, source in dependencies:
+            version = version or 'undefined'
+            if self.banned(name):
+                violations.append({'rule': 'banned', 'component': name, 'version': version,
+                                   'message': f"{name} {version} is banned"})
+            minimum = self.minimum.get(normalize_name(name))
+            if minimum is not None:
+                key = version_key(version)
+                if key is None or key < minimum[0]:
+                    violations.append({'rule': 'minimumVersion', 'component': name, 'version': version,
+                                       'message': f"{name} {version} is below the minimum version {minimum[1]}"})
+            if self.allowed_source is not None and not self.allowed_source(_source_name(source or '')):
+                violations.append({'rule': 'source', 'component': name, 'version': version,
+                                   'message': f"{name} {version} comes from a source that is not allowed: {_source_name(source or '') or 'unknown'}"})
+        violations.sort(key=lambda v: (v['rule'], v['component'].lower(), v['version']))
+        return violations
+
+
+def _merge(base: Dict, override: Dict) -> Dict:
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, list):
+            merged[key] = list(merged.get(key, [])) + value
+        elif isinstance(value, dict):
+            merged[key] = {**merged.get(key, {}), **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+@lru_cache(maxsize=8)
+def _load(path: str, mtime_ns: int, size: int, project: str) -> Policy:
+    with open(path, 'rb') as f:
+        raw = f.read()
+    rules = json.loads(raw)
+    project_rules = rules.pop('projects', {}).get(project, {})
+    rules = _merge(rules, project_rules)
+    digest = hashlib.sha256(json.dumps(rules, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return Policy(rules, digest)
+
+
+def load_policy(project: str) -> Optional[Policy]:
+    """The compiled policy for a project, or None if no policy file exists"""
+    path = policy_path()
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return _load(str(path), stat.st_mtime_ns, stat.st_size, project)
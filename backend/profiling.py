@@ -0,0 +1,128 @@
+"""
+On-demand cProfile and tracemalloc capture for single API requests or generator runs.
+
+A profile writes <stamp>-<name>.prof (pstats, open with `python -m pstats`)
+and a <stamp>-<name>.txt summary (duration, tracemalloc peak, top functions
+by cumulative time, largest allocations still held) to SBOM_PROFILE_DIR
+(default backend/logs/profiles). Only one profile runs per
+process at a time and only the newest SBOM_PROFILE_KEEP (default 50) are
+kept, so it is safe to switch on for a single request in production.
+"""
+
+import contextlib
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_DIR = Path(__file__).parent / 'logs' / 'profiles'
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 15
+
+# tracemalloc is process-wide, so concurrent profiles would see each other's allocations
+_active = threading.Lock()
+
+
+def profile_dir() -> Path:
+    return Path(os.environ.get('SBOM_PROFILE_DIR') or DEFAULT_DIR)
+
+
+def keep_count() -> int:
+    return int(os.environ.get('SBOM_PROFILE_KEEP', '50'))
+
+
+def request_allowed(flag: Optional[str]) -> bool:
+    """API profiling needs SBOM_PROFILE_TOKEN set and the flag equal to it"""
+    token = os.environ.get('SBOM_PROFILE_TOKEN')
+    return bool(token and flag) and hmac.compare_digest(flag, token)
+
+
+def _prune(directory: Path):
+    profiles = sorted(directory.glob('*.prof'), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in profiles[keep_count():]:
+        old.unlink(missing_ok=True)
+        old.with_suffix('.txt').unlink(missing_ok=True)
+
+
+class Profile:
+    """cProfile plus tracemalloc peak for one request or run"""
+
+    def __init__(self, name: str):
+        # Request paths become file names
+        self.name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_')[:80] or 'profile'
+        self.profiler = cProfile.Profile()
+        self.started = None
+        self.owns_tracemalloc = False
+
+    def start(self) -> bool:
+        """Begin profiling; False if another profile is already running in this process"""
+        if not _active.acquire(blocking=False):
+            return False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.owns_tracemalloc = True
+        tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+        return True
+
+    def stop(self) -> Dict:
+        """Finish, write the .prof and .txt files and return a summary"""
+        self.profiler.disable()
+        duration = time.perf_counter() - self.started
+        try:
+            current, peak = tracemalloc.get_traced_memory()
+            allocations = tracemalloc.take_snapshot().statistics('lineno')[:TOP_ALLOCATIONS]
+            if self.owns_tracemalloc:
+                tracemalloc.stop()
+        finally:
+            _active.release()
+
+        directory = profile_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        stem = f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}-{self.name}"
+        prof_path = directory / f'{stem}.prof'
+        self.profiler.dump_stats(str(prof_path))
+
+        out = io.StringIO()
+        out.write(f'{self.name}\n')
+        out.write(f'Duration: {duration:.3f} s\n')
+        out.write(f'tracemalloc peak: {peak / 1e6:.2f} MB (still allocated at end: {current / 1e6:.2f} MB)\n\n')
+        out.write('Still allocated at the end, largest sites:\n')
+        for stat in allocations:
+            out.write(f'  {stat}\n')
+        out.write('\n')
+        pstats.Stats(self.profiler, stream=out).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        prof_path.with_suffix('.txt').write_text(out.getvalue(), encoding='utf-8')
+
+        _prune(directory)
+        return {
+            'file': prof_path.name,
+            'path': str(prof_path),
+            'duration': duration,
+            'peakBytes': peak,
+        }
+
+
+@contextlib.contextmanager
+def profiled(name: str):
+    """Profile the block; yields the summary dict, filled in on exit (empty if busy)"""
+    summary = {}
+    profile = Profile(name)
+    if not profile.start():
+        print(f"Profiling skipped for {name}: another profile is running")
+        yield summary
+        return
+    try:
+        yield summary
+    finally:
+        summary.update(profile.stop())
+        print(f"Profile written to {summary['path']} (peak {summary['peakBytes'] / 1e6:.2f} MB)")
@@ -0,0 +1,130 @@
+"""
+Helpers shared by the per-project SBOM generators.
+
+Serialization: content-derived bom-refs, the SOURCE_DATE_EPOCH timestamp and
+the canonical re-serialization, so every generator writes byte-stable output
+that versions can be compared and diffed on. AtlasExternals: reading a
+checkout's commit and changed packages, package_filters.txt, and the files of
+historical commits for --backfill (AnalysisBase and Athena).
+"""
+
+import hashlib
+import json
+import os
+import subprocess
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional, Set, Tuple
+
+
+def bom_ref(dep) -> str:
+    """Content-derived bom-ref, so the same component gets the same ref on every run.
+
+    Only the name and version of dep count, as they are a dependency's
+    identity within an SBOM; where the generator found it is left out, so
+    versions of a project can be diffed by ref.
+    """
+    key = f"{dep.name}\0{dep.version or 'undefined'}"
+    return "BomRef." + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def reproducible_timestamp() -> Optional[datetime]:
+    """Honour SOURCE_DATE_EPOCH; otherwise leave the timestamp out so output is byte-stable"""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if not epoch:
+        return None
+    return datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+
+
+def canonical_json(sbom_json: str) -> str:
+    """Re-serialize with sorted keys and a serialNumber derived from the content"""
+    data = json.loads(sbom_json)
+    data.pop("serialNumber", None)
+    body = json.dumps(data, sort_keys=True)
+    data["serialNumber"] = f"urn:uuid:{uuid.uuid5(uuid.NAMESPACE_URL, hashlib.sha256(body.encode('utf-8')).hexdigest())}"
+    return json.dumps(data, sort_keys=True)
+
+
+def git_head(repo_dir: str) -> Optional[str]:
+    """Return the commit checked out in repo_dir, or None if it is not a git checkout"""
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo_dir,
+                             capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def git_changed_packages(external_dir: str, old_commit: str, new_commit: str) -> Optional[Set[str]]:
+    """Return the External/<pkg> directory names touched between two commits.
+
+    Returns None if the diff cannot be computed (e.g. the old commit is no
+    longer reachable), in which case callers should fall back to a full scan.
+    """
+    if old_commit == new_commit:
+        return set()
+    try:
+        out = subprocess.run(["git", "diff", "--name-only", "--relative", old_commit, new_commit],
+                             cwd=external_dir, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {line.split("/", 1)[0] for line in out.stdout.splitlines() if line.strip()}
+
+
+def parse_package_filters(text: str) -> List[str]:
+    """Return the External/<pkg> names enabled ("+ External/...") in a package_filters.txt"""
+    packages: List[str] = []
+    for raw in text.splitlines():
+        line = raw.strip()
+        if line.startswith("+") and "External/" in line:
+            after = line.split("External/", 1)[1].strip()
+            pkg = after.split()[0] if after else ""
+            if pkg:
+                packages.append(pkg)
+    return packages
+
+
+class GitTreeReader:
+    """Read files of one commit straight from the git object database.
+
+    Uses a single `git cat-file --batch` process, so no working tree is
+    checked out and each file costs one round-trip on a pipe.
+    """
+
+    def __init__(self, repo_dir: str, commit: str):
+        self.commit = commit
+        self.proc = subprocess.Popen(["git", "cat-file", "--batch"], cwd=repo_dir,
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def read(self, path: str) -> Optional[str]:
+        """Return the content of path (relative to the repo root), or None if missing"""
+        self.proc.stdin.write(f"{self.commit}:{path}\n".encode("utf-8"))
+        self.proc.stdin.flush()
+        header = self.proc.stdout.readline().split()
+        if len(header) != 3:
+            # "<object> missing" / "<object> ambiguous"
+            return None
+        _, obj_type, size = header
+        data = self.proc.stdout.read(int(size))
+        self.proc.stdout.read(1)  # trailing newline
+        if obj_type != b"blob":
+            return None
+        return data.decode("utf-8", errors="replace")
+
+    def close(self):
+        self.proc.stdin.close()
+        self.proc.wait()
+
+
+def list_backfill_commits(repo_dir: str, rev_range: str, paths: List[str]) -> List[Tuple[str, int]]:
+    """Return (commit, commit time) pairs in rev_range touching paths, oldest first"""
+    out = subprocess.run(["git", "log", "--reverse", "--format=%H %ct", rev_range, "--"] + paths,
+                         cwd=repo_dir, capture_output=True, text=True, check=True)
+    commits = []
+    for line in out.stdout.splitlines():
+        sha, _, ctime = line.partition(" ")
+        if sha and ctime:
+            commits.append((sha, int(ctime)))
+    # --reverse lists parents first; the stable sort keeps that order for equal timestamps
+    commits.sort(key=lambda c: c[1])
+    return commits
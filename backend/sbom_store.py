@@ -0,0 +1,614 @@
+"""
+Storage for versioned SBOM files (SBOMs/vN/*-sbom.{json,md}).
+
+In the default "full" mode every version directory holds complete copies of
+its files. In "delta" mode (SBOM_STORAGE=delta) a new version is stored as a
+"<name>.delta" file describing the change against the previous version, with
+a full snapshot every SBOM_SNAPSHOT_INTERVAL versions or whenever the delta
+would not be meaningfully smaller. JSON documents are diffed per component,
+Markdown per line. Readers go through read_bytes()/exists(), which rebuild a
+delta-stored file on demand and keep recently rebuilt versions in memory.
+
+Versions older than SBOM_ARCHIVE_AGE_DAYS can be moved into a cold tier:
+SBOMs/archive.tar holds one gzip-compressed member per file, and
+SBOMs/archive-index.json records each member's offset plus the listing
+summary of every archived SBOM. Reading an archived file decompresses only
+that member, and listing archived versions only reads the index. The newest
+version always stays in the hot tier.
+
+Deltas refer to the previous version directory, so versions must not be
+deleted from the middle of a delta chain; run "unpack" first.
+
+Writers hold SBOMs/.version.lock (version_lock()) while they pick the next
+version number, compare against the latest version and store. A new version
+is written into a hidden staging directory and renamed to vN in one step, so
+readers never see a half-written version.
+
+    python sbom_store.py pack AnalysisBase/SBOMs
+    python sbom_store.py unpack AnalysisBase/SBOMs
+    python sbom_store.py archive AnalysisBase/SBOMs --older-than-days 90
+    python sbom_store.py unarchive AnalysisBase/SBOMs
+"""
+
+import argparse
+import copy
+import difflib
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tarfile
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import locks
+
+DELTA_SUFFIX = ".delta"
+DELTA_FORMAT = 1
+DEFAULT_SNAPSHOT_INTERVAL = 10
+# A delta larger than this fraction of the full file is not worth a chain link
+MAX_DELTA_RATIO = 0.5
+ARCHIVE_FILE = "archive.tar"
+ARCHIVE_INDEX = "archive-index.json"
+ARCHIVE_FORMAT = 1
+DEFAULT_ARCHIVE_AGE_DAYS = 90
+VERSION_LOCK = ".version.lock"
+STAGING_SUFFIX = ".staging"
+# Build info is recorded as metadata properties named "build:<key>"
+BUILD_PROPERTY_PREFIX = "build:"
+BUILD_INFO_KEYS = ("C Compiler", "CXX Compiler", "Platform", "lcg_version")
+# Policy results are recorded as "policy:digest", "policy:violations" (the count)
+# and one "policy:violation:<n>:<rule>:<component>" property per violation; n keeps
+# the names unique when a rule hits two versions of one component
+POLICY_PROPERTY_PREFIX = "policy:"
+
+
+def storage_mode() -> str:
+    return os.environ.get("SBOM_STORAGE", "full")
+
+
+def snapshot_interval() -> int:
+    try:
+        return max(1, int(os.environ.get("SBOM_SNAPSHOT_INTERVAL", DEFAULT_SNAPSHOT_INTERVAL)))
+    except ValueError:
+        return DEFAULT_SNAPSHOT_INTERVAL
+
+
+def delta_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + DELTA_SUFFIX)
+
+
+def exists(path) -> bool:
+    """True if the file is stored in full, as a delta or in the archive"""
+    return Path(path).exists() or delta_path(path).exists() or _archive_member(path) is not None
+
+
+def list_files(directory, pattern: str) -> List[Path]:
+    """Logical files in directory matching pattern, however they are stored"""
+    directory = Path(directory)
+    found = set(directory.glob(pattern))
+    found.update(p.with_name(p.name[:-len(DELTA_SUFFIX)]) for p in directory.glob(pattern + DELTA_SUFFIX))
+    return sorted(found)
+
+
+def read_bytes(path) -> bytes:
+    """Contents of a stored file, rebuilding it from its delta chain if needed"""
+    path = Path(path)
+    if path.exists():
+        with open(path, "rb") as f:
+            return f.read()
+    dpath = delta_path(path)
+    if not dpath.exists() and _archive_member(path) is not None:
+        return _read_archived(path)
+    stat = dpath.stat()
+    return _materialize(str(dpath), stat.st_mtime_ns, stat.st_size)
+
+
+def read_text(path) -> str:
+    return read_bytes(path).decode("utf-8")
+
+
+def stored_digest(path) -> str:
+    """SHA-256 of a stored file's contents; deltas record it, so no rebuild is needed"""
+    path = Path(path)
+    if not path.exists():
+        if delta_path(path).exists():
+            return _load_delta(delta_path(path))["sha256"]
+        member = _archive_member(path)
+        if member is not None:
+            return member["sha256"]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _load_delta(dpath: Path) -> dict:
+    with open(dpath, "r", encoding="utf-8") as f:
+        delta = json.load(f)
+    if delta.get("format") != DELTA_FORMAT:
+        raise ValueError(f"Unsupported delta format in {dpath}")
+    return delta
+
+
+@lru_cache(maxsize=32)
+def _materialize(dpath: str, mtime_ns: int, size: int) -> bytes:
+    # mtime/size are part of the cache key so a rewritten delta is not served stale
+    dpath = Path(dpath)
+    delta = _load_delta(dpath)
+    name = dpath.name[:-len(DELTA_SUFFIX)]
+    base = read_bytes(dpath.parent.parent / delta["base"] / name)
+    content = _apply(base, delta)
+    if hashlib.sha256(content).hexdigest() != delta["sha256"]:
+        raise ValueError(f"Delta {dpath} does not reproduce the stored version")
+    return content
+
+
+def _diff_list(old: list, new: list) -> list:
+    """Replacement ops [start, end, new items] turning old into new"""
+    old_keys = [json.dumps(item, sort_keys=True) if not isinstance(item, str) else item for item in old]
+    new_keys = [json.dumps(item, sort_keys=True) if not isinstance(item, str) else item for item in new]
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    return [[i1, i2, new[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def _patch_list(old: list, ops: list) -> list:
+    result = []
+    pos = 0
+    for start, end, items in ops:
+        result.extend(old[pos:start])
+        result.extend(items)
+        pos = end
+    result.extend(old[pos:])
+    return result
+
+
+def _diff(base: bytes, content: bytes) -> dict:
+    """Component-level delta for canonical JSON documents, line-level otherwise"""
+    try:
+        old_doc = json.loads(base)
+        new_doc = json.loads(content)
+        if isinstance(old_doc, dict) and isinstance(new_doc, dict) \
+                and json.dumps(new_doc, sort_keys=True).encode("utf-8") == content:
+            delta = {"kind": "json", "set": {}, "drop": [], "lists": {}}
+            for key, value in new_doc.items():
+                old_value = old_doc.get(key)
+                if isinstance(value, list) and isinstance(old_value, list):
+                    if value != old_value:
+                        delta["lists"][key] = _diff_list(old_value, value)
+                elif key not in old_doc or value != old_value:
+                    delta["set"][key] = value
+            delta["drop"] = sorted(key for key in old_doc if key not in new_doc)
+            return delta
+    except ValueError:
+        pass
+    old_lines = base.decode("utf-8").splitlines(keepends=True)
+    new_lines = content.decode("utf-8").splitlines(keepends=True)
+    return {"kind": "lines", "ops": _diff_list(old_lines, new_lines)}
+
+
+def _apply(base: bytes, delta: dict) -> bytes:
+    if delta["kind"] == "json":
+        doc = json.loads(base)
+        for key in delta["drop"]:
+            doc.pop(key, None)
+        for key, ops in delta["lists"].items():
+            doc[key] = _patch_list(doc[key], ops)
+        doc.update(delta["set"])
+        return json.dumps(doc, sort_keys=True).encode("utf-8")
+    lines = base.decode("utf-8").splitlines(keepends=True)
+    return "".join(_patch_list(lines, delta["ops"])).encode("utf-8")
+
+
+def _previous_version_dir(version_dir: Path) -> Optional[Path]:
+    try:
+        number = int(version_dir.name[1:])
+    except ValueError:
+        return None
+    previous = [
+        (int(item.name[1:]), item) for item in version_dir.parent.iterdir()
+        if item.is_dir() and item.name.startswith("v") and item.name[1:].isdigit() and int(item.name[1:]) < number
+    ]
+    return max(previous)[1] if previous else None
+
+
+def _chain_depth(path: Path) -> int:
+    dpath = delta_path(path)
+    return _load_delta(dpath)["depth"] if not path.exists() and dpath.exists() else 0
+
+
+def _write_full(path: Path, content: bytes):
+    with open(path, "wb") as f:
+        f.write(content)
+    if delta_path(path).exists():
+        delta_path(path).unlink()
+
+
+def _write_delta(path: Path, content: bytes, base_dir: Optional[Path]) -> bool:
+    """Write path as a delta against the same file in base_dir; False if a snapshot is better"""
+    if base_dir is None:
+        return False
+    base_path = base_dir / path.name
+    if not exists(base_path):
+        return False
+    depth = _chain_depth(base_path) + 1
+    if depth >= snapshot_interval():
+        return False
+    delta = _diff(read_bytes(base_path), content)
+    delta.update({
+        "format": DELTA_FORMAT,
+        "base": base_dir.name,
+        "depth": depth,
+        "sha256": hashlib.sha256(content).hexdigest(),
+    })
+    encoded = json.dumps(delta, sort_keys=True).encode("utf-8")
+    if len(encoded) > len(content) * MAX_DELTA_RATIO or _apply(read_bytes(base_path), delta) != content:
+        return False
+    with open(delta_path(path), "wb") as f:
+        f.write(encoded)
+    if path.exists():
+        path.unlink()
+    return True
+
+
+def store_version(version_dir, files: Dict[str, bytes], mode: Optional[str] = None, mtime: Optional[float] = None):
+    """Write the files of one SBOM version ({file name: contents}) into version_dir.
+
+    A new version_dir appears atomically with all its files; an existing one
+    (repack) is rewritten in place. mtime dates the version instead of now,
+    e.g. to the commit a backfilled version was built from.
+    """
+    version_dir = Path(version_dir)
+    version_dir.parent.mkdir(parents=True, exist_ok=True)
+    mode = mode or storage_mode()
+    base_dir = _previous_version_dir(version_dir) if mode == "delta" else None
+    target = version_dir
+    if not version_dir.exists():
+        target = version_dir.parent / f".{version_dir.name}.{os.getpid()}.{threading.get_ident()}{STAGING_SUFFIX}"
+        target.mkdir()
+    try:
+        for name, content in files.items():
+            if isinstance(content, str):
+                content = content.encode("utf-8")
+            path = target / name
+            if not _write_delta(path, content, base_dir):
+                _write_full(path, content)
+        if mtime is not None:
+            for path in target.iterdir():
+                os.utime(path, (mtime, mtime))
+        if target != version_dir:
+            # Fails if another writer created version_dir meanwhile, instead of overwriting it
+            os.rename(target, version_dir)
+        if mtime is not None:
+            os.utime(version_dir, (mtime, mtime))
+    except BaseException:
+        if target != version_dir:
+            shutil.rmtree(target, ignore_errors=True)
+        raise
+
+
+def version_lock(sboms_dir, timeout: Optional[float] = None) -> locks.FileLock:
+    """Exclusive lock on an SBOMs directory, for use in a with statement.
+
+    Held while allocating and storing a version, and while packing or
+    archiving. Staging directories left behind by a crashed writer are
+    removed once the lock is taken.
+    """
+    sboms_dir = Path(sboms_dir)
+    lock = locks.locked(sboms_dir / VERSION_LOCK, timeout=timeout)
+    for staging in sboms_dir.glob(f".v*{STAGING_SUFFIX}"):
+        shutil.rmtree(staging, ignore_errors=True)
+    return lock
+
+
+def latest_version(sboms_dir) -> Tuple[int, Optional[Path]]:
+    """Highest version number in an SBOMs directory, hot or archived, and its directory path (0, None if empty)"""
+    sboms_dir = Path(sboms_dir)
+    numbers = [int(item.name[1:]) for item in _version_dirs(sboms_dir)] if sboms_dir.is_dir() else []
+    numbers += [int(entry["version"][1:]) for entry in archived_versions(sboms_dir)]
+    if not numbers:
+        return 0, None
+    return max(numbers), sboms_dir / f"v{max(numbers)}"
+
+
+def _version_dirs(sboms_dir: Path) -> List[Path]:
+    dirs = [item for item in sboms_dir.iterdir() if item.is_dir() and item.name.startswith("v") and item.name[1:].isdigit()]
+    return sorted(dirs, key=lambda item: int(item.name[1:]))
+
+
+def repack(sboms_dir, mode: str):
+    """Rewrite an existing SBOMs directory in the given storage mode"""
+    sboms_dir = Path(sboms_dir)
+    dirs = _version_dirs(sboms_dir)
+    # Rebuild everything before rewriting, since rewriting changes the bases
+    contents = [
+        (version_dir, {path.name: read_bytes(path) for path in list_files(version_dir, "*-sbom.*")
+                       if not path.name.endswith(DELTA_SUFFIX)})
+        for version_dir in dirs
+    ]
+    before = sum(f.stat().st_size for f in sboms_dir.rglob("*") if f.is_file())
+    for version_dir, files in contents:
+        store_version(version_dir, files, mode=mode)
+    _materialize.cache_clear()
+    after = sum(f.stat().st_size for f in sboms_dir.rglob("*") if f.is_file())
+    print(f"{sboms_dir}: {len(dirs)} version(s), {before} -> {after} bytes")
+
+
+def build_properties(build_info) -> List[Tuple[str, str]]:
+    """Metadata (name, value) pairs recording the build info of an SBOM"""
+    return [
+        (BUILD_PROPERTY_PREFIX + key, str(build_info[key]))
+        for key in BUILD_INFO_KEYS if build_info and build_info.get(key)
+    ]
+
+
+def get_build_info(sbom_data) -> dict:
+    """Build info recorded in an SBOM's metadata properties"""
+    build_info = {}
+    for prop in sbom_data.get('metadata', {}).get('properties', []):
+        name = prop.get('name', '')
+        if name.startswith(BUILD_PROPERTY_PREFIX):
+            build_info[name[len(BUILD_PROPERTY_PREFIX):]] = prop.get('value', '')
+    return build_info
+
+
+def policy_properties(digest: str, violations: List[dict]) -> List[Tuple[str, str]]:
+    """Metadata (name, value) pairs recording a policy check"""
+    properties = [(POLICY_PROPERTY_PREFIX + "digest", digest), (POLICY_PROPERTY_PREFIX + "violations", str(len(violations)))]
+    properties += [(f"{POLICY_PROPERTY_PREFIX}violation:{n}:{v['rule']}:{v['component']}", v['message'])
+                   for n, v in enumerate(violations, 1)]
+    return properties
+
+
+def get_policy_violations(sbom_data) -> Optional[dict]:
+    """Policy check recorded in an SBOM's metadata properties, or None if it was not checked"""
+    result = None
+    for prop in sbom_data.get('metadata', {}).get('properties', []):
+        name = prop.get('name', '')
+        if not name.startswith(POLICY_PROPERTY_PREFIX):
+            continue
+        if result is None:
+            result = {'digest': None, 'count': 0, 'violations': []}
+        key = name[len(POLICY_PROPERTY_PREFIX):]
+        if key == "digest":
+            result['digest'] = prop.get('value')
+        elif key == "violations":
+            result['count'] = int(prop.get('value', 0))
+        elif key.startswith("violation:"):
+            number, _, rest = key[len("violation:"):].partition(":")
+            if not number.isdigit():
+                # Recorded before violations were numbered: "violation:<rule>:<component>"
+                number, rest = "0", key[len("violation:"):]
+            rule, component = rest.split(":", 1)
+            result['violations'].append({'rule': rule, 'component': component, 'message': prop.get('value', ''),
+                                         'n': int(number)})
+    if result is not None:
+        # Properties are stored sorted by name, so violation 10 comes before 2
+        result['violations'].sort(key=lambda v: v.pop('n'))
+    return result
+
+
+def get_sbom_signature(sbom_data, build_info=None):
+    """Generate a signature for an SBOM to compare if it's identical
+    Includes all data except generation timestamp"""
+    signature_parts = []
+    
+    # 1. Components (dependencies) - sorted by name and version
+    components = sbom_data.get('components', [])
+    normalized_components = sorted([
+        (comp.get('name', ''), comp.get('version', ''))
+        for comp in components
+    ])
+    signature_parts.append(('components', tuple(normalized_components)))
+    
+    # 1b. Dependency edges between components, by name and version
+    by_ref = {comp.get('bom-ref'): (comp.get('name', ''), comp.get('version', '')) for comp in components}
+    edges = sorted(
+        (by_ref[dep.get('ref')], by_ref[target])
+        for dep in sbom_data.get('dependencies', [])
+        for target in dep.get('dependsOn', [])
+        if dep.get('ref') in by_ref and target in by_ref
+    )
+    if edges:
+        signature_parts.append(('dependencies', tuple(edges)))
+    
+    # 2. Metadata properties (excluding timestamp)
+    metadata = sbom_data.get('metadata', {})
+    properties = metadata.get('properties', [])
+    # Convert properties list to sorted dict for consistent comparison
+    props_dict = {}
+    for prop in properties:
+        props_dict[prop.get('name', '')] = prop.get('value', '')
+    normalized_props = tuple(sorted(props_dict.items()))
+    signature_parts.append(('properties', normalized_props))
+    
+    # 3. Build information (if provided)
+    if build_info:
+        normalized_build = tuple(sorted(build_info.items()))
+        signature_parts.append(('build_info', normalized_build))
+    
+    return tuple(signature_parts)
+
+
+def describe_sbom(raw: bytes) -> dict:
+    """Listing summary of an SBOM JSON document"""
+    data = json.loads(raw)
+    properties = {}
+    for prop in data.get('metadata', {}).get('properties', []):
+        properties[prop['name']] = prop['value']
+    sources = set()
+    for comp in data.get('components', []):
+        for prop in comp.get('properties', []):
+            if prop.get('name') == 'source':
+                sources.add(prop.get('value', ''))
+    return {
+        'timestamp': data.get('metadata', {}).get('timestamp'),
+        'dependencyCount': len(data.get('components', [])),
+        'sources': list(sources),
+        'properties': properties,
+        'buildInfo': get_build_info(data),
+        'policy': get_policy_violations(data),
+        'digest': hashlib.sha256(raw).hexdigest(),
+        'signature': get_sbom_signature(data),
+    }
+
+
+def _archive_index_path(sboms_dir: Path) -> Path:
+    return sboms_dir / ARCHIVE_INDEX
+
+
+@lru_cache(maxsize=16)
+def _load_archive_index(index_path: str, mtime_ns: int, size: int) -> dict:
+    with open(index_path, "r", encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("format") != ARCHIVE_FORMAT:
+        raise ValueError(f"Unsupported archive format in {index_path}")
+    return index
+
+
+def archive_index(sboms_dir) -> Optional[dict]:
+    """The archive index of an SBOMs directory, or None if nothing is archived"""
+    index_path = _archive_index_path(Path(sboms_dir))
+    try:
+        stat = index_path.stat()
+    except FileNotFoundError:
+        return None
+    return _load_archive_index(str(index_path), stat.st_mtime_ns, stat.st_size)
+
+
+def _archive_member(path) -> Optional[dict]:
+    path = Path(path)
+    index = archive_index(path.parent.parent)
+    if index is None:
+        return None
+    return index["members"].get(f"{path.parent.name}/{path.name}")
+
+
+def _read_archived(path: Path) -> bytes:
+    member = _archive_member(path)
+    with open(path.parent.parent / ARCHIVE_FILE, "rb") as f:
+        f.seek(member["offset"])
+        content = gzip.decompress(f.read(member["size"]))
+    if hashlib.sha256(content).hexdigest() != member["sha256"]:
+        raise ValueError(f"Archived {path} is corrupt")
+    return content
+
+
+def archived_versions(sboms_dir) -> List[dict]:
+    """Archived versions as {'version', 'mtime', 'files', 'summary'}, without opening the archive"""
+    index = archive_index(sboms_dir)
+    return list(index["versions"].values()) if index else []
+
+
+def _write_archive_index(sboms_dir: Path, index: dict):
+    tmp_path = _archive_index_path(sboms_dir).with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, sort_keys=True)
+    os.replace(tmp_path, _archive_index_path(sboms_dir))
+
+
+def archive(sboms_dir, older_than_days: float) -> int:
+    """Move versions whose files are older than older_than_days into the archive"""
+    sboms_dir = Path(sboms_dir)
+    dirs = _version_dirs(sboms_dir)
+    cutoff = time.time() - older_than_days * 86400
+    selected = []
+    # The newest version stays hot: duplicate checks and delta writes read it
+    for version_dir in dirs[:-1]:
+        files = [path for path in list_files(version_dir, "*-sbom.*") if not path.name.endswith(DELTA_SUFFIX)]
+        stored = [p if p.exists() else delta_path(p) for p in files]
+        if files and max(p.stat().st_mtime for p in stored) < cutoff:
+            selected.append((version_dir, files, max(p.stat().st_mtime for p in stored)))
+    if not selected:
+        return 0
+
+    index = archive_index(sboms_dir) or {"format": ARCHIVE_FORMAT, "members": {}, "versions": {}}
+    index = copy.deepcopy(index)  # the loaded index is cached and shared
+    archive_path = sboms_dir / ARCHIVE_FILE
+    # Plain (uncompressed) tar of individually compressed members, so one
+    # member can be read by offset without decompressing the rest
+    with tarfile.open(archive_path, "a" if archive_path.exists() else "w", format=tarfile.PAX_FORMAT) as tar:
+        for version_dir, files, mtime in selected:
+            entry = {"version": version_dir.name, "mtime": mtime, "files": [], "summary": None}
+            for path in files:
+                content = read_bytes(path)
+                compressed = gzip.compress(content, mtime=0)
+                info = tarfile.TarInfo(f"{version_dir.name}/{path.name}.gz")
+                info.size = len(compressed)
+                info.mtime = int(mtime)
+                tar.addfile(info, io.BytesIO(compressed))
+                index["members"][f"{version_dir.name}/{path.name}"] = {
+                    "sha256": hashlib.sha256(content).hexdigest(),
+                    "length": len(content),
+                }
+                entry["files"].append(path.name)
+                if path.name.endswith("-sbom.json"):
+                    entry["summary"] = describe_sbom(content)
+            index["versions"][version_dir.name] = entry
+
+    # Data offsets are only known once the headers are written
+    with tarfile.open(archive_path, "r") as tar:
+        for info in tar:
+            name = info.name[:-len(".gz")]
+            if name in index["members"]:
+                index["members"][name].update({"offset": info.offset_data, "size": info.size})
+    _write_archive_index(sboms_dir, index)
+
+    for version_dir, _, _ in selected:
+        shutil.rmtree(version_dir)
+    _materialize.cache_clear()
+    return len(selected)
+
+
+def unarchive(sboms_dir) -> int:
+    """Restore every archived version to a full SBOMs/vN directory"""
+    sboms_dir = Path(sboms_dir)
+    versions = archived_versions(sboms_dir)
+    for entry in versions:
+        version_dir = sboms_dir / entry["version"]
+        files = {name: read_bytes(version_dir / name) for name in entry["files"]}
+        version_dir.mkdir(exist_ok=True)
+        for name, content in files.items():
+            _write_full(version_dir / name, content)
+            os.utime(version_dir / name, (entry["mtime"], entry["mtime"]))
+    if versions:
+        _archive_index_path(sboms_dir).unlink()
+        (sboms_dir / ARCHIVE_FILE).unlink()
+    return len(versions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert SBOM version history between storage modes and tiers")
+    parser.add_argument('command', choices=['pack', 'unpack', 'archive', 'unarchive'])
+    parser.add_argument('sboms_dir', nargs='+')
+    parser.add_argument('--older-than-days', type=float,
+                        default=float(os.environ.get("SBOM_ARCHIVE_AGE_DAYS", DEFAULT_ARCHIVE_AGE_DAYS)),
+                        help='Archive versions last written more than this many days ago')
+    args = parser.parse_args()
+
+    for sboms_dir in args.sboms_dir:
+        if not Path(sboms_dir).is_dir():
+            print(f"Error: {sboms_dir} is not a directory")
+            sys.exit(1)
+        # Packing and archiving move versions around; keep writers out meanwhile
+        with version_lock(sboms_dir):
+            if args.command == "archive":
+                count = archive(sboms_dir, args.older_than_days)
+                print(f"{sboms_dir}: archived {count} version(s)")
+            elif args.command == "unarchive":
+                count = unarchive(sboms_dir)
+                print(f"{sboms_dir}: restored {count} version(s)")
+            else:
+                repack(sboms_dir, "delta" if args.command == "pack" else "full")
+
+
+if __name__ == "__main__":
+    main()
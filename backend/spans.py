@@ -0,0 +1,58 @@
+"""
+Timing spans for SBOM generator stages.
+
+Each span records the stage's wall time, the number of items it produced and
+the bytes the generator read (and, for output stages, wrote) while it ran.
+Finished spans are kept on the recorder, printed as one JSON line each (the
+daily run sends generator output to its log), and observed in the
+sbom_generator_stage_duration_seconds metric.
+"""
+
+import contextlib
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import metrics
+
+STAGE_SECONDS = metrics.histogram('sbom_generator_stage_duration_seconds', 'SBOM generation time by project and stage',
+                                  ('project', 'stage'), buckets=metrics.JOB_BUCKETS)
+
+
+class StageSpans:
+    """Records one span per generator stage"""
+
+    def __init__(self, project: str, bytes_read: Optional[Callable[[], int]] = None, stream=sys.stdout):
+        self.project = project
+        self.records: List[Dict] = []
+        # Running total of bytes read by the generator; spans report the difference
+        self._bytes_read = bytes_read or (lambda: 0)
+        # Where finished spans are printed as JSON lines; None keeps them in memory only
+        self.stream = stream
+
+    @contextlib.contextmanager
+    def span(self, stage: str):
+        """Time the block; it may set record['items'] and record['bytes_written']"""
+        record = {
+            'span': stage,
+            'project': self.project,
+            'start': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'items': None,
+        }
+        read_before = self._bytes_read()
+        start = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record['error'] = str(e)
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            record['duration'] = round(duration, 6)
+            record['bytes_read'] = self._bytes_read() - read_before
+            self.records.append(record)
+            STAGE_SECONDS.observe(duration, project=self.project, stage=stage)
+            if self.stream is not None:
+                print(json.dumps(record, sort_keys=True), file=self.stream, flush=True)
@@ -0,0 +1,155 @@
+"""
+Comparable keys for component version strings.
+
+Stored SBOMs carry versions in many spellings: dotted releases (1.86.0,
+10.6.3.15), Boost's underscores (1_86_0), LCG releases (106b_ATLAS_1), pip
+versions (2.1.0rc1, 1.0.post2, 1!2.0), epochs (1:2.3) and bare dates
+(20240115). version_key() turns each into a tuple that sorts in release
+order:
+
+- numeric parts compare numerically, and trailing zeros are ignored
+  (1.0 == 1.0.0, 1_86_0 == 1.86.0);
+- dev, alpha/a<N>, beta/b<N> and rc/c<N>/pre sort before the release they
+  lead up to (1.0.dev0 < 1.0a1 < 1.0b2 < 1.0rc1 < 1.0);
+- any other word sorts after it: post releases (1.0 < 1.0.post1 < 1.0.1),
+  letter suffixes (1.1.1k < 1.1.1w, 106 < 106a < 106b) and qualifiers
+  (106b < 106b_ATLAS_1 < 106b_ATLAS_2).
+
+Keys are cached: the same few thousand strings recur across every stored
+SBOM, and sorting or diffing compares each one many times.
+"""
+
+import operator
+import re
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+KEY_CACHE_SIZE = 65536
+
+_PART = re.compile(r'\d+|[a-z]+')
+# Words that always mark a pre-release, and their order
+_PRE_RELEASE = {'dev': 0, 'alpha': 1, 'beta': 2, 'rc': 3, 'pre': 3, 'preview': 3}
+# Single letters are only a pre-release when a number follows (1.0b2, not LCG's 106b)
+_PRE_RELEASE_LETTERS = {'a': 1, 'b': 2, 'c': 3}
+# Words naming a post release, spelled one way
+_POST_RELEASE = {'post': 'post', 'rev': 'post', 'r': 'post'}
+_EPOCH = re.compile(r'^(\d+)[:!](.+)$')
+# Package or release-line prefix in front of the version: LCG_106, boost_1_86_0, release-22.0
+_PREFIX = re.compile(r'^[a-z][a-z0-9]*?[-_](?=\d)')
+# Abbreviated or full git commit hash; without a letter it could be a date or plain number
+_GIT_HASH = re.compile(r'^(?=[0-9]*[a-f])[0-9a-f]{7,40}$')
+
+# Ranks of the key parts: pre-release < end of version < other words < numbers
+_PRE, _END, _WORD, _NUMBER = 0, 1, 2, 3
+
+RANGE_OPERATORS = {
+    '>=': operator.ge,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '<': operator.lt,
+}
+
+
+@lru_cache(maxsize=KEY_CACHE_SIZE)
+def version_key(version) -> Optional[tuple]:
+    """Sortable key for a version string, or None if it cannot be compared (undefined, git hashes)"""
+    if not version:
+        return None
+    text = str(version).strip().lower()
+    # 1e5a7f3 would otherwise read as version 1 with a suffix
+    if _GIT_HASH.match(text):
+        return None
+    epoch = 0
+    match = _EPOCH.match(text)
+    if match:
+        epoch, text = int(match.group(1)), match.group(2)
+    text = re.sub(r'^v(?=\d)', '', text).split('+', 1)[0]
+    text = _PREFIX.sub('', text, count=1)
+    parts = _PART.findall(text)
+    if not parts or not parts[0].isdigit():
+        return None
+    key = [(_NUMBER, epoch)]
+    for i, part in enumerate(parts):
+        if part.isdigit():
+            key.append((_NUMBER, int(part)))
+            continue
+        # Trailing zeros of a release don't count: 1.0rc1 == 1.0.0rc1
+        while len(key) > 2 and key[-1] == (_NUMBER, 0) and key[-2][0] == _NUMBER:
+            key.pop()
+        followed_by_number = i + 1 < len(parts) and parts[i + 1].isdigit()
+        if part in _PRE_RELEASE:
+            key.append((_PRE, _PRE_RELEASE[part]))
+        elif part in _PRE_RELEASE_LETTERS and followed_by_number:
+            key.append((_PRE, _PRE_RELEASE_LETTERS[part]))
+        else:
+            key.append((_WORD, _POST_RELEASE.get(part, part)))
+    while len(key) > 2 and key[-1] == (_NUMBER, 0) and key[-2][0] == _NUMBER:
+        key.pop()
+    key.append((_END, ''))
+    return tuple(key)
+
+
+def sort_key(version) -> tuple:
+    """Key for sorted(): comparable versions in release order, then the rest by their text"""
+    key = version_key(version)
+    return (key is None, key or (), str(version or ''))
+
+
+def compare(a, b) -> Optional[int]:
+    """-1, 0 or 1 as a is older than, equivalent to or newer than b; None if either cannot be compared"""
+    key_a, key_b = version_key(a), version_key(b)
+    if key_a is None or key_b is None:
+        return None
+    return (key_a > key_b) - (key_a < key_b)
+
+
+def classify(old, new) -> str:
+    """How a component's version moved between two SBOMs.
+
+    'unchanged' (same string), 'equivalent' (1.0 -> 1.0.0), 'upgraded',
+    'downgraded', or 'changed' when either side cannot be compared.
+    """
+    if old == new:
+        return 'unchanged'
+    order = compare(old, new)
+    if order is None:
+        return 'changed'
+    return {-1: 'upgraded', 0: 'equivalent', 1: 'downgraded'}[order]
+
+
+def parse_range(spec: str) -> Callable[[str], bool]:
+    """Predicate for a range like ">=1.80,<1.87"; clauses are ANDed and a bare version means ==.
+
+    Versions that cannot be compared never match. Raises ValueError for a malformed spec.
+    """
+    clauses = []
+    for clause in spec.split(','):
+        clause = clause.strip()
+        if not clause:
+            continue
+        op = next((symbol for symbol in RANGE_OPERATORS if clause.startswith(symbol)), None)
+        bound = clause[len(op):].strip() if op else clause
+        key = version_key(bound)
+        if key is None:
+            raise ValueError(f"Cannot compare against version {bound!r}")
+        clauses.append((RANGE_OPERATORS[op or '=='], key))
+    if not clauses:
+        raise ValueError("Empty version range")
+
+    def contains(version) -> bool:
+        key = version_key(version)
+        return key is not None and all(test(key, bound) for test, bound in clauses)
+
+    return contains
+
+
+def newest(versions) -> Optional[str]:
+    """The newest comparable version in versions, or None"""
+    comparable: List[str] = [v for v in versions if version_key(v) is not None]
+    return max(comparable, key=version_key) if comparable else None
+
+
+def cache_info():
+    return version_key.cache_info()
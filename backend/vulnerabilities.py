@@ -0,0 +1,478 @@
+"""
+Offline vulnerability matching of stored SBOMs against a local advisory dump.
+
+The dump lives in SBOM_ADVISORY_DB (default backend/advisories): OSV records
+as *.json files, JSON lists or *.zip archives (the osv.dev per-ecosystem
+all.zip works as is), and/or NVD CVE JSON 2.0 feeds. It is compiled once
+into an index keyed by normalized package name. Each name has its explicitly
+listed versions in a dict and its affected ranges as intervals sorted by
+lower bound, so a lookup bisects to the candidate intervals instead of
+walking every advisory. Every interval and version carries its ecosystem: a
+component's recorded source decides where it is matched, PyPI for Python
+distributions and NVD CPE product names for the C/C++ externals, so a C++
+library never picks up the advisories of a PyPI package that happens to
+share its name. Components without a source match every ecosystem. The
+compiled index is pickled in SBOM_VULN_CACHE
+(default backend/vuln-cache) under a fingerprint of the dump, and match
+results are cached there per SBOM content digest.
+
+    python3 vulnerabilities.py index
+    python3 vulnerabilities.py scan AnalysisBase/SBOMs Athena/SBOMs StatAnalysis/SBOMs
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+import zipfile
+from bisect import bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import sbom_store
+from versions import version_key
+
+BACKEND_DIR = Path(__file__).parent
+# Bumped whenever version keys or the index layout change, so older pickles are rebuilt
+INDEX_FORMAT = 3
+# Re-stat the advisory dump at most this often
+FINGERPRINT_TTL = 60.0
+MEMORY_CACHE_SIZE = 512
+
+_lock = threading.Lock()
+_index_cache: Dict[str, "AdvisoryIndex"] = {}
+_fingerprint_cache: Dict[str, Tuple[float, Optional[str]]] = {}
+_matches: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def advisory_db_dir() -> Path:
+    return Path(os.environ.get('SBOM_ADVISORY_DB') or BACKEND_DIR / 'advisories')
+
+
+def cache_dir() -> Path:
+    return Path(os.environ.get('SBOM_VULN_CACHE') or BACKEND_DIR / 'vuln-cache')
+
+
+def normalize_name(name: str) -> str:
+    """Case-insensitive, with runs of '-', '_' and '.' folded together (as PEP 503)"""
+    return re.sub(r'[-_.]+', '-', name.strip()).lower()
+
+
+# Lower bound of "introduced: 0"; sorts before every version key
+_MIN = ()
+
+PYPI, NVD = 'PyPI', 'NVD'
+# Dependency sources listing Python distributions, file paths reduced to their last part (External/PyModules)
+PYTHON_SOURCES = {'site-packages', 'pyDep.txt', 'PyModules', 'PyAnalysis'}
+
+
+def component_ecosystem(source: Optional[str]) -> Optional[str]:
+    """Ecosystem a component's advisories come from: PyPI for Python distributions, NVD otherwise; None without a source"""
+    if not source:
+        return None
+    return PYPI if os.path.basename(source.rstrip('/')) in PYTHON_SOURCES else NVD
+
+
+def _ecosystem(advisory: dict) -> str:
+    # OSV ecosystems may carry a release, as in "Debian:12"
+    return advisory['ecosystem'].split(':', 1)[0]
+
+
+def _osv_records(doc) -> Iterable[Tuple[dict, str, list, list]]:
+    """(advisory, package name, intervals, exact version keys) for each affected package"""
+    severity = (doc.get('database_specific') or {}).get('severity')
+    if not severity and doc.get('severity'):
+        severity = doc['severity'][0].get('score')
+    for affected in doc.get('affected', []):
+        package = affected.get('package') or {}
+        name = package.get('name')
+        if not name:
+            continue
+        intervals = []
+        fixed = []
+        for rng in affected.get('ranges', []):
+            if rng.get('type') == 'GIT':
+                continue
+            lower = None
+            for event in rng.get('events', []):
+                if 'introduced' in event:
+                    lower = _MIN if event['introduced'] in ('0', '') else version_key(event['introduced'])
+                elif 'fixed' in event:
+                    fixed.append(event['fixed'])
+                    upper = version_key(event['fixed'])
+                    if lower is not None and upper is not None:
+                        intervals.append((lower, upper, False))
+                    lower = None
+                elif 'last_affected' in event:
+                    upper = version_key(event['last_affected'])
+                    if lower is not None and upper is not None:
+                        intervals.append((lower, upper, True))
+                    lower = None
+            if lower is not None:
+                intervals.append((lower, None, False))
+        exact = [k for k in map(version_key, affected.get('versions', [])) if k is not None]
+        if not intervals and not exact:
+            continue
+        advisory = {
+            'id': doc.get('id'),
+            'aliases': doc.get('aliases', []),
+            'summary': doc.get('summary') or (doc.get('details') or '')[:200],
+            'severity': severity,
+            'ecosystem': package.get('ecosystem', ''),
+            'package': name,
+            'fixed': fixed,
+        }
+        yield advisory, name, intervals, exact
+
+
+def _nvd_records(doc) -> Iterable[Tuple[dict, str, list, list]]:
+    """Same as _osv_records for an NVD CVE JSON 2.0 feed, one record per vulnerable CPE product"""
+    for item in doc.get('vulnerabilities', []):
+        cve = item.get('cve', item)
+        summary = next((d.get('value') for d in cve.get('descriptions', []) if d.get('lang') == 'en'), '')
+        severity = None
+        for metric_name in ('cvssMetricV31', 'cvssMetricV30', 'cvssMetricV2'):
+            entries = (cve.get('metrics') or {}).get(metric_name)
+            if entries:
+                data = entries[0]
+                severity = data.get('cvssData', {}).get('baseSeverity') or data.get('baseSeverity')
+                break
+        products: Dict[str, Tuple[list, list, list]] = {}
+        for config in cve.get('configurations', []):
+            for node in config.get('nodes', []):
+                for cpe in node.get('cpeMatch', []):
+                    if not cpe.get('vulnerable', True):
+                        continue
+                    parts = cpe.get('criteria', '').split(':')
+                    if len(parts) < 6 or parts[2] != 'a':
+                        continue
+                    product = parts[4].replace('\\', '')
+                    intervals, exact, fixed = products.setdefault(product, ([], [], []))
+                    if parts[5] not in ('*', '-'):
+                        key = version_key(parts[5].replace('\\', ''))
+                        if key is not None:
+                            exact.append(key)
+                        continue
+                    lower, upper, inclusive = _MIN, None, False
+                    if cpe.get('versionStartIncluding'):
+                        lower = version_key(cpe['versionStartIncluding'])
+                    elif cpe.get('versionStartExcluding'):
+                        # Exclusive lower bounds are rare; the bound version itself is treated as affected
+                        lower = version_key(cpe['versionStartExcluding'])
+                    if cpe.get('versionEndExcluding'):
+                        upper = version_key(cpe['versionEndExcluding'])
+                        fixed.append(cpe['versionEndExcluding'])
+                    elif cpe.get('versionEndIncluding'):
+                        upper, inclusive = version_key(cpe['versionEndIncluding']), True
+                    if lower is not None and (upper is not None or not (cpe.get('versionEndExcluding') or cpe.get('versionEndIncluding'))):
+                        intervals.append((lower, upper, inclusive))
+        for product, (intervals, exact, fixed) in products.items():
+            if not intervals and not exact:
+                continue
+            advisory = {
+                'id': cve.get('id'),
+                'aliases': [],
+                'summary': summary[:200],
+                'severity': severity,
+                'ecosystem': 'NVD',
+                'package': product,
+                'fixed': fixed,
+            }
+            yield advisory, product, intervals, exact
+
+
+def _records(doc):
+    if isinstance(doc, list):
+        for item in doc:
+            if isinstance(item, dict):
+                yield from _records(item)
+    elif isinstance(doc, dict):
+        if 'vulnerabilities' in doc:
+            yield from _nvd_records(doc)
+        elif 'affected' in doc:
+            yield from _osv_records(doc)
+
+
+def _dump_files(db_dir: Path) -> List[Path]:
+    if not db_dir.is_dir():
+        return []
+    return sorted(p for p in db_dir.rglob('*') if p.is_file() and p.suffix in ('.json', '.zip'))
+
+
+def _documents(db_dir: Path):
+    for path in _dump_files(db_dir):
+        try:
+            if path.suffix == '.zip':
+                with zipfile.ZipFile(path) as archive:
+                    for member in archive.namelist():
+                        if member.endswith('.json'):
+                            yield json.loads(archive.read(member))
+            else:
+                with open(path, 'rb') as f:
+                    yield json.load(f)
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"Skipping unreadable advisory file {path}: {e}")
+
+
+def db_fingerprint(db_dir: Optional[Path] = None) -> Optional[str]:
+    """Hash of the dump's file names, sizes and mtimes; None if there is no dump"""
+    db_dir = db_dir or advisory_db_dir()
+    cached = _fingerprint_cache.get(str(db_dir))
+    if cached and time.monotonic() - cached[0] < FINGERPRINT_TTL:
+        return cached[1]
+    files = _dump_files(db_dir)
+    fingerprint = None
+    if files:
+        digest = hashlib.sha256(f"{INDEX_FORMAT}".encode())
+        for path in files:
+            stat = path.stat()
+            digest.update(f"{path.relative_to(db_dir)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+        fingerprint = digest.hexdigest()
+    _fingerprint_cache[str(db_dir)] = (time.monotonic(), fingerprint)
+    return fingerprint
+
+
+class AdvisoryIndex:
+    """Advisories by normalized package name, with sorted version intervals per name"""
+
+    def __init__(self, fingerprint: str, advisories: List[dict], names: Dict[str, tuple]):
+        self.fingerprint = fingerprint
+        self.advisories = advisories
+        # name -> (lower bounds, [(lower, upper, upper_inclusive, advisory, ecosystem)], {version key: [(advisory, ecosystem)]})
+        self.names = names
+        self._lookups: Dict[Tuple[str, str], Tuple[int, ...]] = {}
+
+    @classmethod
+    def build(cls, db_dir: Path, fingerprint: str) -> "AdvisoryIndex":
+        advisories = []
+        intervals_by_name: Dict[str, list] = {}
+        exact_by_name: Dict[str, Dict[tuple, list]] = {}
+        for doc in _documents(db_dir):
+            for advisory, name, intervals, exact in _records(doc):
+                index = len(advisories)
+                advisories.append(advisory)
+                name = normalize_name(name)
+                ecosystem = _ecosystem(advisory)
+                for lower, upper, inclusive in intervals:
+                    intervals_by_name.setdefault(name, []).append((lower, upper, inclusive, index, ecosystem))
+                for key in exact:
+                    exact_by_name.setdefault(name, {}).setdefault(key, []).append((index, ecosystem))
+        names = {}
+        for name in set(intervals_by_name) | set(exact_by_name):
+            intervals = sorted(intervals_by_name.get(name, []), key=lambda i: i[0])
+            names[name] = ([i[0] for i in intervals], intervals, exact_by_name.get(name, {}))
+        return cls(fingerprint, advisories, names)
+
+    def lookup(self, name: str, version, ecosystem: Optional[str] = None) -> Tuple[int, ...]:
+        """Indexes of the advisories affecting name at version, from one ecosystem or (None) all of them"""
+        memo_key = (name, version, ecosystem)
+        found = self._lookups.get(memo_key)
+        if found is not None:
+            return found
+        result = ()
+        entry = self.names.get(normalize_name(name))
+        key = version_key(version) if entry else None
+        if entry and key is not None:
+            lowers, intervals, exact = entry
+            hits = {index for index, source in exact.get(key, ()) if ecosystem in (None, source)}
+            # Only intervals starting at or below the version can contain it
+            for lower, upper, inclusive, index, source in intervals[:bisect_right(lowers, key)]:
+                if ecosystem not in (None, source):
+                    continue
+                if upper is None or key < upper or (inclusive and key == upper):
+                    hits.add(index)
+            result = tuple(sorted(hits))
+        self._lookups[memo_key] = result
+        return result
+
+    def match_components(self, components: Iterable[Tuple[str, str, Optional[str]]]) -> List[dict]:
+        """Findings for (name, version, ecosystem) components"""
+        findings = []
+        for name, version, ecosystem in components:
+            seen = set()
+            for index in self.lookup(name, version, ecosystem):
+                advisory = self.advisories[index]
+                if advisory['id'] in seen:
+                    continue
+                seen.add(advisory['id'])
+                findings.append({'component': name, 'version': version, 'advisory': advisory['id'],
+                                 'aliases': advisory['aliases'], 'summary': advisory['summary'],
+                                 'severity': advisory['severity'], 'ecosystem': advisory['ecosystem'],
+                                 'fixed': advisory['fixed']})
+        findings.sort(key=lambda f: (f['component'].lower(), f['version'] or '', f['advisory'] or ''))
+        return findings
+
+
+def load_index(db_dir: Optional[Path] = None) -> Optional[AdvisoryIndex]:
+    """The compiled index for the current dump, built and pickled on first use; None without a dump"""
+    db_dir = db_dir or advisory_db_dir()
+    fingerprint = db_fingerprint(db_dir)
+    if fingerprint is None:
+        return None
+    with _lock:
+        index = _index_cache.get(fingerprint)
+        if index is not None:
+            return index
+        pickle_path = cache_dir() / f"index-{fingerprint[:16]}.pickle"
+        if pickle_path.exists():
+            try:
+                with open(pickle_path, 'rb') as f:
+                    data = pickle.load(f)
+                index = AdvisoryIndex(fingerprint, data['advisories'], data['names'])
+            except Exception as e:
+                print(f"Rebuilding unreadable advisory index {pickle_path}: {e}")
+        if index is None:
+            start = time.perf_counter()
+            index = AdvisoryIndex.build(db_dir, fingerprint)
+            print(f"Indexed {len(index.advisories)} advisories for {len(index.names)} packages "
+                  f"in {time.perf_counter() - start:.1f} s")
+            try:
+                pickle_path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = pickle_path.with_suffix(f'.{os.getpid()}.tmp')
+                with open(tmp, 'wb') as f:
+                    pickle.dump({'advisories': index.advisories, 'names': index.names}, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, pickle_path)
+            except OSError as e:
+                print(f"Failed to write advisory index {pickle_path}: {e}")
+        # Indexes of older dumps are dropped
+        _index_cache.clear()
+        _index_cache[fingerprint] = index
+        return index
+
+
+def sbom_components(sbom_data) -> List[Tuple[str, str, Optional[str]]]:
+    """(name, version, ecosystem) of every component, the ecosystem following its source property"""
+    components = []
+    pending = list(sbom_data.get('components', []))
+    while pending:
+        component = pending.pop()
+        if component.get('name'):
+            source = next((p.get('value') for p in component.get('properties', []) if p.get('name') == 'source'), None)
+            components.append((component['name'], component.get('version'), component_ecosystem(source)))
+        pending.extend(component.get('components', []))
+    return components
+
+
+def _summary(findings) -> Dict:
+    counts = {}
+    for finding in findings:
+        severity = finding['severity']
+        # OSV severities may be CVSS vectors rather than a rating
+        severity = severity.upper() if isinstance(severity, str) and not severity.startswith('CVSS:') else 'UNKNOWN'
+        counts[severity] = counts.get(severity, 0) + 1
+    return {'total': len(findings), 'affectedComponents': len({(f['component'], f['version']) for f in findings}),
+            'bySeverity': counts}
+
+
+def match_stored(json_path, digest: Optional[str] = None, index: Optional[AdvisoryIndex] = None) -> Optional[dict]:
+    """Findings for one stored SBOM, cached by content digest; None without an advisory dump"""
+    index = index or load_index()
+    if index is None:
+        return None
+    # Deltas and the archive index record the digest, so cache hits never rebuild the SBOM
+    digest = digest or sbom_store.stored_digest(json_path)
+    cache_key = (index.fingerprint, digest)
+    with _lock:
+        result = _matches.get(cache_key)
+        if result is not None:
+            _matches.move_to_end(cache_key)
+            _stats['hits'] += 1
+            return result
+    result_path = cache_dir() / f"matches-{index.fingerprint[:16]}" / f"{digest}.json"
+    result = None
+    if result_path.exists():
+        try:
+            with open(result_path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            result = None
+    with _lock:
+        _stats['hits' if result is not None else 'misses'] += 1
+    if result is None:
+        findings = index.match_components(sbom_components(json.loads(sbom_store.read_bytes(json_path))))
+        result = {'digest': digest, 'advisoryDb': index.fingerprint[:16], 'summary': _summary(findings), 'findings': findings}
+        try:
+            result_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = result_path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            os.replace(tmp, result_path)
+        except OSError as e:
+            print(f"Failed to cache vulnerability matches for {digest[:12]}: {e}")
+    with _lock:
+        _matches[cache_key] = result
+        while len(_matches) > MEMORY_CACHE_SIZE:
+            _matches.popitem(last=False)
+    return result
+
+
+def cache_info() -> Dict[str, int]:
+    """Hit/miss totals of the per-digest match cache"""
+    return dict(_stats)
+
+
+def stored_sboms(sboms_dir) -> List[Tuple[str, Path]]:
+    """(version, json path) for every hot, delta and archived version in an SBOMs directory"""
+    sboms_dir = Path(sboms_dir)
+    found = []
+    for archived in sbom_store.archived_versions(sboms_dir):
+        for name in archived['files']:
+            if name.endswith('-sbom.json'):
+                found.append((archived['version'], sboms_dir / archived['version'] / name))
+    if sboms_dir.is_dir():
+        for version_dir in sorted(p for p in sboms_dir.iterdir() if p.is_dir() and not p.name.startswith('.')):
+            for json_file in sbom_store.list_files(version_dir, '*-sbom.json'):
+                found.append((version_dir.name, json_file))
+    return found
+
+
+def scan(sboms_dirs) -> int:
+    """Match every stored version, warming the cache; returns the number of versions matched"""
+    index = load_index()
+    if index is None:
+        print(f"No advisory database in {advisory_db_dir()}, skipping vulnerability scan")
+        return 0
+    matched = 0
+    start = time.perf_counter()
+    for sboms_dir in sboms_dirs:
+        for version, json_file in stored_sboms(sboms_dir):
+            try:
+                result = match_stored(json_file, index=index)
+            except Exception as e:
+                print(f"Failed to match {json_file}: {e}")
+                continue
+            matched += 1
+            summary = result['summary']
+            print(f"{sboms_dir}/{version}: {summary['total']} finding(s) in {summary['affectedComponents']} component(s) "
+                  f"{summary['bySeverity']}")
+    print(f"Matched {matched} version(s) against {len(index.advisories)} advisories in {time.perf_counter() - start:.1f} s")
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline vulnerability matching of stored SBOMs")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("index", help="Compile the advisory dump")
+    scan_parser = sub.add_parser("scan", help="Match every stored version of the given SBOMs directories")
+    scan_parser.add_argument("dirs", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "index":
+        index = load_index()
+        if index is None:
+            print(f"No advisory database in {advisory_db_dir()}")
+            sys.exit(1)
+        print(f"Advisory index {index.fingerprint[:16]}: {len(index.advisories)} advisories, {len(index.names)} packages")
+    else:
+        scan(args.dirs)
+
+
+if __name__ == "__main__":
+    main()
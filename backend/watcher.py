@@ -0,0 +1,173 @@
+"""
+Watch the projects' SBOMs directories and report which projects changed.
+
+Each project is summarised by a cheap signature: the mtime of its SBOMs
+directory and of every entry in it. A new vN (renamed in by store_version),
+a removed version or a rewritten archive index all change it. The watcher
+compares signatures every `interval` seconds. On Linux it also waits on
+inotify, so a change is reported as soon as it happens and the periodic
+check only catches what inotify cannot see (directories created later,
+files added to an existing vN). Without inotify it falls back to the
+periodic check alone.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_INTERVAL = 2.0
+# With inotify the periodic check is only a safety net
+INOTIFY_INTERVAL = 30.0
+# Events arriving together (a rename plus an archive index rewrite) are reported once
+SETTLE = 0.1
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT = struct.Struct('iIII')
+
+
+def signature(sboms_dir: Path) -> Optional[Tuple]:
+    """mtimes of an SBOMs directory and its visible entries; None if it does not exist"""
+    try:
+        entries = [(sboms_dir.name, sboms_dir.stat().st_mtime_ns)]
+        with os.scandir(sboms_dir) as it:
+            for entry in it:
+                # Staging directories and the version lock come and go with every write
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    entries.append((entry.name, entry.stat(follow_symlinks=False).st_mtime_ns))
+                except FileNotFoundError:
+                    continue
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return tuple(sorted(entries))
+
+
+class _Inotify:
+    """Minimal inotify binding through libc"""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def add_watch(self, path: Path) -> Optional[int]:
+        wd = self._add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        return wd if wd >= 0 else None
+
+    def read(self) -> Iterable[Tuple[int, int]]:
+        """(watch descriptor, mask) of every pending event"""
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            events.append((wd, mask))
+            offset += _EVENT.size + length
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class SBOMWatcher:
+    """Background thread calling on_change(project) when a project's SBOMs directory changes"""
+
+    def __init__(self, dirs: Dict[str, Path], on_change: Callable[[str], None],
+                 interval: Optional[float] = None, use_inotify: bool = True):
+        self.dirs = {name: Path(path) for name, path in dirs.items()}
+        self.on_change = on_change
+        self.inotify = None
+        if use_inotify and sys.platform.startswith('linux'):
+            try:
+                self.inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}); polling SBOMs directories instead", file=sys.stderr)
+        self.interval = interval or (INOTIFY_INTERVAL if self.inotify else DEFAULT_INTERVAL)
+        self.mode = 'inotify' if self.inotify else 'polling'
+        self._signatures = {name: signature(path) for name, path in self.dirs.items()}
+        self._watches: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _add_watches(self):
+        watched = set(self._watches.values())
+        for name, path in self.dirs.items():
+            if name not in watched and path.is_dir():
+                wd = self.inotify.add_watch(path)
+                if wd is not None:
+                    self._watches[wd] = name
+
+    def _wait(self) -> set:
+        """Projects inotify reported within one interval; empty on timeout or without inotify"""
+        if self.inotify is None:
+            self._stop.wait(self.interval)
+            return set()
+        self._add_watches()
+        ready, _, _ = select.select([self.inotify.fd], [], [], self.interval)
+        if not ready:
+            return set()
+        time.sleep(SETTLE)
+        woken = set()
+        for wd, mask in self.inotify.read():
+            name = self._watches.get(wd)
+            if name is None:
+                continue
+            woken.add(name)
+            if mask & IN_IGNORED:
+                # The SBOMs directory itself went away; watch it again once it is back
+                del self._watches[wd]
+        return woken
+
+    def check(self, projects: Optional[Iterable[str]] = None):
+        """Compare signatures of the given projects (default all) and report the changed ones"""
+        for name in projects if projects is not None else list(self.dirs):
+            current = signature(self.dirs[name])
+            if current == self._signatures.get(name):
+                continue
+            self._signatures[name] = current
+            try:
+                self.on_change(name)
+            except Exception as e:
+                print(f"Error handling change in {self.dirs[name]}: {e}", file=sys.stderr)
+
+    def _run(self):
+        while not self._stop.is_set():
+            woken = self._wait()
+            # A timeout checks everything; an event only the projects it touched
+            self.check(woken or None)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name='sbom-watcher')
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+        if self.inotify is not None:
+            self.inotify.close()